@@ -1,37 +1,29 @@
-import google.generativeai as genai
 from config import Config
+from utils.llm_client import llm_client
+from utils.metrics import timed
+from utils.transaction_table import total_amount
 
 class BudgetAgent:
-    def __init__(self):
-        try:
-            self.model = genai.GenerativeModel('models/gemini-2.5-flash')
-        except Exception as e:
-            print(f"Warning: Could not initialize Gemini model: {e}")
-            self.model = None
+    def __init__(self, client=None):
+        # Shared with every other agent and route
+        self.llm = client or llm_client
+    
+    @property
+    def model(self):
+        return self.llm.model
     
     def analyze(self, income, expenses, goals):
-        total_expenses = sum(exp.get('amount', 0) for exp in expenses)
+        total_expenses = total_amount(expenses)
         savings = income - total_expenses
         savings_rate = (savings / income * 100) if income > 0 else 0
         
         # Create prompt for AI
-        prompt = f"""
-        Analyze this budget and provide recommendations:
-        
-        Monthly Income: ${income}
-        Total Expenses: ${total_expenses}
-        Savings: ${savings}
-        Savings Rate: {savings_rate:.1f}%
-        
-        Provide 3-5 actionable recommendations to improve this budget.
-        Be specific and practical.
-        """
+        prompt = self._build_prompt(income, total_expenses, savings, savings_rate)
         
         recommendations = ""
-        if self.model:
+        if self.llm.available:
             try:
-                response = self.model.generate_content(prompt)
-                recommendations = response.text
+                recommendations = self.llm.generate(prompt, site='budget')
             except Exception as e:
                 print(f"AI Error: {e}")
                 recommendations = self._get_default_recommendations(savings_rate)
@@ -47,6 +39,20 @@ class BudgetAgent:
             'budgetHealth': 'Good' if savings_rate >= 20 else 'Fair' if savings_rate >= 10 else 'Needs Improvement'
         }
     
+    @timed('prompt_build')
+    def _build_prompt(self, income, total_expenses, savings, savings_rate):
+        return f"""
+        Analyze this budget and provide recommendations:
+        
+        Monthly Income: ${income}
+        Total Expenses: ${total_expenses}
+        Savings: ${savings}
+        Savings Rate: {savings_rate:.1f}%
+        
+        Provide 3-5 actionable recommendations to improve this budget.
+        Be specific and practical.
+        """
+    
     def _get_default_recommendations(self, savings_rate):
         if savings_rate >= 20:
             return "✅ Great job! Your savings rate is healthy. Consider increasing investments."
@@ -1,7 +1,59 @@
+import numpy as np
+
+from utils.amortization import simulate_payoff, simulate_scenarios
+
+
+# Payoff strategies: each maps shared per-debt arrays (and the strategy's own
+# options) to the order in which extra payments go to the debts.
+
+def _avalanche_order(state, spec):
+    return np.argsort(-state['rates'], kind='stable')
+
+
+def _snowball_order(state, spec):
+    return np.argsort(state['balances'], kind='stable')
+
+
+def _payment_ratio_order(state, spec):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.where(state['balances'] > 0, state['minPayments'] / state['balances'], 0.0)
+    return np.argsort(-ratios, kind='stable')
+
+
+def _custom_order(state, spec):
+    # Named debts first, in the given order; anything unnamed follows avalanche-style
+    position = {name: i for i, name in enumerate(spec.get('order', []))}
+    fallback = _avalanche_order(state, spec)
+    return np.array(sorted(fallback, key=lambda i: position.get(state['names'][i], len(position))))
+
+
+def _hybrid_order(state, spec):
+    # Clear small balances first for quick wins, then attack the highest rates
+    threshold = float(spec.get('threshold', 1000))
+    small = state['balances'] <= threshold
+    snowball = _snowball_order(state, spec)
+    avalanche = _avalanche_order(state, spec)
+    return np.concatenate([snowball[small[snowball]], avalanche[~small[avalanche]]])
+
+
+PAYOFF_STRATEGIES = {
+    'avalanche': (_avalanche_order, 'Highest Interest First'),
+    'snowball': (_snowball_order, 'Smallest Balance First'),
+    'payment-ratio': (_payment_ratio_order, 'Highest Minimum Payment to Balance Ratio First'),
+    'custom': (_custom_order, 'Custom Order'),
+    'hybrid': (_hybrid_order, 'Small Balances First, Then Highest Interest'),
+}
+
+
 class DebtAgent:
     def __init__(self):
         pass
     
+    @staticmethod
+    def register_strategy(name, order_fn, description):
+        """Add a payoff strategy usable by compare_strategies"""
+        PAYOFF_STRATEGIES[name] = (order_fn, description)
+    
     def analyze(self, debts):
         """Analyze debt situation and provide recommendations"""
         if not debts:
@@ -13,15 +65,15 @@ class DebtAgent:
                 'priorityDebt': None
             }
         
-        total_debt = sum(d.get('balance', 0) for d in debts)
-        total_min_payment = sum(d.get('minPayment', 0) for d in debts)
-        avg_interest = sum(d.get('rate', 0) for d in debts) / len(debts)
+        total_debt = sum(d.balance for d in debts)
+        total_min_payment = sum(d.min_payment for d in debts)
+        avg_interest = sum(d.rate for d in debts) / len(debts)
         
         # Sort by interest rate (highest first) for avalanche method
-        sorted_debts = sorted(debts, key=lambda x: x.get('rate', 0), reverse=True)
+        sorted_debts = sorted(debts, key=lambda x: x.rate, reverse=True)
         
         # Calculate total interest per year
-        annual_interest = sum(d.get('balance', 0) * d.get('rate', 0) / 100 for d in debts)
+        annual_interest = sum(d.balance * d.rate / 100 for d in debts)
         
         recommendations = f"""
 📊 Debt Analysis Summary:
@@ -36,13 +88,13 @@ Annual Interest Cost: ${annual_interest:,.2f}
 Priority Order (Highest Interest First):
 """
         for i, debt in enumerate(sorted_debts, 1):
-            recommendations += f"\n{i}. {debt['name']} - ${debt['balance']:,.2f} at {debt['rate']}% APR"
+            recommendations += f"\n{i}. {debt.name} - ${debt.balance:,.2f} at {debt.rate}% APR"
         
         recommendations += f"""
 
 💡 Action Plan:
 1. Pay minimums on all debts
-2. Put extra money toward '{sorted_debts[0]['name']}' (highest interest)
+2. Put extra money toward '{sorted_debts[0].name}' (highest interest)
 3. Once paid off, roll that payment to the next debt
 4. This saves the most on interest charges!
         """
@@ -53,7 +105,7 @@ Priority Order (Highest Interest First):
             'averageRate': round(avg_interest, 2),
             'annualInterest': round(annual_interest, 2),
             'recommendations': recommendations,
-            'priorityDebt': sorted_debts[0]['name'] if sorted_debts else None,
+            'priorityDebt': sorted_debts[0].name if sorted_debts else None,
             'debtCount': len(debts)
         }
     
@@ -69,47 +121,182 @@ Priority Order (Highest Interest First):
             }
         
         # Sort debts based on method
+        order = self._payoff_order(debts, method)
         if method == 'avalanche':
-            sorted_debts = sorted(debts, key=lambda x: x.get('rate', 0), reverse=True)
             method_description = "Highest Interest First (Saves Most Money)"
         else:  # snowball
-            sorted_debts = sorted(debts, key=lambda x: x.get('balance', 0))
             method_description = "Smallest Balance First (Quick Wins)"
+        sorted_debts = [debts[i] for i in order]
         
-        # Simple payoff calculation
-        total_payment = sum(d.get('minPayment', 0) for d in debts) + extra_payment
-        total_debt = sum(d.get('balance', 0) for d in debts)
-        
-        # Rough estimate (doesn't account for interest accumulation)
-        estimated_months = int(total_debt / total_payment) if total_payment > 0 else 999
+        total_payment = sum(d.min_payment for d in debts) + extra_payment
         
-        # Rough interest calculation
-        avg_rate = sum(d.get('rate', 0) for d in debts) / len(debts) / 100 / 12
-        total_interest = total_debt * avg_rate * estimated_months
+        # Month-by-month amortization with rollover of freed payments
+        result = simulate_payoff(
+            [d.balance for d in debts],
+            [d.rate for d in debts],
+            [d.min_payment for d in debts],
+            extra_payment,
+            order
+        )
+        estimated_months = result['months'] if result['paidOff'] else 999
+        total_interest = result['totalInterest']
+        payoff_months = result['payoffMonths'].tolist()
         
         plan = f"""
 🎯 {method.upper()} METHOD: {method_description}
 
 Payoff Order:
 """
-        for i, debt in enumerate(sorted_debts, 1):
-            plan += f"{i}. {debt['name']} - ${debt['balance']:,.2f}\n"
+        for i, debt_index in enumerate(order, 1):
+            debt = debts[debt_index]
+            month = payoff_months[debt_index]
+            paid_off = f"paid off in month {month}" if month >= 0 else "not paid off"
+            plan += f"{i}. {debt.name} - ${debt.balance:,.2f} ({paid_off})\n"
+        
+        if result['paidOff']:
+            timeline = f"Payoff Time: {estimated_months} months ({estimated_months // 12} years, {estimated_months % 12} months)"
+        else:
+            timeline = "Payoff Time: never - payments do not cover the interest. Increase your monthly payment."
         
         plan += f"""
 Monthly Payment: ${total_payment:,.2f}
-Estimated Payoff Time: {estimated_months} months ({estimated_months // 12} years, {estimated_months % 12} months)
-Estimated Interest Paid: ${total_interest:,.2f}
+{timeline}
+Total Interest Paid: ${total_interest:,.2f}
         """
         
+        payments = result['payments'].sum(axis=1)
+        interest = result['interest'].sum(axis=1)
+        balances = result['balances'].sum(axis=1)
+        schedule = [
+            {
+                'month': month,
+                'payment': round(payment, 2),
+                'interest': round(accrued, 2),
+                'principal': round(payment - accrued, 2),
+                'balance': round(balance, 2)
+            }
+            for month, payment, accrued, balance in zip(
+                range(1, result['months'] + 1), payments.tolist(), interest.tolist(), balances.tolist()
+            )
+        ]
+        
         return {
             'method': method,
-            'order': [d['name'] for d in sorted_debts],
+            'order': [d.name for d in sorted_debts],
             'estimatedMonths': estimated_months,
             'totalInterest': round(total_interest, 2),
             'monthlyPayment': round(total_payment, 2),
+            'paidOff': result['paidOff'],
+            'payoffMonths': [
+                {'name': debts[i].name, 'month': payoff_months[i] if payoff_months[i] >= 0 else None}
+                for i in order
+            ],
+            'schedule': schedule,
             'plan': plan
         }
     
+    def _payoff_order(self, debts, method):
+        """Indices of debts in the order extra payments go to them"""
+        if method == 'avalanche':
+            return sorted(range(len(debts)), key=lambda i: debts[i].rate, reverse=True)
+        # snowball
+        return sorted(range(len(debts)), key=lambda i: debts[i].balance)
+    
+    def sweep_extra_payments(self, debts, extra_payments, methods=('avalanche', 'snowball')):
+        """Payoff time and interest for every extra payment amount and method, in one batched simulation"""
+        extra_payments = [float(extra) for extra in extra_payments]
+        result = {'extraPayments': extra_payments}
+        if not debts:
+            for method in methods:
+                result[method] = {
+                    'months': [0] * len(extra_payments),
+                    'totalInterest': [0] * len(extra_payments),
+                    'paidOff': [True] * len(extra_payments)
+                }
+            return result
+        
+        # One scenario per (method, extra payment) pair
+        orders = []
+        for method in methods:
+            orders.extend([self._payoff_order(debts, method)] * len(extra_payments))
+        simulated = simulate_scenarios(
+            [d.balance for d in debts],
+            [d.rate for d in debts],
+            [d.min_payment for d in debts],
+            extra_payments * len(methods),
+            orders
+        )
+        
+        for i, method in enumerate(methods):
+            window = slice(i * len(extra_payments), (i + 1) * len(extra_payments))
+            paid_off = simulated['paidOff'][window].tolist()
+            result[method] = {
+                'months': [months if done else 999
+                           for months, done in zip(simulated['months'][window].tolist(), paid_off)],
+                'totalInterest': [round(interest, 2) for interest in simulated['totalInterest'][window].tolist()],
+                'paidOff': paid_off
+            }
+        return result
+    
+    def compare_strategies(self, debts, extra_payment, strategies=None):
+        """
+        Rank any number of payoff strategies against each other.
+
+        ``strategies`` holds names (e.g. 'avalanche') or option dicts such as
+        {'type': 'hybrid', 'threshold': 1500} or {'type': 'custom', 'order': [names]}.
+        Per-debt state is built once and every strategy is simulated in the
+        same batched pass.
+        """
+        specs = [
+            {'type': spec} if isinstance(spec, str) else dict(spec)
+            for spec in (strategies or list(PAYOFF_STRATEGIES))
+        ]
+        for spec in specs:
+            spec.setdefault('type', spec.get('name'))
+            if spec['type'] not in PAYOFF_STRATEGIES:
+                raise ValueError(f"Unknown strategy: {spec['type']}")
+        
+        if not debts:
+            return {'extraPayment': extra_payment, 'best': None, 'ranking': []}
+        
+        state = {
+            'names': [d.name for d in debts],
+            'balances': np.array([d.balance for d in debts], dtype=np.float64),
+            'rates': np.array([d.rate for d in debts], dtype=np.float64),
+            'minPayments': np.array([d.min_payment for d in debts], dtype=np.float64),
+        }
+        orders = [PAYOFF_STRATEGIES[spec['type']][0](state, spec) for spec in specs]
+        simulated = simulate_scenarios(
+            state['balances'], state['rates'], state['minPayments'],
+            [extra_payment] * len(specs), orders
+        )
+        
+        rows = []
+        for i, spec in enumerate(specs):
+            paid_off = bool(simulated['paidOff'][i])
+            payoff_months = simulated['payoffMonths'][i].tolist()
+            rows.append({
+                'strategy': spec.get('name', spec['type']),
+                'type': spec['type'],
+                'description': PAYOFF_STRATEGIES[spec['type']][1],
+                'months': int(simulated['months'][i]) if paid_off else 999,
+                'totalInterest': round(float(simulated['totalInterest'][i]), 2),
+                'paidOff': paid_off,
+                'order': [state['names'][j] for j in orders[i]],
+                'payoffMonths': {
+                    state['names'][j]: payoff_months[j] if payoff_months[j] >= 0 else None
+                    for j in orders[i]
+                }
+            })
+        
+        # Finished plans first, then cheapest, then fastest
+        rows.sort(key=lambda row: (not row['paidOff'], row['totalInterest'], row['months']))
+        for rank, row in enumerate(rows, 1):
+            row['rank'] = rank
+            row['interestVsBest'] = round(row['totalInterest'] - rows[0]['totalInterest'], 2)
+        
+        return {'extraPayment': extra_payment, 'best': rows[0]['strategy'], 'ranking': rows}
+    
     def compare_methods(self, debts, extra_payment):
         """Compare avalanche vs snowball methods"""
         avalanche = self.create_payoff_plan(debts, extra_payment, 'avalanche')
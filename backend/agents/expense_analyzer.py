@@ -1,7 +1,29 @@
-from collections import defaultdict
+import re
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from utils.aggregations import group_stats, monthly_totals
+from utils.keyword_matcher import KeywordMatcher
+from utils.lru_cache import LRUCache
+from utils.metrics import span, timed
+from utils.rollups import MonthlyRollup
+from utils.transaction_table import TransactionTable
+
+# Store numbers, reference numbers and other digit runs ("#1234", "00012345")
+_MERCHANT_NOISE = re.compile(r'[#\d]+')
+
+
+def normalize_merchant(description):
+    """Reduce a bank description to a stable merchant key: lowercase, no digits or store numbers"""
+    return ' '.join(_MERCHANT_NOISE.sub(' ', description.lower()).split())
+
 
 class ExpenseAnalyzer:
     def __init__(self):
+        self._cache = LRUCache(Config.CATEGORY_CACHE_SIZE)
         self.categories = {
             'Food': ['grocery', 'restaurant', 'food', 'cafe', 'dining', 'pizza', 'coffee'],
             'Transportation': ['gas', 'uber', 'lyft', 'transit', 'parking', 'fuel'],
@@ -11,54 +33,162 @@ class ExpenseAnalyzer:
             'Shopping': ['amazon', 'store', 'mall', 'clothing', 'clothes', 'shopping']
         }
     
+    @property
+    def categories(self):
+        """Read-only keyword map; assign a new dict to change it"""
+        return self._categories_view
+    
+    @categories.setter
+    def categories(self, categories):
+        # Freeze the map so the compiled matcher and cache can never go stale
+        self._categories = {category: tuple(keywords) for category, keywords in categories.items()}
+        self._categories_view = MappingProxyType(self._categories)
+        # Keywords are matched against normalized merchant strings
+        self._matcher = KeywordMatcher({
+            category: [normalize_merchant(keyword) for keyword in keywords]
+            for category, keywords in self._categories.items()
+        })
+        self._cache.clear()
+    
     def categorize(self, description, amount):
         """Categorize a single expense based on description"""
-        description_lower = description.lower()
+        key = normalize_merchant(description)
+        category = self._cache.get(key)
+        if category is None:
+            generation = self._cache.generation
+            category = self._matcher.match(key)
+            self._cache.put(key, category, generation)
+        return category
+    
+    @timed('categorize')
+    def categorize_batch(self, descriptions):
+        """Categorize many descriptions at once, looking up each distinct one only once"""
+        seen = {}
+        results = []
+        for description in descriptions:
+            category = seen.get(description)
+            if category is None:
+                category = seen[description] = self.categorize(description or '', 0)
+            results.append(category)
+        return results
+    
+    def cache_stats(self):
+        """Hit/miss/eviction counters of the merchant categorization cache"""
+        return self._cache.stats()
+    
+    def analyze(self, expenses):
+        """Analyze a list of expenses, a TransactionTable or a MonthlyRollup"""
+        if isinstance(expenses, MonthlyRollup):
+            return self._analyze_rollup(expenses)
+        
+        table = expenses if isinstance(expenses, TransactionTable) else TransactionTable.from_records(expenses)
+        codes, labels = self._category_codes(table)
         
-        for category, keywords in self.categories.items():
-            if any(keyword in description_lower for keyword in keywords):
-                return category
+        with span('aggregate'):
+            # Group by category and by month over the arrays
+            stats = group_stats(codes, table.amounts, len(labels))
+            months, month_sums, month_counts = monthly_totals(codes, table.amounts, table.dates, len(labels))
         
-        return 'Other'
+            category_totals = dict(zip(labels, stats['sum'].tolist()))
+            category_stats = {
+                label: {
+                    'count': count,
+                    'min': round(low, 2),
+                    'max': round(high, 2),
+                    'average': round(mean, 2),
+                    'stdDev': round(std, 2)
+                }
+                for label, count, low, high, mean, std in zip(
+                    labels, stats['count'].tolist(), stats['min'].tolist(),
+                    stats['max'].tolist(), stats['mean'].tolist(), stats['std'].tolist()
+                )
+            }
+            monthly = [
+                {
+                    'month': str(month),
+                    'total': round(float(sums.sum()), 2),
+                    'count': int(counts.sum()),
+                    'categories': {labels[i]: round(float(sums[i]), 2) for i in np.flatnonzero(counts)}
+                }
+                for month, sums, counts in zip(months, month_sums, month_counts)
+            ]
+        
+        return self._summarize(category_totals, category_stats, monthly)
     
-    def analyze(self, expenses):
-        """Analyze a list of expenses"""
-        # Group by category
-        category_totals = defaultdict(float)
+    @timed('aggregate')
+    def _analyze_rollup(self, rollup):
+        """Summarize from a rollup's per-month aggregates, without scanning transactions"""
+        category_stats = rollup.category_stats()
+        category_totals = rollup.category_totals()
+        monthly = [
+            {
+                'month': month,
+                'total': round(total, 2),
+                'count': count,
+                'categories': {category: round(amount, 2) for category, amount in categories.items()}
+            }
+            for month, total, count, categories in rollup.monthly_totals()
+        ]
+        return self._summarize(category_totals, category_stats, monthly)
+    
+    def _category_codes(self, table):
+        """Effective category code per row, numbered by first appearance, plus the labels"""
+        labels = list(table.categories.categories)
+        codes = table.categories.codes.astype(np.int64)
         
-        for exp in expenses:
-            category = exp.get('category', 'Other')
-            # If no category, try to auto-categorize
-            if not category or category == 'Other':
-                description = exp.get('description', '')
-                category = self.categorize(description, exp.get('amount', 0))
-            
-            amount = exp.get('amount', 0)
-            category_totals[category] += amount
+        # Rows with no usable category are auto-categorized, once per distinct
+        # description among those rows only
+        uncategorized = [i for i, label in enumerate(labels) if not label or label == 'Other']
+        if uncategorized:
+            mask = np.isin(codes, uncategorized)
+            needed, inverse = np.unique(table.descriptions.codes[mask], return_inverse=True)
+            # np.unique sorts, so a missing description (code -1) can only come first
+            missing = len(needed) > 0 and needed[0] < 0
+            guessed = (['Other'] if missing else []) + self.categorize_batch(
+                table.descriptions.categories.take(needed[1:] if missing else needed).tolist()
+            )
+            label_index = {label: i for i, label in enumerate(labels)}
+            guessed_codes = np.array([label_index.setdefault(category, len(label_index)) for category in guessed],
+                                     dtype=np.int64)
+            labels = list(label_index)
+            codes = codes.copy()
+            codes[mask] = guessed_codes[inverse]
         
+        # Renumber by first appearance so ties keep the input ordering
+        codes, uniques = pd.factorize(codes)
+        return codes, [labels[code] for code in uniques.tolist()]
+    
+    def _summarize(self, category_totals, category_stats=None, monthly=None):
+        """Build the breakdown, totals and insights from per-category totals"""
         total = sum(category_totals.values())
         
         # Calculate percentages
         breakdown = []
         for category, amount in category_totals.items():
             percentage = (amount / total * 100) if total > 0 else 0
-            breakdown.append({
+            item = {
                 'category': category,
                 'amount': round(amount, 2),
                 'percentage': round(percentage, 2)
-            })
+            }
+            if category_stats:
+                item.update(category_stats[category])
+            breakdown.append(item)
         
         # Sort by amount (highest first)
         breakdown.sort(key=lambda x: x['amount'], reverse=True)
         
         insights = self._generate_insights(breakdown, total)
         
-        return {
+        result = {
             'categoryBreakdown': breakdown,
             'totalExpenses': round(total, 2),
             'topCategory': breakdown[0]['category'] if breakdown else 'None',
             'insights': insights
         }
+        if monthly is not None:
+            result['monthlyBreakdown'] = monthly
+        return result
     
     def _generate_insights(self, breakdown, total):
         """Generate insights from expense breakdown"""
@@ -1,17 +1,21 @@
-import google.generativeai as genai
 from config import Config
+from utils.llm_client import llm_client
+from utils.metrics import timed
+from utils.savings_projection import expense_profile, project_savings
+from utils.transaction_table import total_amount
 
 class SavingsAgent:
-    def __init__(self):
-        try:
-            self.model = genai.GenerativeModel('models/gemini-2.5-flash')
-        except Exception as e:
-            print(f"Warning: Could not initialize Gemini model: {e}")
-            self.model = None
+    def __init__(self, client=None):
+        # Shared with every other agent and route
+        self.llm = client or llm_client
+    
+    @property
+    def model(self):
+        return self.llm.model
     
     def create_strategy(self, income, expenses, goals):
         """Create a personalized savings strategy"""
-        total_expenses = sum(exp.get('amount', 0) for exp in expenses)
+        total_expenses = total_amount(expenses)
         available = income - total_expenses
         
         # Emergency fund recommendation (3-6 months of expenses)
@@ -20,30 +24,12 @@ class SavingsAgent:
         # Calculate recommended savings (50/30/20 rule: 20% for savings)
         recommended_savings = income * 0.20
         
-        prompt = f"""
-        Create a personalized savings strategy for someone with:
-        
-        Monthly Income: ${income}
-        Monthly Expenses: ${total_expenses}
-        Currently Available for Savings: ${available}
-        
-        Emergency Fund Target: ${emergency_fund_target} (6 months of expenses)
-        Recommended Monthly Savings (20% rule): ${recommended_savings}
-        
-        Provide:
-        1. Realistic monthly savings amount
-        2. How to build emergency fund
-        3. Actionable tips to increase savings
-        4. Timeline to reach emergency fund goal
-        
-        Keep it practical and encouraging.
-        """
+        prompt = self._build_prompt(income, total_expenses, available, emergency_fund_target, recommended_savings)
         
         strategy = ""
-        if self.model:
+        if self.llm.available:
             try:
-                response = self.model.generate_content(prompt)
-                strategy = response.text
+                strategy = self.llm.generate(prompt, site='savings')
             except Exception as e:
                 print(f"AI Error: {e}")
                 strategy = self._get_default_strategy(available, recommended_savings, emergency_fund_target)
@@ -62,6 +48,55 @@ class SavingsAgent:
             'timeline': f"{int(months_to_emergency_fund)} months" if months_to_emergency_fund < 100 else "Increase income to save faster"
         }
     
+    @timed('prompt_build')
+    def _build_prompt(self, income, total_expenses, available, emergency_fund_target, recommended_savings):
+        return f"""
+        Create a personalized savings strategy for someone with:
+        
+        Monthly Income: ${income}
+        Monthly Expenses: ${total_expenses}
+        Currently Available for Savings: ${available}
+        
+        Emergency Fund Target: ${emergency_fund_target} (6 months of expenses)
+        Recommended Monthly Savings (20% rule): ${recommended_savings}
+        
+        Provide:
+        1. Realistic monthly savings amount
+        2. How to build emergency fund
+        3. Actionable tips to increase savings
+        4. Timeline to reach emergency fund goal
+        
+        Keep it practical and encouraging.
+        """
+    
+    def project(self, income, expenses, goals, paths=10000, months=120, seed=None,
+                income_volatility=None, expense_volatility=None):
+        """Monte Carlo P10/P50/P90 timelines for the emergency fund and each goal"""
+        monthly_expenses, historical_volatility = expense_profile(expenses)
+        if expense_volatility is None:
+            expense_volatility = historical_volatility
+        if income_volatility is None:
+            income_volatility = Config.INCOME_VOLATILITY
+        
+        # Emergency fund first (6 months of expenses), then goals in order
+        targets = [{'name': 'Emergency Fund', 'amount': monthly_expenses * 6}]
+        for goal in goals:
+            targets.append({
+                'name': goal.get('name', 'Goal'),
+                'amount': goal.get('targetAmount', 0) - goal.get('currentAmount', 0)
+            })
+        
+        projection = project_savings(
+            income, monthly_expenses, targets,
+            income_volatility=income_volatility,
+            expense_volatility=expense_volatility,
+            paths=paths, months=months, seed=seed
+        )
+        projection['monthlyExpenses'] = round(monthly_expenses, 2)
+        projection['incomeVolatility'] = round(income_volatility, 4)
+        projection['expenseVolatility'] = round(expense_volatility, 4)
+        return projection
+    
     def _get_default_strategy(self, available, recommended, emergency_target):
         """Default strategy when AI is unavailable"""
         if available <= 0:
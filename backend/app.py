@@ -10,11 +10,12 @@ OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 
 print("Keys loaded:", GOOGLE_KEY is not None, OPENAI_KEY is not None)
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, json, stream_with_context
 from flask_cors import CORS
+import numpy as np
 import os
+import sqlite3
 import sys
-from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -28,85 +29,50 @@ from agents.budget_agent import BudgetAgent
 from agents.expense_analyzer import ExpenseAnalyzer
 from agents.savings_agent import SavingsAgent
 from agents.debt_agent import DebtAgent
-from utils.csv_processor import CSVProcessor
+from config import Config
+from utils.csv_processor import CSVProcessor, ParseReport
+from utils.llm_client import llm_client
+from utils.metrics import init_app as init_metrics, metrics, timed
+from utils.model_registry import model_registry
+from utils.profiling import RequestProfiler
+from utils.records import debts_from_dicts, transactions_from_dicts
+from utils.transaction_store import TransactionStore
+from utils.upload_batch import expand_uploads, merge_expenses, parse_jobs, start_pool
+from utils.upload_store import UploadStore, open_parsed, read_parsed
 from utils.validators import validate_expense_data, validate_debt_data
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
-app.config['ALLOWED_EXTENSIONS'] = {'csv'}
+app.config['UPLOAD_FOLDER'] = Config.UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
+app.config['ALLOWED_EXTENSIONS'] = {'csv', 'zip'}
+# Raw request bodies with these types are parsed as CSV without multipart
+app.config['STREAM_MIMETYPES'] = {'text/csv', 'application/octet-stream'}
 
 # Enable CORS
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+# Request and stage timings for /metrics (and Server-Timing when enabled)
+init_metrics(app)
+
+# Admin-only profiling of individual requests; no hooks at all unless enabled
+profiler = RequestProfiler(
+    Config.PROFILE_DIR,
+    Config.PROFILING_TOKEN,
+    top=Config.PROFILE_TOP_FUNCTIONS,
+    sample_interval=Config.PROFILE_SAMPLE_INTERVAL_MS / 1000
+)
+if Config.PROFILING_ENABLED:
+    profiler.init_app(app)
+
 # ============================================
-# CONFIGURE GOOGLE AI - UPDATED FOR 2025
+# CONFIGURE GOOGLE AI
 # ============================================
-GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY', '')
-GEMINI_MODEL = None
-AI_ENABLED = False
-MODEL_NAME = None
-
-def initialize_gemini():
-    """Try to initialize Google Gemini AI with latest model names"""
-    global GEMINI_MODEL, AI_ENABLED, MODEL_NAME
-    
-    if not GOOGLE_API_KEY or GOOGLE_API_KEY == 'your_google_api_key_here':
-        print("⚠️ No valid Google API Key")
-        return False
-    
-    try:
-        import google.generativeai as genai
-        genai.configure(api_key=GOOGLE_API_KEY)
-        
-        # Updated model names for 2024/2025
-        models_to_try = [
-            'models/gemini-2.5-flash',
-            'gemini-2.5-flash',
-            'models/gemini-flash-latest',
-            'gemini-flash-latest',
-            'models/gemini-2.0-flash',
-            'models/gemini-2.5-pro',
-            'models/gemini-pro-latest',
-        ]
-        
-        for model_name in models_to_try:
-            try:
-                print(f"🔄 Trying: {model_name}")
-                model = genai.GenerativeModel(model_name)
-                
-                # Quick test
-                test_response = model.generate_content(
-                    "Say 'ready' in one word",
-                    generation_config={'max_output_tokens': 10}
-                )
-                
-                # Success!
-                GEMINI_MODEL = model
-                MODEL_NAME = model_name
-                AI_ENABLED = True
-                
-                print(f"✅ SUCCESS! Using: {model_name}")
-                print(f"   API Key: {GOOGLE_API_KEY[:15]}...")
-                print(f"   Test: {test_response.text.strip()}")
-                return True
-                
-            except Exception as e:
-                error_msg = str(e)[:80]
-                print(f"   ❌ Failed: {error_msg}")
-                continue
-        
-        print("❌ All models failed")
-        return False
-        
-    except Exception as e:
-        print(f"❌ Initialization error: {e}")
-        return False
-
-# Initialize on startup
-initialize_gemini()
+# Discovery runs in the background; requests use fallbacks until it is ready.
+# Run as a script, it starts after the upload parser pool is forked (see __main__)
+if __name__ != '__main__':
+    model_registry.start()
 
 # Initialize agents
 budget_agent = BudgetAgent()
@@ -114,14 +80,57 @@ expense_analyzer = ExpenseAnalyzer()
 savings_agent = SavingsAgent()
 debt_agent = DebtAgent()
 csv_processor = CSVProcessor()
+# Persistent history; ledger totals are read from its monthly rollups
+transaction_store = TransactionStore(Config.DATABASE_PATH, categorize=expense_analyzer.categorize,
+                                     batch_size=Config.DATABASE_BATCH_SIZE)
+
+DEFAULT_USER_ID = 'default'
 
-# Create upload folder
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Uploads are kept by content hash, with parses cached; swept on startup and every few minutes
+upload_store = UploadStore(
+    app.config['UPLOAD_FOLDER'],
+    max_bytes=Config.UPLOAD_STORE_MAX_BYTES,
+    max_age=Config.UPLOAD_STORE_MAX_AGE,
+    cleanup_interval=Config.UPLOAD_STORE_CLEANUP_INTERVAL
+)
+upload_store.maybe_cleanup()
 
 # Helper function
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def request_expenses(data):
+    """
+    Transactions sent in the payload, or, when only userId is given, the monthly
+    rollup of the stored history (optionally narrowed by startDate/endDate/category)
+    """
+    if 'expenses' not in data and data.get('userId') is not None:
+        return transaction_store.rollup(str(data['userId']), data.get('startDate'), data.get('endDate'),
+                                        data.get('category'))
+    return transactions_from_dicts(data.get('expenses', []))
+
+def request_income(data):
+    """Income from the payload, else the stored income of userId"""
+    if 'income' not in data and data.get('userId') is not None:
+        return transaction_store.get_income(str(data['userId']))
+    return data.get('income', 0)
+
+def request_goals(data):
+    if 'goals' not in data and data.get('userId') is not None:
+        return transaction_store.get_goals(str(data['userId']))
+    return data.get('goals', [])
+
+def request_debts(data):
+    """Debt records from the payload, else the stored debts of userId"""
+    if 'debts' not in data and data.get('userId') is not None:
+        return transaction_store.debt_records(str(data['userId']))
+    return debts_from_dicts(data.get('debts', []))
+
+def request_user_id(data=None):
+    """userId from the JSON body or query string, else the single default user"""
+    user_id = (data or {}).get('userId') or request.args.get('userId')
+    return str(user_id) if user_id is not None else DEFAULT_USER_ID
+
 # ============================================
 # ROUTES
 # ============================================
@@ -132,8 +141,9 @@ def index():
         'message': 'AI Financial Coach API',
         'version': '1.0.0',
         'status': 'running',
-        'ai_enabled': AI_ENABLED,
-        'ai_model': MODEL_NAME
+        'ai_enabled': model_registry.enabled,
+        'ai_model': model_registry.model_name,
+        'ai_status': model_registry.status
     })
 
 @app.route('/api/budget/analyze', methods=['POST'])
@@ -141,9 +151,9 @@ def analyze_budget():
     try:
         data = request.json
         result = budget_agent.analyze(
-            data.get('income', 0),
-            data.get('expenses', []),
-            data.get('goals', [])
+            request_income(data),
+            request_expenses(data),
+            request_goals(data)
         )
         return jsonify(result)
     except Exception as e:
@@ -152,34 +162,139 @@ def analyze_budget():
 @app.route('/api/expenses/upload', methods=['POST'])
 def upload_expenses():
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            expenses = csv_processor.process_file(filepath)
-            return jsonify({
-                'success': True,
-                'expenses': expenses,
-                'count': len(expenses)
-            })
-        return jsonify({'error': 'Invalid file type'}), 400
+        user_id = request.args.get('userId')
+        if request.mimetype in app.config['STREAM_MIMETYPES']:
+            # Raw CSV body
+            stream = request.stream
+        else:
+            user_id = request.form.get('userId', user_id)
+            # One or more parts named 'file' (or 'files'), each a CSV or a .zip of CSVs
+            files = request.files.getlist('file') + request.files.getlist('files')
+            if not files:
+                return jsonify({'error': 'No file provided'}), 400
+
+            if any(file.filename == '' for file in files):
+                return jsonify({'error': 'No file selected'}), 400
+
+            if not all(allowed_file(file.filename) for file in files):
+                return jsonify({'error': 'Invalid file type'}), 400
+
+            if len(files) > Config.MAX_UPLOAD_FILES:
+                return jsonify({'error': f'At most {Config.MAX_UPLOAD_FILES} files per upload'}), 400
+
+            if len(files) > 1 or files[0].filename.lower().endswith('.zip'):
+                return upload_batch(files, user_id)
+            stream = files[0].stream
+
+        # Parse straight from the request stream while it is hashed and saved; the
+        # parse is cached under the content hash once the upload is complete
+        upload = upload_store.receive(stream)
+        report = ParseReport()
+        expenses = upload.cache_parse(csv_processor.iter_stream(upload, report), report)
+        extra = {}
+        if user_id is not None:
+            # Store every row before answering, so a failed write is an error status rather
+            # than a cut-off body; the response then replays the rows from the parse cache
+            extra['persisted'] = persist_expenses(str(user_id), expenses)
+            expenses = read_parsed(open_parsed(upload_store.parsed_path(upload.key)), report)
+        return Response(stream_with_context(stream_upload_response(expenses, report, upload, extra)),
+                        mimetype='application/json')
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Could not store the transactions: {e}'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+def upload_batch(files, user_id):
+    """Store the parts by content hash and parse them (or read their cached parses) in parallel"""
+    saved = []
+    for file in files:
+        key, path = upload_store.save(file.stream)
+        saved.append((file.filename, path, key))
+    jobs = expand_uploads(saved, upload_store.parsed_path)
+    results = [None] * len(jobs)
+    progress = parse_progress(jobs, results)
+    merged = persisted = None
+    if user_id is not None:
+        # Parse, merge and store everything before answering, so a failed write is an
+        # error status rather than a cut-off body
+        progress = list(progress)
+        merged = merge_expenses(results)
+        persisted = persist_expenses(str(user_id), merged[0])
+    return Response(stream_with_context(stream_batch_response(jobs, progress, results, merged, persisted)),
+                    mimetype='application/json')
+
+def parse_progress(jobs, results):
+    """Parse the jobs, storing each file's rows in results; yields a progress entry per file as it finishes"""
+    for done, (index, result) in enumerate(parse_jobs(jobs), start=1):
+        name, expenses, report, seconds, error, cached = result
+        results[index] = expenses
+        progress = dict(report, name=name, seconds=round(seconds, 3), cached=cached, done=done, total=len(jobs))
+        if error:
+            progress['error'] = error
+        yield progress
+
+def stream_batch_response(jobs, progress, results, merged=None, persisted=None):
+    """
+    Report each file as soon as it is parsed, then emit the merged,
+    de-duplicated expenses in date order once every file is done
+    """
+    yield '{"success": true, "files": ['
+    count = 0
+    duplicates = []
+    error = None
+    try:
+        for done, entry in enumerate(progress, start=1):
+            yield (',' if done > 1 else '') + json.dumps(entry)
+    except Exception as e:
+        error = str(e)
+
+    yield '], "expenses": ['
+    if error is None:
+        try:
+            expenses, duplicates = merged or merge_expenses(results)
+            for expense in expenses:
+                yield (',' if count else '') + json.dumps(expense.to_dict())
+                count += 1
+        except Exception as e:
+            error = str(e)
+    tail = {
+        'count': count,
+        'duplicates': sum(duplicates),
+        'duplicatesByFile': [{'name': job[0], 'duplicates': dropped} for job, dropped in zip(jobs, duplicates)]
+    }
+    if persisted is not None:
+        tail['persisted'] = persisted
+    if error:
+        tail['error'] = error
+    yield '], ' + json.dumps(tail)[1:]
+
+def persist_expenses(user_id, expenses):
+    """Add uploaded rows to the user's history in one transaction, skipping rows an earlier upload already stored"""
+    return transaction_store.append(user_id, expenses, skip_stored=True)
+
+def stream_upload_response(expenses, report, upload, extra=None):
+    """Emit the upload JSON incrementally so large files never sit in memory"""
+    count = 0
+    error = None
+    yield '{"success": true, "expenses": ['
+    try:
+        for expense in expenses:
+            yield (',' if count else '') + json.dumps(expense.to_dict())
+            count += 1
+    except Exception as e:
+        error = str(e)
+    tail = dict(extra or {}, contentHash=upload.key, count=count, report=report.to_dict())
+    if error:
+        tail['error'] = error
+    yield '], ' + json.dumps(tail)[1:]
+
 @app.route('/api/expenses/analyze', methods=['POST'])
 def analyze_expenses():
     try:
         data = request.json
-        expenses = data.get('expenses', [])
-        if not validate_expense_data(expenses):
+        if 'expenses' in data and not validate_expense_data(data['expenses']):
             return jsonify({'error': 'Invalid expense data'}), 400
+        expenses = request_expenses(data)
         result = expense_analyzer.analyze(expenses)
         return jsonify(result)
     except Exception as e:
@@ -189,6 +304,17 @@ def analyze_expenses():
 def categorize_expense():
     try:
         data = request.json
+        
+        # Batch mode: a list of descriptions or of expense objects
+        if 'descriptions' in data or 'expenses' in data:
+            descriptions = data.get('descriptions')
+            if descriptions is None:
+                descriptions = [exp.get('description', '') for exp in data.get('expenses', [])]
+            if not isinstance(descriptions, list):
+                return jsonify({'error': 'descriptions must be a list'}), 400
+            categories = expense_analyzer.categorize_batch(descriptions)
+            return jsonify({'categories': categories, 'count': len(categories), 'confidence': 0.85})
+        
         category = expense_analyzer.categorize(
             data.get('description', ''),
             data.get('amount', 0)
@@ -197,14 +323,77 @@ def categorize_expense():
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/expenses/categorize/cache', methods=['GET'])
+def categorize_cache_stats():
+    return jsonify(expense_analyzer.cache_stats())
+
+@app.route('/api/ledger/<user_id>', methods=['GET'])
+def get_ledger(user_id):
+    return jsonify(transaction_store.rollup(user_id).to_dict())
+
+@app.route('/api/ledger/<user_id>/transactions', methods=['GET'])
+def list_ledger_transactions(user_id):
+    try:
+        limit = request.args.get('limit', type=int)
+        transactions = transaction_store.transactions(
+            user_id, request.args.get('startDate'), request.args.get('endDate'),
+            request.args.get('category'), limit=limit
+        )
+        return jsonify({'transactions': transactions, 'count': len(transactions)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/ledger/<user_id>/transactions', methods=['POST'])
+def add_ledger_transactions(user_id):
+    try:
+        data = request.json
+        expenses = data.get('expenses', [data['expense']] if 'expense' in data else [])
+        if not validate_expense_data(expenses):
+            return jsonify({'error': 'Invalid expense data'}), 400
+        ids = [entry_id for entry_id, _ in transaction_store.add_transactions(user_id, transactions_from_dicts(expenses))]
+        ledger = transaction_store.rollup(user_id)
+        return jsonify({'success': True, 'ids': ids, 'count': len(ledger), 'total': round(ledger.total(), 2)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/ledger/<user_id>/transactions/<int:entry_id>', methods=['DELETE'])
+def delete_ledger_transaction(user_id, entry_id):
+    if not transaction_store.delete_transaction(user_id, entry_id):
+        return jsonify({'error': 'Transaction not found'}), 404
+    ledger = transaction_store.rollup(user_id)
+    return jsonify({'success': True, 'count': len(ledger), 'total': round(ledger.total(), 2)})
+
 @app.route('/api/savings/strategy', methods=['POST'])
 def get_savings_strategy():
     try:
         data = request.json
         result = savings_agent.create_strategy(
-            data.get('income', 0),
-            data.get('expenses', []),
-            data.get('goals', [])
+            request_income(data),
+            request_expenses(data),
+            request_goals(data)
+        )
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/savings/projection', methods=['POST'])
+def get_savings_projection():
+    try:
+        data = request.json
+        paths = int(data.get('paths', 10000))
+        months = int(data.get('months', 120))
+        if not 0 < paths <= Config.MAX_PROJECTION_PATHS or not 0 < months <= Config.MAX_PROJECTION_MONTHS:
+            return jsonify({'error': f'paths must be 1-{Config.MAX_PROJECTION_PATHS} '
+                                     f'and months 1-{Config.MAX_PROJECTION_MONTHS}'}), 400
+        result = savings_agent.project(
+            request_income(data),
+            request_expenses(data),
+            request_goals(data),
+            paths=paths,
+            months=months,
+            seed=data.get('seed'),
+            income_volatility=data.get('incomeVolatility'),
+            expense_volatility=data.get('expenseVolatility')
         )
         return jsonify(result)
     except Exception as e:
@@ -215,9 +404,26 @@ def handle_goals():
     try:
         if request.method == 'POST':
             goal = request.json
-            return jsonify({'success': True, 'goalId': 'goal_123'})
+            if not goal.get('name') or float(goal.get('targetAmount', 0)) <= 0:
+                return jsonify({'error': 'A goal needs a name and a positive targetAmount'}), 400
+            goal_id = transaction_store.add_goal(request_user_id(goal), goal)
+            return jsonify({'success': True, 'goalId': goal_id})
         else:
-            return jsonify({'goals': []})
+            return jsonify({'goals': transaction_store.get_goals(request_user_id())})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/user/debts', methods=['GET', 'POST'])
+def handle_user_debts():
+    try:
+        if request.method == 'POST':
+            data = request.json
+            debts = data.get('debts', [])
+            if not validate_debt_data(debts):
+                return jsonify({'error': 'Invalid debt data'}), 400
+            transaction_store.set_debts(request_user_id(data), debts_from_dicts(debts))
+            return jsonify({'success': True, 'count': len(debts)})
+        return jsonify({'debts': transaction_store.get_debts(request_user_id())})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -225,9 +431,9 @@ def handle_goals():
 def analyze_debt():
     try:
         data = request.json
-        debts = data.get('debts', [])
-        if not validate_debt_data(debts):
+        if 'debts' in data and not validate_debt_data(data['debts']):
             return jsonify({'error': 'Invalid debt data'}), 400
+        debts = request_debts(data)
         result = debt_agent.analyze(debts)
         return jsonify(result)
     except Exception as e:
@@ -238,7 +444,7 @@ def get_payoff_plan():
     try:
         data = request.json
         result = debt_agent.create_payoff_plan(
-            data.get('debts', []),
+            request_debts(data),
             data.get('extraPayment', 0),
             data.get('method', 'avalanche')
         )
@@ -251,20 +457,72 @@ def compare_methods():
     try:
         data = request.json
         result = debt_agent.compare_methods(
-            data.get('debts', []),
+            request_debts(data),
             data.get('extraPayment', 0)
         )
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/debt/strategies', methods=['POST'])
+def compare_strategies():
+    try:
+        data = request.json
+        if 'debts' in data and not validate_debt_data(data['debts']):
+            return jsonify({'error': 'Invalid debt data'}), 400
+        debts = request_debts(data)
+        result = debt_agent.compare_strategies(
+            debts,
+            data.get('extraPayment', 0),
+            data.get('strategies')
+        )
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/debt/extra-payment-sweep', methods=['POST'])
+def sweep_extra_payments():
+    try:
+        data = request.json
+        if 'debts' in data and not validate_debt_data(data['debts']):
+            return jsonify({'error': 'Invalid debt data'}), 400
+        debts = request_debts(data)
+        
+        extra_payments = data.get('extraPayments')
+        if extra_payments is None:
+            # Inclusive range, e.g. {'start': 0, 'stop': 1000, 'step': 50}
+            sweep = data.get('extraPaymentRange', {})
+            start = float(sweep.get('start', 0))
+            stop = float(sweep.get('stop', 1000))
+            step = float(sweep.get('step', 50))
+            if step <= 0:
+                return jsonify({'error': 'step must be positive'}), 400
+            steps = (stop - start) / step
+            if not steps >= 0:
+                return jsonify({'error': 'stop must not be less than start'}), 400
+            # Size the range before building it; the epsilon keeps an endpoint
+            # that float division lands just short of (0 to 0.3 by 0.1)
+            count = int(steps + 1e-9) + 1 if steps < Config.MAX_SWEEP_SCENARIOS else Config.MAX_SWEEP_SCENARIOS + 1
+            if count > Config.MAX_SWEEP_SCENARIOS:
+                return jsonify({'error': f'At most {Config.MAX_SWEEP_SCENARIOS} extra payment values per request'}), 400
+            values = start + np.arange(count) * step
+            if abs(values[-1] - stop) < 1e-9 * step:
+                values[-1] = stop
+            extra_payments = values.tolist()
+        
+        if len(extra_payments) > Config.MAX_SWEEP_SCENARIOS:
+            return jsonify({'error': f'At most {Config.MAX_SWEEP_SCENARIOS} extra payment values per request'}), 400
+        
+        result = debt_agent.sweep_extra_payments(debts, extra_payments)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
 # ============================================
 # CHAT ROUTE - WORKING VERSION
 # ============================================
 @app.route('/api/chat', methods=['POST'])
 def chat():
-    global GEMINI_MODEL, AI_ENABLED
-    
     try:
         data = request.json
         message = data.get('message', '')
@@ -274,12 +532,12 @@ def chat():
         print(f"💬 CHAT REQUEST")
         print(f"{'='*60}")
         print(f"Message: {message}")
-        print(f"AI Enabled: {AI_ENABLED}")
-        print(f"Model: {MODEL_NAME}")
+        print(f"AI Enabled: {llm_client.available}")
+        print(f"Model: {model_registry.model_name}")
         print(f"{'='*60}")
         
         # Check if AI is ready
-        if not AI_ENABLED or not GEMINI_MODEL:
+        if not llm_client.available:
             print("⚠️ AI not enabled - returning fallback")
             return jsonify({
                 'message': generate_fallback_response(message, context),
@@ -289,32 +547,11 @@ def chat():
         
         # Generate AI response
         try:
-            total_expenses = sum(exp.get('amount', 0) for exp in context.get('expenses', []))
-            
-            prompt = f"""You are FinMate, a friendly financial advisor AI.
-
-USER'S FINANCES:
-- Income: ${context.get('income', 0):,.2f}
-- Expenses: ${total_expenses:,.2f}
-- Debts: {len(context.get('debts', []))}
-
-QUESTION: {message}
-
-Provide helpful, specific advice in 2-3 paragraphs. Use emojis. Be friendly and actionable."""
+            prompt = build_chat_prompt(message, context)
 
             print("🔄 Generating response...")
             
-            response = GEMINI_MODEL.generate_content(
-                prompt,
-                generation_config={
-                    'temperature': 0.7,
-                    'top_p': 0.8,
-                    'top_k': 40,
-                    'max_output_tokens': 1024,
-                }
-            )
-            
-            ai_message = response.text
+            ai_message = llm_client.generate(prompt, generation_config=CHAT_GENERATION_CONFIG, site='chat')
             
             print(f"✅ Success! Length: {len(ai_message)} chars")
             print(f"{'='*60}\n")
@@ -323,7 +560,7 @@ Provide helpful, specific advice in 2-3 paragraphs. Use emojis. Be friendly and
                 'message': ai_message,
                 'suggestions': [],
                 'ai_powered': True,
-                'model': MODEL_NAME
+                'model': model_registry.model_name
             })
             
         except Exception as ai_error:
@@ -347,6 +584,77 @@ Provide helpful, specific advice in 2-3 paragraphs. Use emojis. Be friendly and
             'error': str(e)
         }), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Same as /api/chat, but the answer arrives as server-sent events while it is generated"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    message = data.get('message', '')
+    context = data.get('context', {})
+    return Response(
+        stream_with_context(stream_chat_events(message, context)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ''
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def stream_chat_events(message, context):
+    """
+    Emit ``chunk`` events with text as it arrives, then one ``done`` event.
+
+    If the model is unavailable or fails mid-stream, a ``fallback`` event
+    carries the full fallback response. The client should replace any partial
+    text with it.
+    """
+    # Flush headers right away so the client sees the first byte immediately
+    yield ': connected\n\n'
+
+    if not llm_client.available:
+        yield sse_event({'message': generate_fallback_response(message, context)}, 'fallback')
+        yield sse_event({'ai_powered': False}, 'done')
+        return
+
+    try:
+        prompt = build_chat_prompt(message, context)
+        for text in llm_client.stream(prompt, generation_config=CHAT_GENERATION_CONFIG, site='chat'):
+            yield sse_event({'text': text}, 'chunk')
+    except Exception as ai_error:
+        print(f"❌ AI Stream Error: {ai_error}")
+        yield sse_event({
+            'message': generate_fallback_response(message, context, str(ai_error)),
+            'error': str(ai_error)
+        }, 'fallback')
+        yield sse_event({'ai_powered': False}, 'done')
+        return
+
+    yield sse_event({'ai_powered': True, 'model': model_registry.model_name}, 'done')
+
+CHAT_GENERATION_CONFIG = {
+    'temperature': 0.7,
+    'top_p': 0.8,
+    'top_k': 40,
+    'max_output_tokens': 1024,
+}
+
+@timed('prompt_build')
+def build_chat_prompt(message, context):
+    total_expenses = sum(exp.get('amount', 0) for exp in context.get('expenses', []))
+    
+    return f"""You are FinMate, a friendly financial advisor AI.
+
+USER'S FINANCES:
+- Income: ${context.get('income', 0):,.2f}
+- Expenses: ${total_expenses:,.2f}
+- Debts: {len(context.get('debts', []))}
+
+QUESTION: {message}
+
+Provide helpful, specific advice in 2-3 paragraphs. Use emojis. Be friendly and actionable."""
+
 def generate_fallback_response(message, context, error=None):
     """Generate a helpful fallback response when AI is unavailable"""
     
@@ -407,6 +715,70 @@ Add to backend/.env
     
     return response
 
+@app.route('/api/llm/cache', methods=['GET'])
+def llm_cache_stats():
+    return jsonify(llm_client.cache.stats())
+
+@app.route('/api/uploads/stats', methods=['GET'])
+def upload_store_stats():
+    return jsonify(upload_store.stats())
+
+@app.route('/api/llm/stats', methods=['GET'])
+def llm_client_stats():
+    return jsonify(llm_client.stats())
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def collect_runtime_gauges():
+    llm = llm_client.stats()
+    categories = expense_analyzer.cache_stats()
+    return [
+        ('financial_coach_llm_in_flight', 'Model calls currently running', {(): llm['inFlight']}, ()),
+        ('financial_coach_llm_queued', 'Model calls waiting for a slot', {(): llm['queued']}, ()),
+        ('financial_coach_llm_events', 'Cumulative LLM client events', {
+            ('completed',): llm['completed'],
+            ('errors',): llm['errors'],
+            ('coalesced',): llm['singleFlight']['coalesced'],
+            ('rejected_rate_limit',): llm['rejectedRateLimit'],
+            ('rejected_queue_full',): llm['rejectedQueueFull'],
+            ('timed_out_waiting',): llm['timedOutWaiting'],
+        }, ('event',)),
+        ('financial_coach_category_cache', 'Merchant categorization cache counters', {
+            ('hits',): categories['hits'],
+            ('misses',): categories['misses'],
+            ('size',): categories['size'],
+        }, ('counter',)),
+    ]
+
+metrics.register_collector(collect_runtime_gauges)
+
+def profiling_forbidden():
+    """Error response unless profiling is on and the admin token matches, else None"""
+    if not Config.PROFILING_ENABLED:
+        return jsonify({'error': 'Not found'}), 404
+    if not profiler.authorized(request.headers.get('X-Admin-Token')):
+        return jsonify({'error': 'Forbidden'}), 403
+    return None
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    forbidden = profiling_forbidden()
+    if forbidden:
+        return forbidden
+    return jsonify({'profiles': profiler.list_profiles()})
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    forbidden = profiling_forbidden()
+    if forbidden:
+        return forbidden
+    summary = profiler.get_profile(profile_id)
+    if summary is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify(summary)
+
 @app.route('/api/sample-data', methods=['GET'])
 def get_sample_data():
     try:
@@ -428,19 +800,35 @@ def get_sample_data():
 
 @app.route('/api/dashboard', methods=['GET'])
 def get_dashboard():
+    user_id = request_user_id()
+    income = transaction_store.get_income(user_id)
+    # Aggregates come from the monthly rollups, so cost does not grow with history
+    rollup = transaction_store.rollup(user_id)
+    months = rollup.monthly_totals()
+    monthly_average = sum(total for _, total, _, _ in months) / len(months) if months else 0
+    category_totals = rollup.category_totals()
     return jsonify({
-        'income': 5000,
-        'expenses': [],
-        'debts': [],
-        'goals': [],
-        'insights': {'savingsRate': 0, 'topCategory': 'N/A', 'monthlyAverage': 0}
+        'income': income,
+        'expenses': transaction_store.transactions(user_id, limit=Config.DASHBOARD_RECENT_TRANSACTIONS,
+                                                   newest_first=True),
+        'debts': transaction_store.get_debts(user_id),
+        'goals': transaction_store.get_goals(user_id),
+        'insights': {
+            'savingsRate': round((income - monthly_average) / income * 100, 2) if income > 0 else 0,
+            'topCategory': max(category_totals, key=category_totals.get) if category_totals else 'N/A',
+            'monthlyAverage': round(monthly_average, 2)
+        }
     })
 
 @app.route('/api/user/income', methods=['POST'])
 def update_income():
     try:
         data = request.json
-        return jsonify({'success': True, 'income': data.get('income', 0)})
+        income = float(data.get('income', 0))
+        if income < 0:
+            return jsonify({'error': 'income must not be negative'}), 400
+        transaction_store.set_income(request_user_id(data), income)
+        return jsonify({'success': True, 'income': income})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -456,13 +844,17 @@ def internal_error(e):
 # RUN
 # ============================================
 if __name__ == '__main__':
+    # Fork the upload parser processes while this is still the only thread
+    start_pool()
+    model_registry.start()
+
     print("\n" + "="*60)
     print("🚀 AI FINANCIAL COACH - Backend Server")
     print("="*60)
     print("📍 Server: http://localhost:5000")
-    print(f"🤖 AI Status: {'✅ ENABLED' if AI_ENABLED else '❌ DISABLED'}")
-    if AI_ENABLED:
-        print(f"🤖 Model: {MODEL_NAME}")
+    print(f"🤖 AI Status: {model_registry.status}")
+    if model_registry.enabled:
+        print(f"🤖 Model: {model_registry.model_name}")
     print("="*60 + "\n")
     
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""Synthetic, reproducible transactions and debts for benchmarks and load tests"""
+import csv
+import datetime
+import io
+import random
+
+# (category, merchant templates, typical amount range); '{n}' becomes a store/trip number
+MERCHANTS = [
+    ('Food', ['GROCERY OUTLET #{n}', 'Whole Foods Market {n}', 'STARBUCKS COFFEE #{n}', 'Pizza Place', 'Cafe Rio {n}'], (4, 180)),
+    ('Transportation', ['UBER *TRIP {n}', 'LYFT RIDE {n}', 'SHELL GAS #{n}', 'City Parking {n}'], (5, 90)),
+    ('Housing', ['Monthly Rent', 'MORTGAGE PMT {n}'], (900, 2500)),
+    ('Utilities', ['Electric Co', 'COMCAST INTERNET {n}', 'Water Utility', 'Phone Bill {n}'], (30, 250)),
+    ('Entertainment', ['NETFLIX.COM', 'SPOTIFY USA', 'AMC Movie #{n}', 'Concert Tickets {n}'], (9, 150)),
+    ('Shopping', ['AMAZON MKTP US*{n}', 'Target Store #{n}', 'Mall Clothing {n}'], (10, 400)),
+    ('Other', ['Venmo Transfer {n}', 'ATM Withdrawal {n}', 'Misc Purchase {n}'], (5, 300)),
+]
+WEIGHTS = [30, 20, 2, 8, 10, 20, 10]
+
+DEBT_TYPES = [
+    ('Credit Card', (15, 29), (500, 15000)),
+    ('Car Loan', (3, 9), (5000, 40000)),
+    ('Student Loan', (3, 7), (5000, 80000)),
+    ('Personal Loan', (7, 18), (1000, 20000)),
+    ('Medical Bill', (0, 5), (200, 8000)),
+]
+
+
+def iter_expenses(n, seed=0, start='2024-01-01', days=365, with_category=True):
+    """Yield n expense dicts spread over ``days`` starting at ``start``"""
+    rng = random.Random(seed)
+    start_date = datetime.date.fromisoformat(start)
+    for _ in range(n):
+        category, templates, (low, high) = rng.choices(MERCHANTS, WEIGHTS)[0]
+        expense = {
+            'date': (start_date + datetime.timedelta(days=rng.randrange(days))).isoformat(),
+            'amount': round(rng.uniform(low, high), 2),
+            'description': rng.choice(templates).format(n=rng.randrange(1, 10000)),
+        }
+        if with_category:
+            expense['category'] = category
+        yield expense
+
+
+def generate_expenses(n, seed=0, **kwargs):
+    return list(iter_expenses(n, seed, **kwargs))
+
+
+def write_csv(target, n, seed=0, **kwargs):
+    """Write n expenses as CSV to a path or open text file; returns the row count"""
+    fields = ['date', 'category', 'amount', 'description']
+    if isinstance(target, str):
+        with open(target, 'w', newline='', encoding='utf-8') as file:
+            return write_csv(file, n, seed, **kwargs)
+    writer = csv.DictWriter(target, fieldnames=fields)
+    writer.writeheader()
+    for expense in iter_expenses(n, seed, **kwargs):
+        writer.writerow(expense)
+    return n
+
+
+def csv_bytes(n, seed=0, **kwargs):
+    buffer = io.StringIO()
+    write_csv(buffer, n, seed, **kwargs)
+    return buffer.getvalue().encode('utf-8')
+
+
+def generate_debts(n, seed=0):
+    """n debts whose minimum payments always cover the first month's interest"""
+    rng = random.Random(seed)
+    debts = []
+    for i in range(n):
+        kind, (rate_low, rate_high), (balance_low, balance_high) = rng.choice(DEBT_TYPES)
+        balance = round(rng.uniform(balance_low, balance_high), 2)
+        rate = round(rng.uniform(rate_low, rate_high), 2)
+        interest = balance * rate / 100 / 12
+        debts.append({
+            'name': f"{kind} {i + 1}",
+            'balance': balance,
+            'rate': rate,
+            'minPayment': round(max(25, interest * 1.5, balance * 0.02), 2),
+        })
+    return debts
@@ -0,0 +1,351 @@
+"""
+End-to-end load test: drives every API route with realistic payloads at a
+given concurrency and reports throughput and p50/p95/p99 latency per endpoint.
+
+By default the app runs in-process with the offline fake model, so no
+server, API key or network is needed:
+
+    cd backend
+    python -m benchmarks.load_test --requests 200 --concurrency 16
+    python -m benchmarks.load_test --only debt --json results.json
+
+To load a running server (start it with LLM_BACKEND=fake to stay offline):
+
+    python -m benchmarks.load_test --url http://localhost:5000
+"""
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.generators import csv_bytes, generate_debts, generate_expenses
+
+
+class Scenario:
+    """One endpoint: ``build(i, rng)`` returns (path, json_body, csv_body) for request i"""
+
+    def __init__(self, name, method, build, stream=False, setup=None):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.stream = stream
+        self.setup = setup
+
+
+def build_scenarios(expense_count=200, debt_count=8, upload_rows=2000, seed=0):
+    expenses = generate_expenses(expense_count, seed)
+    debts = generate_debts(debt_count, seed)
+    upload = csv_bytes(upload_rows, seed)
+    descriptions = [expense['description'] for expense in generate_expenses(200, seed + 1, with_category=False)]
+    delete_ids = []
+
+    def income(rng):
+        # Rounded figures, as users enter them: repeats exercise the LLM cache and coalescing
+        return rng.randrange(30, 81) * 100
+
+    def chat_body(rng):
+        question = rng.choice(['How can I save more?', 'Help me budget', 'Should I pay off debt first?',
+                               'Analyze my expenses'])
+        return {'message': question, 'context': {'income': income(rng), 'expenses': expenses[:20], 'debts': debts}}
+
+    def setup_deletes(client, count):
+        status, body = client.fetch('POST', '/api/ledger/loadtest-delete/transactions',
+                                    {'expenses': generate_expenses(count, seed + 2)})
+        delete_ids[:] = body['ids']
+
+    return [
+        Scenario('GET /', 'GET', lambda i, rng: ('/', None, None)),
+        Scenario('GET /api/sample-data', 'GET', lambda i, rng: ('/api/sample-data', None, None)),
+        Scenario('GET /api/dashboard', 'GET', lambda i, rng: ('/api/dashboard', None, None)),
+        Scenario('POST /api/user/income', 'POST',
+                 lambda i, rng: ('/api/user/income', {'income': income(rng)}, None)),
+        Scenario('POST /api/budget/analyze', 'POST',
+                 lambda i, rng: ('/api/budget/analyze', {'income': income(rng), 'expenses': expenses}, None)),
+        Scenario('POST /api/expenses/upload', 'POST',
+                 lambda i, rng: ('/api/expenses/upload', None, upload)),
+        Scenario('POST /api/expenses/analyze', 'POST',
+                 lambda i, rng: ('/api/expenses/analyze', {'expenses': expenses}, None)),
+        Scenario('POST /api/expenses/categorize', 'POST',
+                 lambda i, rng: ('/api/expenses/categorize', {'description': rng.choice(descriptions)}, None)),
+        Scenario('POST /api/expenses/categorize (batch)', 'POST',
+                 lambda i, rng: ('/api/expenses/categorize', {'descriptions': descriptions}, None)),
+        Scenario('GET /api/expenses/categorize/cache', 'GET',
+                 lambda i, rng: ('/api/expenses/categorize/cache', None, None)),
+        Scenario('POST /api/ledger/<user>/transactions', 'POST',
+                 lambda i, rng: (f'/api/ledger/loadtest-{i % 50}/transactions',
+                                 {'expenses': [rng.choice(expenses)]}, None)),
+        Scenario('GET /api/ledger/<user>', 'GET',
+                 lambda i, rng: (f'/api/ledger/loadtest-{i % 50}', None, None)),
+        Scenario('DELETE /api/ledger/<user>/transactions/<id>', 'DELETE',
+                 lambda i, rng: (f'/api/ledger/loadtest-delete/transactions/{delete_ids[i]}', None, None),
+                 setup=setup_deletes),
+        Scenario('POST /api/savings/strategy', 'POST',
+                 lambda i, rng: ('/api/savings/strategy', {'income': income(rng), 'expenses': expenses}, None)),
+        Scenario('POST /api/savings/projection', 'POST',
+                 lambda i, rng: ('/api/savings/projection', {
+                     'income': income(rng), 'expenses': expenses, 'paths': 2000, 'months': 120,
+                     'goals': [{'name': 'Vacation', 'targetAmount': 5000, 'currentAmount': 500}]
+                 }, None)),
+        Scenario('GET /api/savings/goals', 'GET', lambda i, rng: ('/api/savings/goals', None, None)),
+        Scenario('POST /api/savings/goals', 'POST',
+                 lambda i, rng: ('/api/savings/goals', {'name': 'Car', 'targetAmount': 8000}, None)),
+        Scenario('POST /api/debt/analyze', 'POST',
+                 lambda i, rng: ('/api/debt/analyze', {'debts': debts}, None)),
+        Scenario('POST /api/debt/payoff-plan', 'POST',
+                 lambda i, rng: ('/api/debt/payoff-plan', {'debts': debts, 'extraPayment': rng.randrange(0, 1000, 50),
+                                                           'method': rng.choice(['avalanche', 'snowball'])}, None)),
+        Scenario('POST /api/debt/compare', 'POST',
+                 lambda i, rng: ('/api/debt/compare', {'debts': debts, 'extraPayment': rng.randrange(0, 1000, 50)}, None)),
+        Scenario('POST /api/debt/strategies', 'POST',
+                 lambda i, rng: ('/api/debt/strategies', {'debts': debts, 'extraPayment': rng.randrange(0, 1000, 50)}, None)),
+        Scenario('POST /api/debt/extra-payment-sweep', 'POST',
+                 lambda i, rng: ('/api/debt/extra-payment-sweep', {
+                     'debts': debts, 'extraPaymentRange': {'start': 0, 'stop': 1000, 'step': 50}
+                 }, None)),
+        Scenario('POST /api/chat', 'POST', lambda i, rng: ('/api/chat', chat_body(rng), None)),
+        Scenario('POST /api/chat/stream', 'POST', lambda i, rng: ('/api/chat/stream', chat_body(rng), None),
+                 stream=True),
+        Scenario('GET /api/llm/cache', 'GET', lambda i, rng: ('/api/llm/cache', None, None)),
+        Scenario('GET /api/llm/stats', 'GET', lambda i, rng: ('/api/llm/stats', None, None)),
+    ]
+
+
+class InProcessClient:
+    """Calls the Flask app directly through its test client (one per thread)"""
+
+    def __init__(self):
+        import app as backend_app
+        self.app = backend_app.app
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def request(self, method, path, json_body=None, csv_body=None, stream=False):
+        """Returns (status, seconds to first event or None, total seconds)"""
+        kwargs = {'json': json_body} if json_body is not None else {}
+        if csv_body is not None:
+            kwargs = {'data': csv_body, 'content_type': 'text/csv'}
+        started = time.perf_counter()
+        response = self._client().open(path, method=method, buffered=False, **kwargs)
+        first_event = None
+        for chunk in response.iter_encoded():
+            if stream and first_event is None and (b'event: chunk' in chunk or b'event: fallback' in chunk):
+                first_event = time.perf_counter() - started
+        response.close()
+        return response.status_code, first_event, time.perf_counter() - started
+
+    def fetch(self, method, path, json_body=None):
+        response = self._client().open(path, method=method, json=json_body)
+        return response.status_code, response.get_json()
+
+
+class HttpClient:
+    """Calls a running server over HTTP"""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _open(self, method, path, json_body=None, csv_body=None):
+        data, headers = None, {}
+        if json_body is not None:
+            data, headers = json.dumps(json_body).encode('utf-8'), {'Content-Type': 'application/json'}
+        if csv_body is not None:
+            data, headers = csv_body, {'Content-Type': 'text/csv'}
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            return e
+
+    def request(self, method, path, json_body=None, csv_body=None, stream=False):
+        started = time.perf_counter()
+        first_event = None
+        with self._open(method, path, json_body, csv_body) as response:
+            if stream:
+                for line in response:
+                    if first_event is None and line.startswith((b'event: chunk', b'event: fallback')):
+                        first_event = time.perf_counter() - started
+            else:
+                response.read()
+            status = response.status
+        return status, first_event, time.perf_counter() - started
+
+    def fetch(self, method, path, json_body=None):
+        with self._open(method, path, json_body) as response:
+            return response.status, json.loads(response.read() or b'null')
+
+
+def percentiles(values):
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None}
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+    return {'p50': round(float(p50), 2), 'p95': round(float(p95), 2), 'p99': round(float(p99), 2)}
+
+
+def summarize(name, samples, wall_seconds):
+    latencies = [total for status, first_event, total in samples]
+    first_events = [first_event for status, first_event, total in samples if first_event is not None]
+    errors = sum(1 for status, first_event, total in samples if status is None or status >= 400)
+    result = {
+        'endpoint': name,
+        'requests': len(samples),
+        'errors': errors,
+        'throughput': round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+        'latencyMs': percentiles(latencies),
+    }
+    if first_events:
+        result['firstEventMs'] = percentiles(first_events)
+    return result
+
+
+def run_one(client, scenario, i, seed):
+    # Seeded per endpoint so e.g. /api/chat and /api/chat/stream send different prompts
+    rng = random.Random(f"{seed}:{scenario.name}:{i}")
+    path, json_body, csv_body = scenario.build(i, rng)
+    try:
+        return client.request(scenario.method, path, json_body, csv_body, scenario.stream)
+    except Exception as e:
+        print(f"❌ {scenario.name}: {e}", file=sys.stderr)
+        return None, None, 0.0
+
+
+def run_scenario(client, scenario, requests, concurrency, seed):
+    """Fire ``requests`` calls at one endpoint, ``concurrency`` at a time"""
+    if scenario.setup:
+        scenario.setup(client, requests)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(lambda i: run_one(client, scenario, i, seed), range(requests)))
+    return summarize(scenario.name, samples, time.perf_counter() - started)
+
+
+def run_mixed(client, scenarios, requests, concurrency, seed):
+    """Interleave every endpoint in one run, as real traffic would; throughput is per endpoint share"""
+    for scenario in scenarios:
+        if scenario.setup:
+            scenario.setup(client, requests)
+    jobs = [(scenario, i) for scenario in scenarios for i in range(requests)]
+    random.Random(seed).shuffle(jobs)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(lambda job: run_one(client, job[0], job[1], seed), jobs))
+    wall = time.perf_counter() - started
+    by_scenario = {}
+    for (scenario, i), sample in zip(jobs, samples):
+        by_scenario.setdefault(scenario.name, []).append(sample)
+    return [summarize(scenario.name, by_scenario[scenario.name], wall) for scenario in scenarios]
+
+
+def print_report(results):
+    header = f"{'endpoint':<48} {'reqs':>5} {'err':>4} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'1st evt p50':>12}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        latency = result['latencyMs']
+        first = result.get('firstEventMs', {}).get('p50')
+        print(f"{result['endpoint']:<48} {result['requests']:>5} {result['errors']:>4} "
+              f"{result['throughput'] or 0:>8.1f} {latency['p50'] or 0:>9.2f} {latency['p95'] or 0:>9.2f} "
+              f"{latency['p99'] or 0:>9.2f} {first if first is not None else '':>12}")
+
+
+def quiet(verbose):
+    """Silence the app's per-request logging unless asked for it"""
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test every API route")
+    parser.add_argument('--url', help="Base URL of a running server (default: in-process app)")
+    parser.add_argument('--requests', type=int, default=100, help="Requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--only', help="Run only endpoints whose name contains this text")
+    parser.add_argument('--mix', action='store_true', help="Interleave all endpoints in one run")
+    parser.add_argument('--expenses', type=int, default=200, help="Expenses per JSON payload")
+    parser.add_argument('--debts', type=int, default=8, help="Debts per payload")
+    parser.add_argument('--upload-rows', type=int, default=2000, help="Rows per uploaded CSV")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=300, help="Fake model median latency")
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help="Fake model lognormal shape")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fake model failure probability")
+    parser.add_argument('--rpm', type=int, help="Override LLM_REQUESTS_PER_MINUTE (in-process only)")
+    parser.add_argument('--tpm', type=int, help="Override LLM_TOKENS_PER_MINUTE (in-process only)")
+    parser.add_argument('--json', dest='json_path', help="Write results to this JSON file")
+    parser.add_argument('--verbose', action='store_true', help="Show the app's own logging")
+    args = parser.parse_args(argv)
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+
+    if args.url:
+        client = HttpClient(args.url)
+    else:
+        # Must be set before the app (and its Config) is imported
+        os.environ.setdefault('LLM_BACKEND', 'fake')
+        os.environ['FAKE_LLM_LATENCY_MS'] = str(args.latency_ms)
+        os.environ['FAKE_LLM_LATENCY_SIGMA'] = str(args.latency_sigma)
+        os.environ['FAKE_LLM_ERROR_RATE'] = str(args.error_rate)
+        os.environ.setdefault('FAKE_LLM_SEED', str(args.seed))
+        if args.rpm:
+            os.environ['LLM_REQUESTS_PER_MINUTE'] = str(args.rpm)
+        if args.tpm:
+            os.environ['LLM_TOKENS_PER_MINUTE'] = str(args.tpm)
+        # Keep load-test users and uploads out of the developer's database and upload store
+        data_dir = tempfile.mkdtemp(prefix='loadtest-')
+        atexit.register(shutil.rmtree, data_dir, ignore_errors=True)
+        os.environ['DATABASE_PATH'] = os.path.join(data_dir, 'finance.db')
+        os.environ['UPLOAD_FOLDER'] = os.path.join(data_dir, 'uploads')
+        os.environ['PROFILE_DIR'] = os.path.join(data_dir, 'profiles')
+        os.chdir(BACKEND_DIR)
+        with quiet(args.verbose):
+            client = InProcessClient()
+
+    scenarios = build_scenarios(args.expenses, args.debts, args.upload_rows, args.seed)
+    if args.only:
+        scenarios = [scenario for scenario in scenarios if args.only.lower() in scenario.name.lower()]
+
+    print(f"🚀 {len(scenarios)} endpoints × {args.requests} requests, concurrency {args.concurrency}"
+          f" ({args.url or 'in-process, fake model'})\n")
+    with quiet(args.verbose):
+        if args.mix:
+            results = run_mixed(client, scenarios, args.requests, args.concurrency, args.seed)
+        else:
+            results = [run_scenario(client, scenario, args.requests, args.concurrency, args.seed)
+                       for scenario in scenarios]
+
+    print_report(results)
+    try:
+        status, llm_stats = client.fetch('GET', '/api/llm/stats')
+    except Exception:
+        status, llm_stats = None, None
+    if status == 200:
+        print(f"\n🤖 LLM: {llm_stats.get('calls')} upstream calls, {llm_stats.get('cacheHits')} cache hits, "
+              f"{llm_stats.get('singleFlight', {}).get('coalesced')} coalesced, "
+              f"{llm_stats.get('rejectedRateLimit', 0) + llm_stats.get('rejectedQueueFull', 0)} shed")
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as file:
+            json.dump({'config': vars(args), 'results': results, 'llm': llm_stats}, file, indent=2)
+        print(f"💾 Results written to {json_path}")
+
+    return 1 if any(result['errors'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+Micro-benchmarks for the parsing and analysis hot paths.
+
+Each case runs on synthetic data at several sizes and records the best and
+median wall time. It also records peak traced memory from a separate run
+under tracemalloc. Results can be saved as JSON and compared to a baseline;
+a case that is slower (or uses more memory) by more than the threshold
+counts as a regression and makes the run exit non-zero.
+
+    cd backend
+    python -m benchmarks.micro --scale small --save-baseline
+    python -m benchmarks.micro --scale small --compare          # after a change
+    python -m benchmarks.micro --scale full --only csv --json out.json
+
+Generated CSV files are kept in benchmarks/.data so large sizes are only
+written once.
+"""
+import argparse
+import contextlib
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+
+from agents.debt_agent import DebtAgent
+from agents.expense_analyzer import ExpenseAnalyzer
+from benchmarks.generators import generate_debts, generate_expenses, write_csv
+from utils.csv_processor import CSVProcessor
+from utils.records import debts_from_dicts, transactions_from_dicts
+from utils.validators import validate_debt_data, validate_expense_data
+
+DATA_DIR = os.path.join(BENCHMARK_DIR, '.data')
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+SCALES = {
+    'small': {'transactions': [10, 1000, 10000], 'debts': [1, 10, 50]},
+    'medium': {'transactions': [10, 10000, 100000, 1000000], 'debts': [1, 10, 100, 500]},
+    'full': {'transactions': [10, 10000, 1000000, 10000000], 'debts': [1, 10, 100, 500]},
+}
+
+# Cases that hold every row as a Python dict are skipped above this size
+MAX_LIST_ROWS = 1000000
+
+
+def csv_path(n, seed):
+    """Path of a cached synthetic CSV with n rows, writing it on first use"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"transactions_{n}_{seed}.csv")
+    if not os.path.exists(path):
+        print(f"   📝 generating {n:,} transactions...", file=sys.stderr)
+        tmp_path = path + '.tmp'
+        write_csv(tmp_path, n, seed)
+        os.replace(tmp_path, path)
+    return path
+
+
+# Each case: (name, size axis, setup(n, seed) -> zero-argument callable or None to skip)
+def _process_file(n, seed):
+    if n > MAX_LIST_ROWS:
+        return None
+    path, processor = csv_path(n, seed), CSVProcessor()
+    return lambda: processor.process_file(path)
+
+
+def _process_table(n, seed):
+    path, processor = csv_path(n, seed), CSVProcessor()
+    return lambda: processor.process_table(path)
+
+
+def _categorize(n, seed):
+    if n > MAX_LIST_ROWS:
+        return None
+    descriptions = [e['description'] for e in generate_expenses(n, seed, with_category=False)]
+
+    def run():
+        # Fresh analyzer so every run starts with a cold category cache
+        analyzer = ExpenseAnalyzer()
+        for description in descriptions:
+            analyzer.categorize(description, 0)
+    return run
+
+
+def _analyze_list(n, seed):
+    if n > MAX_LIST_ROWS:
+        return None
+    expenses, analyzer = transactions_from_dicts(generate_expenses(n, seed)), ExpenseAnalyzer()
+    return lambda: analyzer.analyze(expenses)
+
+
+def _analyze_table(n, seed):
+    table, analyzer = CSVProcessor().process_table(csv_path(n, seed)), ExpenseAnalyzer()
+    return lambda: analyzer.analyze(table)
+
+
+def _validate_expenses(n, seed):
+    if n > MAX_LIST_ROWS:
+        return None
+    expenses = generate_expenses(n, seed)
+    return lambda: validate_expense_data(expenses)
+
+
+def _validate_debts(n, seed):
+    debts = generate_debts(n, seed)
+    return lambda: validate_debt_data(debts)
+
+
+def _payoff_plan(n, seed):
+    debts, agent = debts_from_dicts(generate_debts(n, seed)), DebtAgent()
+    return lambda: agent.create_payoff_plan(debts, 200, 'avalanche')
+
+
+def _compare_methods(n, seed):
+    debts, agent = debts_from_dicts(generate_debts(n, seed)), DebtAgent()
+    return lambda: agent.compare_methods(debts, 200)
+
+
+CASES = [
+    ('csv.process_file', 'transactions', _process_file),
+    ('csv.process_table', 'transactions', _process_table),
+    ('expenses.categorize', 'transactions', _categorize),
+    ('expenses.analyze(list)', 'transactions', _analyze_list),
+    ('expenses.analyze(table)', 'transactions', _analyze_table),
+    ('validate.expenses', 'transactions', _validate_expenses),
+    ('validate.debts', 'debts', _validate_debts),
+    ('debt.create_payoff_plan', 'debts', _payoff_plan),
+    ('debt.compare_methods', 'debts', _compare_methods),
+]
+
+
+def measure(fn, repeat, budget, track_memory):
+    """
+    Best and median seconds plus peak traced bytes.
+
+    Fast cases run at least ``repeat`` times and keep going until ``budget``
+    seconds are spent, so their minimum is stable. A case slower than the
+    budget runs once.
+    """
+    times = []
+    gc.collect()
+    # As in timeit: no collector pauses inside the timed runs
+    gc.disable()
+    try:
+        while len(times) < 10000:
+            started = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - started)
+            if times[-1] >= budget or (len(times) >= repeat and sum(times) >= budget):
+                break
+    finally:
+        gc.enable()
+
+    peak = None
+    if track_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'seconds': round(min(times), 6),
+        'median': round(statistics.median(times), 6),
+        'runs': len(times),
+        'peakBytes': peak,
+    }
+
+
+def run(scale, only=None, repeat=5, budget=0.5, track_memory=True, seed=0):
+    sizes = SCALES[scale]
+    results = {}
+    devnull = open(os.devnull, 'w')
+    for name, axis, setup in CASES:
+        if only and only not in name:
+            continue
+        for n in sizes[axis]:
+            key = f"{name}[{axis}={n}]"
+            fn = setup(n, seed)
+            if fn is None:
+                continue
+            # The processors log per call; keep that out of the timings
+            with contextlib.redirect_stdout(devnull):
+                result = measure(fn, repeat, budget, track_memory)
+            results[key] = result
+            peak = f"{result['peakBytes'] / 1e6:9.2f} MB" if result['peakBytes'] is not None else ''
+            print(f"{key:<48} {result['seconds'] * 1000:>11.3f} ms  (median {result['median'] * 1000:.3f}, "
+                  f"{result['runs']} runs) {peak}")
+    return results
+
+
+def compare(results, baseline, threshold, noise_floor=0.001):
+    """
+    Regressions where median time or peak memory grew by more than
+    ``threshold`` (a fraction). Medians are used because one lucky run can
+    make a baseline minimum unrepeatable.
+    """
+    regressions = []
+    print(f"\n{'case':<48} {'baseline p50':>12} {'current p50':>12} {'change':>8}")
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        change = current['median'] / previous['median'] - 1 if previous['median'] else 0.0
+        flag = ''
+        # Ignore sub-millisecond jitter on tiny cases
+        if change > threshold and current['median'] - previous['median'] > noise_floor:
+            flag = '⚠️ slower'
+            regressions.append({'case': key, 'metric': 'median', 'change': round(change, 4)})
+        if current.get('peakBytes') and previous.get('peakBytes'):
+            memory_change = current['peakBytes'] / previous['peakBytes'] - 1
+            if memory_change > threshold and current['peakBytes'] - previous['peakBytes'] > 64 * 1024:
+                flag = (flag + ' ⚠️ memory').strip()
+                regressions.append({'case': key, 'metric': 'peakBytes', 'change': round(memory_change, 4)})
+        print(f"{key:<48} {previous['median'] * 1000:>12.3f} {current['median'] * 1000:>12.3f} "
+              f"{change:>+8.1%} {flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for parsing and analysis")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--only', help="Run only cases whose name contains this text")
+    parser.add_argument('--repeat', type=int, default=5, help="Minimum timed runs per case")
+    parser.add_argument('--budget', type=float, default=0.5, help="Seconds to spend repeating each case")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', dest='json_path', help="Write results to this JSON file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="Write these results as the new baseline")
+    parser.add_argument('--compare', action='store_true', help="Compare against the baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown before failing (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    print(f"⏱️  Micro-benchmarks ({args.scale}) on Python {platform.python_version()}, numpy {np.__version__}\n")
+    results = run(args.scale, args.only, args.repeat, args.budget, not args.no_memory, args.seed)
+    report = {
+        'meta': {
+            'scale': args.scale,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.platform(),
+            'createdAt': datetime.datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as file:
+                baseline = json.load(file)
+        except OSError:
+            print(f"❌ No baseline at {args.baseline} (run with --save-baseline first)")
+            return 2
+
+    for path in filter(None, [args.json_path, args.baseline if args.save_baseline else None]):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"💾 Results written to {path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+        print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
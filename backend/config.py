@@ -19,9 +19,91 @@ class Config:
     PORT = int(os.getenv('PORT', '5000'))
     
     # Upload settings
-    UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads'))
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_UPLOAD_MB', '16')) * 1024 * 1024  # 16MB max file size by default
     ALLOWED_EXTENSIONS = {'csv', 'txt'}
+    # Multi-file and .zip uploads: files per request, parser processes and archive limits
+    MAX_UPLOAD_FILES = int(os.getenv('MAX_UPLOAD_FILES', '100'))
+    UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', str(os.cpu_count() or 1)))
+    MAX_ARCHIVE_FILES = int(os.getenv('MAX_ARCHIVE_FILES', '500'))
+    MAX_ARCHIVE_BYTES = int(os.getenv('MAX_ARCHIVE_MB', '256')) * 1024 * 1024
+    # Uploads are stored by content hash with their parses cached; size bound, max age
+    # (files unused this long are deleted) and how often the directory is swept (seconds)
+    UPLOAD_STORE_MAX_BYTES = int(os.getenv('UPLOAD_STORE_MAX_MB', '1024')) * 1024 * 1024
+    UPLOAD_STORE_MAX_AGE = int(os.getenv('UPLOAD_STORE_MAX_AGE', str(7 * 24 * 3600)))
+    UPLOAD_STORE_CLEANUP_INTERVAL = int(os.getenv('UPLOAD_STORE_CLEANUP_INTERVAL', '600'))
+    
+    # Expense categorization
+    CATEGORY_CACHE_SIZE = int(os.getenv('CATEGORY_CACHE_SIZE', '50000'))
+    
+    # Debt scenarios
+    MAX_SWEEP_SCENARIOS = int(os.getenv('MAX_SWEEP_SCENARIOS', '1000'))
+    
+    # Savings projection
+    INCOME_VOLATILITY = float(os.getenv('INCOME_VOLATILITY', '0.05'))
+    MAX_PROJECTION_PATHS = int(os.getenv('MAX_PROJECTION_PATHS', '20000'))
+    MAX_PROJECTION_MONTHS = int(os.getenv('MAX_PROJECTION_MONTHS', '600'))
+    
+    # LLM backend: 'gemini', or 'fake' for the offline stand-in (no key or network needed)
+    LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini').lower()
+    FAKE_LLM_LATENCY_MS = float(os.getenv('FAKE_LLM_LATENCY_MS', '300'))
+    FAKE_LLM_LATENCY_SIGMA = float(os.getenv('FAKE_LLM_LATENCY_SIGMA', '0.5'))
+    FAKE_LLM_ERROR_RATE = float(os.getenv('FAKE_LLM_ERROR_RATE', '0'))
+    FAKE_LLM_SEED = int(os.getenv('FAKE_LLM_SEED')) if os.getenv('FAKE_LLM_SEED') else None
+    
+    # Model discovery result, reused across restarts until it is this old (seconds)
+    MODEL_STATE_PATH = os.getenv('MODEL_STATE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.model_state.json'))
+    MODEL_STATE_TTL = int(os.getenv('MODEL_STATE_TTL', str(7 * 24 * 3600)))
+    
+    # LLM response cache (set LLM_CACHE_DB to a file path to share it across workers)
+    LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', '1000'))
+    LLM_CACHE_DB = os.getenv('LLM_CACHE_DB') or None
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', '3600'))
+    LLM_CACHE_TTLS = {
+        'budget': int(os.getenv('LLM_CACHE_TTL_BUDGET', '86400')),
+        'savings': int(os.getenv('LLM_CACHE_TTL_SAVINGS', '86400')),
+        'chat': int(os.getenv('LLM_CACHE_TTL_CHAT', '300')),
+    }
+    
+    # LLM calls: worker pool size and per-call-site deadlines in seconds (0 = no deadline)
+    LLM_MAX_WORKERS = int(os.getenv('LLM_MAX_WORKERS', '8'))
+    LLM_DEADLINES = {
+        'budget': float(os.getenv('LLM_DEADLINE_BUDGET', '5')),
+        'savings': float(os.getenv('LLM_DEADLINE_SAVINGS', '5')),
+        'chat': float(os.getenv('LLM_DEADLINE_CHAT', '15')),
+    }
+    
+    # LLM client: concurrency (keep <= LLM_MAX_WORKERS), queue bound, per-minute budgets
+    # and priority lanes per call site (lower is served first)
+    LLM_MAX_IN_FLIGHT = int(os.getenv('LLM_MAX_IN_FLIGHT', '4'))
+    LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', '32'))
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '60'))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', '100000'))
+    LLM_DEFAULT_OUTPUT_TOKENS = int(os.getenv('LLM_DEFAULT_OUTPUT_TOKENS', '1024'))
+    # Directory for per-prompt lock files so identical calls also coalesce across
+    # workers (pair with LLM_CACHE_DB so waiting workers find the result)
+    LLM_SINGLE_FLIGHT_DIR = os.getenv('LLM_SINGLE_FLIGHT_DIR') or None
+    LLM_PRIORITIES = {
+        'chat': 0,
+        'budget': 1,
+        'savings': 1,
+    }
+    
+    # Metrics: stage timings and /metrics; Server-Timing header is opt-in
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ['true', '1', 'yes']
+    SERVER_TIMING = os.getenv('SERVER_TIMING', 'False').lower() in ['true', '1', 'yes']
+    
+    # On-demand profiling of single requests (X-Profile + X-Admin-Token headers)
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() in ['true', '1', 'yes']
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+    PROFILE_TOP_FUNCTIONS = int(os.getenv('PROFILE_TOP_FUNCTIONS', '25'))
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+    
+    # Persistent store for users, transactions, debts and goals (SQLite, WAL mode)
+    DATABASE_PATH = os.getenv('DATABASE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'finance.db'))
+    DATABASE_BATCH_SIZE = int(os.getenv('DATABASE_BATCH_SIZE', '5000'))
+    DASHBOARD_RECENT_TRANSACTIONS = int(os.getenv('DASHBOARD_RECENT_TRANSACTIONS', '50'))
     
     # CORS
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*')
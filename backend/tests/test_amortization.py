@@ -0,0 +1,144 @@
+import random
+
+import numpy as np
+import pytest
+
+from agents.debt_agent import PAYOFF_STRATEGIES, DebtAgent
+from benchmarks.generators import generate_debts
+from utils.amortization import PAID_OFF_EPSILON, simulate_payoff, simulate_scenarios
+from utils.records import Debt, debts_from_dicts
+
+
+def reference_payoff(balances, rates, min_payments, extra_payment, order, max_months):
+    """One scenario, one debt at a time, exactly as simulate_payoff documents it"""
+    balances = [balance if balance >= PAID_OFF_EPSILON else 0.0 for balance in balances]
+    budget = sum(min_payments) + max(extra_payment, 0.0)
+    payoff_months = [-1 if balance > 0 else 0 for balance in balances]
+    total_interest = 0.0
+    month = 0
+    while month < max_months and any(balances):
+        for i, rate in enumerate(rates):
+            accrued = balances[i] * rate / 100 / 12
+            balances[i] += accrued
+            total_interest += accrued
+        paid = [min(minimum, balance) for minimum, balance in zip(min_payments, balances)]
+        leftover = max(budget - sum(paid), 0.0)
+        for i in order:
+            extra = min(leftover, balances[i] - paid[i])
+            paid[i] += extra
+            leftover -= extra
+        month += 1
+        for i in range(len(balances)):
+            balances[i] -= paid[i]
+            if balances[i] < PAID_OFF_EPSILON:
+                if payoff_months[i] < 0:
+                    payoff_months[i] = month
+                balances[i] = 0.0
+    return {'months': month, 'paidOff': not any(balances), 'totalInterest': total_interest,
+            'payoffMonths': payoff_months}
+
+
+def random_debts(rng, n):
+    balances = [round(rng.choice([0, 0.001, rng.uniform(50, 20000)]), 2) for _ in range(n)]
+    rates = [round(rng.uniform(0, 30), 2) for _ in range(n)]
+    # Some minimums are too small to cover the interest, so some plans never finish
+    min_payments = [round(rng.uniform(0, 400), 2) for _ in range(n)]
+    return balances, rates, min_payments
+
+
+def assert_same(result, expected, i=None):
+    pick = (lambda value: value[i]) if i is not None else (lambda value: value)
+    assert int(pick(result['months'])) == expected['months']
+    assert bool(pick(result['paidOff'])) == expected['paidOff']
+    assert float(pick(result['totalInterest'])) == pytest.approx(expected['totalInterest'], rel=1e-9, abs=1e-6)
+    assert list(pick(result['payoffMonths'])) == expected['payoffMonths']
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_batched_scenarios_match_one_at_a_time(seed):
+    rng = random.Random(seed)
+    n_debts = rng.randrange(1, 7)
+    balances, rates, min_payments = random_debts(rng, n_debts)
+    extras = [rng.choice([0, 25, 150, 1000, -10]) for _ in range(6)]
+    orders = [rng.sample(range(n_debts), n_debts) for _ in extras]
+
+    batched = simulate_scenarios(balances, rates, min_payments, extras, orders, max_months=240)
+    for i, (extra, order) in enumerate(zip(extras, orders)):
+        expected = reference_payoff(balances, rates, min_payments, extra, order, max_months=240)
+        assert_same(batched, expected, i)
+
+
+def test_payoff_schedule_adds_up():
+    debts = debts_from_dicts(generate_debts(5, seed=2))
+    balances = [d.balance for d in debts]
+    result = simulate_payoff(balances, [d.rate for d in debts], [d.min_payment for d in debts], 200, [0, 1, 2, 3, 4])
+    expected = reference_payoff(balances, [d.rate for d in debts], [d.min_payment for d in debts], 200,
+                                [0, 1, 2, 3, 4], max_months=600)
+    assert_same(result, expected)
+
+    assert result['payments'].shape == (result['months'], len(debts))
+    assert result['interest'].sum() == pytest.approx(result['totalInterest'])
+    # What was owed plus interest is exactly what got paid
+    assert result['payments'].sum() == pytest.approx(sum(balances) + result['totalInterest'])
+    assert np.all(result['balances'][-1] == 0)
+
+
+def test_nothing_owed():
+    result = simulate_payoff([0, 0.001], [20, 5], [50, 50], 100, [0, 1])
+    assert result['months'] == 0
+    assert result['paidOff']
+    assert result['payoffMonths'].tolist() == [0, 0]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_compare_strategies_matches_each_strategy_alone(seed):
+    debts = debts_from_dicts(generate_debts(6, seed=seed))
+    strategies = ['avalanche', 'snowball', 'payment-ratio', {'type': 'hybrid', 'threshold': 3000},
+                  {'type': 'custom', 'name': 'mine', 'order': [debts[-1].name, debts[0].name]}]
+    result = DebtAgent().compare_strategies(debts, 150, strategies)
+
+    index = {debt.name: i for i, debt in enumerate(debts)}
+    assert len(result['ranking']) == len(strategies)
+    for row in result['ranking']:
+        order = [index[name] for name in row['order']]
+        expected = reference_payoff([d.balance for d in debts], [d.rate for d in debts],
+                                    [d.min_payment for d in debts], 150, order, max_months=600)
+        assert row['paidOff'] == expected['paidOff']
+        assert row['months'] == (expected['months'] if expected['paidOff'] else 999)
+        assert row['totalInterest'] == pytest.approx(expected['totalInterest'], abs=0.01)
+
+    ranked = [(not row['paidOff'], row['totalInterest'], row['months']) for row in result['ranking']]
+    assert ranked == sorted(ranked)
+    assert result['best'] == result['ranking'][0]['strategy']
+
+
+def test_strategy_orders():
+    debts = [Debt('Card', 900, 24, 30), Debt('Car', 12000, 6, 300), Debt('Medical', 400, 0, 40)]
+    state = {
+        'names': [d.name for d in debts],
+        'balances': np.array([d.balance for d in debts]),
+        'rates': np.array([d.rate for d in debts]),
+        'minPayments': np.array([d.min_payment for d in debts]),
+    }
+
+    def names(strategy, **spec):
+        return [debts[i].name for i in PAYOFF_STRATEGIES[strategy][0](state, spec)]
+
+    assert names('avalanche') == ['Card', 'Car', 'Medical']
+    assert names('snowball') == ['Medical', 'Card', 'Car']
+    assert names('payment-ratio') == ['Medical', 'Card', 'Car']
+    assert names('hybrid', threshold=500) == ['Medical', 'Card', 'Car']
+    assert names('custom', order=['Car']) == ['Car', 'Card', 'Medical']
+
+
+def test_create_payoff_plan_uses_the_same_engine():
+    debts = debts_from_dicts(generate_debts(4, seed=9))
+    agent = DebtAgent()
+    for method in ('avalanche', 'snowball'):
+        plan = agent.create_payoff_plan(debts, 100, method)
+        order = agent._payoff_order(debts, method)
+        expected = reference_payoff([d.balance for d in debts], [d.rate for d in debts],
+                                    [d.min_payment for d in debts], 100, order, max_months=600)
+        assert plan['estimatedMonths'] == (expected['months'] if expected['paidOff'] else 999)
+        assert plan['totalInterest'] == pytest.approx(expected['totalInterest'], abs=0.01)
+        assert len(plan['schedule']) == expected['months']
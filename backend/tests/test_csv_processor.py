@@ -0,0 +1,108 @@
+import io
+
+import pytest
+
+from utils.csv_processor import CSVProcessor, ParseReport
+from utils.records import Transaction
+
+
+class Trickle(io.RawIOBase):
+    """Binary stream that hands out at most ``size`` bytes per read"""
+
+    def __init__(self, data, size):
+        self.data = data
+        self.size = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self.size, len(self.data))
+        buffer[:n], self.data = self.data[:n], self.data[n:]
+        return n
+
+
+def statement(rows, delimiter=','):
+    header = delimiter.join(['Date', 'Category', 'Amount', 'Description'])
+    lines = [delimiter.join([f'2024-01-{i % 28 + 1:02d}', 'Food', f'{i}.50', f'Cafe number {i}']) for i in range(rows)]
+    return '\r\n'.join([header] + lines) + '\r\n'
+
+
+def expected(rows):
+    return [Transaction(f'2024-01-{i % 28 + 1:02d}', 'Food', i + 0.5, f'Cafe number {i}') for i in range(rows)]
+
+
+@pytest.mark.parametrize('delimiter', [',', ';', '\t'])
+def test_sniffed_prefix_is_replayed(delimiter):
+    text = statement(100, delimiter)
+    assert len(text) > 2 * CSVProcessor.SNIFF_SIZE
+    report = ParseReport()
+    assert list(CSVProcessor().iter_stream(io.BytesIO(text.encode()), report)) == expected(100)
+    assert report.to_dict() == {'parsed': 100, 'skipped': 0, 'errors': []}
+
+
+def test_row_cut_by_the_sniff_prefix_is_completed():
+    processor = CSVProcessor()
+    text = statement(100)
+    # A row straddles the sniff boundary
+    assert text[processor.SNIFF_SIZE - 1] not in '\r\n'
+    assert list(processor.iter_stream(io.StringIO(text, newline=''))) == expected(100)
+
+
+def test_header_split_across_reads(monkeypatch):
+    monkeypatch.setattr(CSVProcessor, 'SNIFF_SIZE', 7)
+    stream = Trickle(statement(20).encode(), size=3)
+    assert list(CSVProcessor().iter_stream(stream)) == expected(20)
+
+
+def test_multibyte_text_split_across_reads():
+    text = 'date,category,amount,description\n2024-01-01,Café,3.50,Crème brûlée\n'
+    rows = list(CSVProcessor().iter_stream(Trickle(text.encode(), size=1)))
+    assert rows == [Transaction('2024-01-01', 'Café', 3.5, 'Crème brûlée')]
+
+
+def test_bad_rows_are_reported_and_skipped():
+    text = (
+        'date,category,amount,description\n'
+        '2024-01-01,Food,$1,234.50,Ok\n'
+        '2024-01-02,Food,"$1,234.50",Thousands\n'
+        '2024-01-03,Food,abc,Bad amount\n'
+        '2024-01-04,Food,,No amount\n'
+        '2024-01-05,Food,n/a,Bad again\n'
+    )
+    report = ParseReport(max_errors=1)
+    rows = list(CSVProcessor().iter_stream(io.BytesIO(text.encode()), report))
+    # The unquoted comma shifts the description into an extra column but the amount parses
+    assert [row.amount for row in rows] == [1.0, 1234.5, 0.0]
+    assert (report.parsed, report.skipped) == (3, 2)
+    assert report.errors == [{'row': 4, 'error': "Invalid amount: could not convert string to float: 'abc'"}]
+
+
+def test_caller_stream_is_left_open():
+    stream = io.BytesIO(statement(3).encode())
+    assert len(list(CSVProcessor().iter_stream(stream))) == 3
+    assert not stream.closed
+    stream = io.BytesIO(statement(3).encode())
+    rows = CSVProcessor().iter_stream(stream)
+    next(rows)
+    rows.close()
+    assert not stream.closed
+
+
+def test_process_file_reports_instead_of_printing(tmp_path, capsys):
+    processor = CSVProcessor()
+    report = ParseReport()
+    assert processor.process_file(str(tmp_path / 'missing.csv'), report) == []
+    assert report.errors == [{'row': None, 'error': f"File not found: {tmp_path / 'missing.csv'}"}]
+    assert report.skipped == 0
+
+    path = tmp_path / 'statement.csv'
+    # Undecodable bytes well past the first read: the rows before them are kept
+    path.write_bytes(statement(2000).encode() + b'\xff\xfe,,,\n')
+    report = ParseReport()
+    rows = processor.process_file(str(path), report)
+    assert 0 < len(rows) <= 2000
+    assert rows == expected(2000)[:len(rows)]
+    assert report.errors[0]['row'] is None
+    assert report.errors[0]['error'].startswith('Error processing CSV file:')
+    assert capsys.readouterr().out == ''
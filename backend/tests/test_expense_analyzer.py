@@ -0,0 +1,133 @@
+import random
+import statistics
+from collections import defaultdict
+
+import pandas as pd
+import pytest
+
+from agents.expense_analyzer import ExpenseAnalyzer
+from benchmarks.generators import generate_expenses
+from utils.records import Transaction, transactions_from_dicts
+from utils.transaction_table import TransactionTable
+
+
+def reference_month(date):
+    if not date:
+        return None
+    parsed = pd.to_datetime(date, format='ISO8601', errors='coerce')
+    if pd.isna(parsed):
+        parsed = pd.to_datetime(date, format='mixed', errors='coerce')
+    return None if pd.isna(parsed) else f"{parsed.year:04d}-{parsed.month:02d}"
+
+
+def reference_analyze(analyzer, expenses):
+    """The original per-row loop, extended with the per-category stats and monthly breakdown"""
+    amounts = defaultdict(list)
+    months = defaultdict(lambda: defaultdict(float))
+    month_counts = defaultdict(int)
+    for expense in expenses:
+        category = expense.category
+        if not category or category == 'Other':
+            category = analyzer.categorize(expense.description or '', expense.amount)
+        amounts[category].append(expense.amount)
+        month = reference_month(expense.date)
+        if month is not None:
+            months[month][category] += expense.amount
+            month_counts[month] += 1
+
+    total = sum(sum(values) for values in amounts.values())
+    breakdown = {
+        category: {
+            'amount': sum(values),
+            'percentage': sum(values) / total * 100 if total > 0 else 0,
+            'count': len(values),
+            'min': min(values),
+            'max': max(values),
+            'average': statistics.fmean(values),
+            'stdDev': statistics.stdev(values) if len(values) > 1 else 0.0
+        }
+        for category, values in amounts.items()
+    }
+    monthly = [
+        {'month': month, 'total': sum(months[month].values()), 'count': month_counts[month],
+         'categories': dict(months[month])}
+        for month in sorted(months)
+    ]
+    return breakdown, total, monthly
+
+
+def random_transactions(n, seed):
+    rng = random.Random(seed)
+    categories = ['Food', 'Other', '', None, 'Housing', 'Travel']
+    descriptions = ['Coffee #12', 'Monthly Rent', 'uber trip', 'Venmo', '', None, 'NETFLIX.COM']
+    dates = ['2024-01-05', '2024-01-31', '2024-02-29', '03/15/2024', 'not a date', '', None]
+    return [
+        Transaction(rng.choice(dates), rng.choice(categories), round(rng.uniform(-20, 900), 2), rng.choice(descriptions))
+        for _ in range(n)
+    ]
+
+
+def assert_matches_reference(result, expenses):
+    breakdown, total, monthly = reference_analyze(ExpenseAnalyzer(), expenses)
+
+    assert result['totalExpenses'] == pytest.approx(total, abs=0.01)
+    assert {item['category'] for item in result['categoryBreakdown']} == set(breakdown)
+    for item in result['categoryBreakdown']:
+        expected = breakdown[item['category']]
+        for field in ('amount', 'percentage', 'min', 'max', 'average', 'stdDev'):
+            assert item[field] == pytest.approx(expected[field], abs=0.01), (item['category'], field)
+        assert item['count'] == expected['count']
+    amounts = [item['amount'] for item in result['categoryBreakdown']]
+    assert amounts == sorted(amounts, reverse=True)
+
+    assert [month['month'] for month in result['monthlyBreakdown']] == [month['month'] for month in monthly]
+    for got, expected in zip(result['monthlyBreakdown'], monthly):
+        assert got['count'] == expected['count']
+        assert got['total'] == pytest.approx(expected['total'], abs=0.01)
+        assert got['categories'] == pytest.approx(expected['categories'], abs=0.01)
+
+
+@pytest.mark.parametrize('n, seed', [(1, 0), (5, 1), (60, 2), (1000, 3)])
+def test_analyze_matches_row_by_row_reference(n, seed):
+    expenses = random_transactions(n, seed)
+    assert_matches_reference(ExpenseAnalyzer().analyze(expenses), expenses)
+
+
+def test_analyze_generated_statements():
+    expenses = transactions_from_dicts(generate_expenses(3000, seed=5))
+    assert_matches_reference(ExpenseAnalyzer().analyze(expenses), expenses)
+
+
+def test_list_and_table_inputs_agree():
+    expenses = random_transactions(400, seed=6)
+    analyzer = ExpenseAnalyzer()
+    assert analyzer.analyze(expenses) == analyzer.analyze(TransactionTable.from_records(expenses, chunk_size=16))
+
+
+def test_only_uncategorized_rows_are_categorized():
+    # A categorized row keeps its category even when its description matches another one
+    expenses = [Transaction('2024-01-01', 'Travel', 10.0, 'uber'), Transaction('2024-01-02', 'Other', 5.0, 'uber')]
+    breakdown = {item['category']: item['amount'] for item in ExpenseAnalyzer().analyze(expenses)['categoryBreakdown']}
+    assert breakdown == {'Travel': 10.0, 'Transportation': 5.0}
+
+
+def test_empty_input():
+    result = ExpenseAnalyzer().analyze([])
+    assert result['categoryBreakdown'] == []
+    assert result['totalExpenses'] == 0
+    assert result['topCategory'] == 'None'
+
+
+def test_replacing_categories_clears_the_cache():
+    analyzer = ExpenseAnalyzer()
+    assert analyzer.categorize('UBER *TRIP 1234', 0) == 'Transportation'
+    # Store numbers normalize away, so this is a cache hit
+    assert analyzer.categorize('Uber *Trip 98', 0) == 'Transportation'
+    assert analyzer.cache_stats()['hits'] == 1
+
+    analyzer.categories = {'Rideshare': ['uber'], **analyzer.categories}
+    assert analyzer.cache_stats()['size'] == 0
+    assert analyzer.categorize('UBER *TRIP 1234', 0) == 'Rideshare'
+
+    with pytest.raises(TypeError):
+        analyzer.categories['Travel'] = ('flight',)
@@ -0,0 +1,29 @@
+import pytest
+
+from utils.fake_model import FakeGenerativeModel, FakeModelError
+
+
+def test_text_is_the_same_in_every_process():
+    # Pinned, so a change of PYTHONHASHSEED or interpreter cannot shift load-test output
+    model = FakeGenerativeModel(latency_ms=0, latency_sigma=0)
+    text = model.generate_content('hello', generation_config={'max_output_tokens': 8}).text
+    assert text == 'save budget track spending emergency fund'
+    assert FakeGenerativeModel(latency_ms=0).generate_content('hello', {'max_output_tokens': 8}).text == text
+
+
+def test_stream_chunks_add_up_to_the_text():
+    model = FakeGenerativeModel(latency_ms=0, latency_sigma=0, chunk_words=4)
+    text = model.generate_content('tips', {'max_output_tokens': 40}).text
+    chunks = [chunk.text for chunk in model.generate_content('tips', {'max_output_tokens': 40}, stream=True)]
+    assert len(chunks) == 8
+    assert ''.join(chunks).strip() == text
+
+
+def test_injected_errors():
+    model = FakeGenerativeModel(latency_ms=0, latency_sigma=0, error_rate=1.0)
+    with pytest.raises(FakeModelError):
+        model.generate_content('hello')
+    stream = model.generate_content('hello', {'max_output_tokens': 40}, stream=True)
+    with pytest.raises(FakeModelError):
+        list(stream)
+    assert model.calls == 2
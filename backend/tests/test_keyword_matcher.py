@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from agents.expense_analyzer import ExpenseAnalyzer, normalize_merchant
+from benchmarks.generators import generate_expenses
+from utils.keyword_matcher import KeywordMatcher
+
+GROUPS = {
+    'Food': ['grocery', 'restaurant', 'food', 'cafe', 'dining', 'pizza', 'coffee'],
+    'Transportation': ['gas', 'uber', 'lyft', 'transit', 'parking', 'fuel'],
+    'Housing': ['rent', 'mortgage', 'property', 'lease'],
+    'Utilities': ['electric', 'water', 'internet', 'phone', 'utility', 'bill'],
+    'Entertainment': ['movie', 'concert', 'game', 'netflix', 'spotify', 'entertainment'],
+    'Shopping': ['amazon', 'store', 'mall', 'clothing', 'clothes', 'shopping'],
+}
+
+
+def reference_match(groups, text, default='Other'):
+    """The original loop: first group, in order, with any keyword contained in the text"""
+    for label, keywords in groups.items():
+        if any(keyword in text for keyword in keywords):
+            return label
+    return default
+
+
+def random_texts(groups, n, seed):
+    """Texts that mix keywords from several groups in any order, plus near misses"""
+    rng = random.Random(seed)
+    keywords = [keyword for words in groups.values() for keyword in words]
+    fillers = ['', ' ', 'x', 'the ', 'vegas', 'billiards', 'ga', 's', '#12 ']
+    texts = []
+    for _ in range(n):
+        parts = [rng.choice(keywords + fillers) for _ in range(rng.randrange(0, 5))]
+        texts.append(rng.choice(['', ' ']).join(parts))
+    return texts
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_first_group_in_order(seed):
+    matcher = KeywordMatcher(GROUPS)
+    for text in random_texts(GROUPS, 500, seed):
+        assert matcher.match(text) == reference_match(GROUPS, text), text
+
+
+def test_priority_beats_position():
+    matcher = KeywordMatcher(GROUPS)
+    # 'bill' (Utilities) comes first in the text but Food outranks it
+    assert matcher.match('bill for coffee') == 'Food'
+    assert matcher.match('gas then rent') == 'Transportation'
+
+
+def test_overlapping_keywords():
+    groups = {'A': ['abc'], 'B': ['ab', 'bcd'], 'C': ['c']}
+    matcher = KeywordMatcher(groups)
+    for text in ['abcd', 'xabx', 'bcd', 'c', 'ab c', 'zzz', 'abc']:
+        assert matcher.match(text) == reference_match(groups, text), text
+
+
+def test_special_characters_are_literal():
+    groups = {'Dots': ['a.b'], 'Plus': ['c++'], 'Star': ['*']}
+    matcher = KeywordMatcher(groups)
+    for text in ['axb', 'a.b', 'c++ book', 'cc', 'five * stars', '']:
+        assert matcher.match(text) == reference_match(groups, text), text
+
+
+def test_empty_and_missing_keywords():
+    assert KeywordMatcher({}).match('anything') == 'Other'
+    assert KeywordMatcher({'A': [], 'B': ['b']}).match('b') == 'B'
+    # An empty keyword matches everything, so its group wins over every later group
+    groups = {'A': ['a'], 'Any': [''], 'B': ['b']}
+    matcher = KeywordMatcher(groups)
+    for text in ['a', 'b', '', 'xyz']:
+        assert matcher.match(text) == reference_match(groups, text), text
+
+
+def test_normalize_merchant():
+    assert normalize_merchant('STARBUCKS COFFEE #1234') == 'starbucks coffee'
+    assert normalize_merchant('  Uber   *Trip  00012345 ') == 'uber *trip'
+    assert normalize_merchant('AMC Movie #7') == normalize_merchant('amc movie #88')
+    assert normalize_merchant('') == ''
+
+
+def test_categorize_matches_the_original_lowercase_scan():
+    analyzer = ExpenseAnalyzer()
+    assert dict(analyzer.categories) == {label: tuple(keywords) for label, keywords in GROUPS.items()}
+    descriptions = [expense['description'] for expense in generate_expenses(2000, seed=3)]
+    descriptions += ['GAS1STATION', 'Water  Bill', 'cof1fee', '', 'Coffee #9 at the MALL']
+    for description in descriptions:
+        assert analyzer.categorize(description, 0) == reference_match(GROUPS, description.lower()), description
+
+
+def test_categorize_batch_matches_categorize():
+    analyzer = ExpenseAnalyzer()
+    descriptions = [expense['description'] for expense in generate_expenses(500, seed=4)] + ['', None]
+    expected = [analyzer.categorize(description or '', 0) for description in descriptions]
+    assert analyzer.categorize_batch(descriptions) == expected
+
+
+def test_reassigning_categories_rebuilds_the_matcher():
+    analyzer = ExpenseAnalyzer()
+    assert analyzer.categorize('Coffee shop', 0) == 'Food'
+    analyzer.categories = {'Treats': ['coffee']}
+    assert analyzer.categorize('Coffee shop', 0) == 'Treats'
+    assert analyzer.categorize('Monthly rent', 0) == 'Other'
@@ -0,0 +1,77 @@
+import pytest
+
+from utils import llm_cache, lru_cache
+from utils.llm_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    monotonic = time
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_cache, 'time', clock)
+    monkeypatch.setattr(lru_cache, 'time', clock)
+    return clock
+
+
+def test_key_covers_model_prompt_and_config():
+    key = ResponseCache.make_key('model', 'prompt', {'temperature': 0.2})
+    assert key == ResponseCache.make_key('model', 'prompt', {'temperature': 0.2})
+    assert key != ResponseCache.make_key('other', 'prompt', {'temperature': 0.2})
+    assert key != ResponseCache.make_key('model', 'prompt', {'temperature': 0.3})
+    assert ResponseCache.make_key('model', 'prompt') == ResponseCache.make_key('model', 'prompt', {})
+
+
+def test_memory_hits_and_misses_are_counted_per_site(clock):
+    cache = ResponseCache(maxsize=10)
+    assert cache.get('k', 'tips') is None
+    cache.put('k', 'answer', 'tips')
+    assert cache.get('k', 'tips') == 'answer'
+    assert cache.stats()['sites'] == {'tips': {'hits': 1, 'misses': 1, 'stores': 1}}
+    assert cache.stats()['disk'] is None
+
+
+def test_memory_entries_expire_after_ttl(clock):
+    cache = ResponseCache(maxsize=10, default_ttl=60)
+    cache.put('default', 'a')
+    cache.put('short', 'b', ttl=5)
+    clock.now += 5
+    assert cache.get('short') is None
+    assert cache.get('default') == 'a'
+    clock.now += 55
+    assert cache.get('default') is None
+
+
+def test_sqlite_tier_is_shared_and_promotes_to_memory(clock, tmp_path):
+    path = str(tmp_path / 'responses.db')
+    ResponseCache(maxsize=10, db_path=path).put('k', 'answer', ttl=100)
+
+    # A second instance stands in for another worker
+    other = ResponseCache(maxsize=10, db_path=path)
+    assert other.get('k') == 'answer'
+    assert other.stats()['memory']['size'] == 1
+    assert other.stats()['disk'] == {'entries': 1}
+
+    # The promoted copy keeps the remaining lifetime, not a fresh TTL
+    clock.now += 100
+    assert other.get('k') is None
+    assert ResponseCache(maxsize=10, db_path=path).get('k') is None
+
+
+def test_sqlite_sweeps_expired_and_trims_to_size(clock, tmp_path):
+    cache = ResponseCache(maxsize=10, db_path=str(tmp_path / 'responses.db'), max_disk_entries=50)
+    cache.put('old', 'x', ttl=1)
+    clock.now += 2
+    for i in range(99):
+        clock.now += 0.001
+        cache.put(f'k{i}', str(i))
+    assert cache.stats()['disk'] == {'entries': 50}
+    assert ResponseCache(maxsize=10, db_path=str(tmp_path / 'responses.db')).get('k98') == '98'
@@ -0,0 +1,183 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from config import Config
+from utils import llm_client as llm_client_module
+from utils import llm_executor
+from utils.fake_model import FakeGenerativeModel
+from utils.llm_cache import ResponseCache
+from utils.llm_client import LLMBusyError, LLMClient, PriorityGate, TokenBucket
+
+
+class FakeClock:
+    """Stands in for the time module; sleeping just moves the clock forward"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_client_module, 'time', clock)
+    return clock
+
+
+def wait_until(condition, timeout=5):
+    give_up = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < give_up, "timed out"
+        time.sleep(0.005)
+
+
+def make_client(**kwargs):
+    class Registry:
+        model_name = 'fake-gemini'
+        model = FakeGenerativeModel(latency_ms=0, latency_sigma=0, seed=1)
+
+    return LLMClient(registry=Registry(), cache=ResponseCache(maxsize=100), **kwargs)
+
+
+def full_budget(client):
+    return client.requests._tokens == client.requests.capacity and client.tokens._tokens == client.tokens.capacity
+
+
+def test_token_bucket_spends_then_waits_for_refill(clock):
+    bucket = TokenBucket(60, capacity=2)
+    assert bucket.reserve(1, max_wait=0) == 0.0
+    assert bucket.reserve(1, max_wait=0) == 0.0
+    # Empty: the next token arrives in a second, so it is lent against that
+    assert bucket.reserve(1, max_wait=0.5) is None
+    assert bucket.reserve(1, max_wait=1) == pytest.approx(1.0)
+    assert bucket.reserve(1, max_wait=1.5) is None
+
+    clock.now += 2
+    assert bucket.reserve(1, max_wait=0) == 0.0
+
+
+def test_token_bucket_refund_is_capped(clock):
+    bucket = TokenBucket(60, capacity=5)
+    bucket.reserve(3, max_wait=0)
+    bucket.refund(3)
+    bucket.refund(10)
+    assert bucket._tokens == 5
+    clock.now += 60
+    assert bucket.reserve(6, max_wait=0) is None
+
+
+def test_gate_admits_waiters_by_priority_then_arrival():
+    gate = PriorityGate(limit=1, max_queue=10)
+    assert gate.acquire(1, timeout=0)
+    order = []
+
+    def wait(priority, name):
+        assert gate.acquire(priority, timeout=5)
+        order.append(name)
+        gate.release()
+
+    threads = []
+    for priority, name in [(2, 'low'), (1, 'normal-a'), (0, 'high'), (1, 'normal-b')]:
+        thread = threading.Thread(target=wait, args=(priority, name))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: gate.queued == len(threads))
+
+    gate.release()
+    for thread in threads:
+        thread.join()
+    assert order == ['high', 'normal-a', 'normal-b', 'low']
+    assert (gate.in_flight, gate.queued, gate.max_queued) == (0, 0, 4)
+
+
+def test_gate_skips_abandoned_waiters_and_sheds_when_queue_full():
+    gate = PriorityGate(limit=1, max_queue=1)
+    assert gate.acquire(1, timeout=0)
+    assert gate.acquire(0, timeout=0) is False
+    assert gate.queued == 0
+
+    gate.max_queue = 0
+    with pytest.raises(LLMBusyError):
+        gate.acquire(0, timeout=1)
+
+    # The abandoned waiter is passed over and the slot is freed
+    gate.release()
+    assert gate.in_flight == 0
+    assert gate.acquire(1, timeout=0)
+
+
+def test_rate_limit_waits_within_deadline_and_rejects_beyond_it(clock):
+    client = make_client(requests_per_minute=2)
+    client.generate('first')
+    client.generate('second')
+    assert clock.sleeps == [0.0, 0.0]
+
+    with pytest.raises(LLMBusyError):
+        client.generate('third', deadline=10)
+    assert client.stats()['rejectedRateLimit'] == 1
+    # The rejected call took none of the token budget
+    spent = 2 * (len('first') // 4 + Config.LLM_DEFAULT_OUTPUT_TOKENS)
+    assert client.tokens._tokens == client.tokens.capacity - spent
+
+    # Without a deadline the call waits for the next request token
+    client.generate('third')
+    assert clock.sleeps[-1] == pytest.approx(30.0)
+
+
+def test_admit_refunds_when_queue_is_full(clock):
+    client = make_client(max_in_flight=1, max_queue=0)
+    assert client.gate.acquire(1, timeout=0)
+    with pytest.raises(LLMBusyError):
+        client.generate('hello', deadline=5)
+    assert client.stats()['rejectedQueueFull'] == 1
+    assert full_budget(client)
+    client.gate.release()
+
+
+def test_admit_refunds_when_slot_wait_times_out(clock):
+    client = make_client(max_in_flight=1, max_queue=1)
+    assert client.gate.acquire(1, timeout=0)
+    with pytest.raises(TimeoutError):
+        client._admit('hello', None, 1, deadline=0.01)
+    assert client.stats()['timedOutWaiting'] == 1
+    assert full_budget(client)
+    assert client.gate.queued == 0
+    client.gate.release()
+
+
+def test_call_cancelled_in_the_pool_queue_releases_and_refunds(monkeypatch):
+    # One busy pool thread, so the model call never leaves the queue
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(llm_executor, '_executor', pool)
+    blocker = threading.Event()
+    pool.submit(blocker.wait, 5)
+
+    client = make_client()
+    try:
+        with pytest.raises(TimeoutError):
+            client.generate('hello', deadline=0.05)
+    finally:
+        blocker.set()
+        pool.shutdown()
+    assert client.gate.in_flight == 0
+    assert full_budget(client)
+    assert client.model.calls == 0
+
+
+def test_generate_uses_the_cache_on_repeat(clock):
+    client = make_client()
+    text = client.generate('hello', generation_config={'max_output_tokens': 8})
+    assert len(text.split()) == 6
+    assert client.generate('hello', generation_config={'max_output_tokens': 8}) == text
+    assert client.model.calls == 1
+    assert client.stats()['cacheHits'] == 1
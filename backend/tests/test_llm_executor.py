@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import llm_executor
+from utils.llm_executor import run_with_deadline
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(llm_executor, '_executor', pool)
+    yield pool
+    pool.shutdown()
+
+
+def test_returns_result_within_deadline(pool):
+    assert run_with_deadline(lambda a, b=0: a + b, 5, 1, b=2) == 3
+
+
+def test_queued_call_is_cancelled_and_on_cancel_runs(pool):
+    release = threading.Event()
+    pool.submit(release.wait, 5)
+    ran, cancelled = [], []
+    try:
+        with pytest.raises(TimeoutError):
+            run_with_deadline(lambda: ran.append(1), 0.05, on_cancel=lambda: cancelled.append(1))
+    finally:
+        release.set()
+    pool.shutdown()
+    assert cancelled == [1]
+    assert ran == []
+
+
+def test_started_call_keeps_running_without_on_cancel(pool):
+    started, release = threading.Event(), threading.Event()
+    finished, cancelled = [], []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        finished.append(1)
+
+    with pytest.raises(TimeoutError):
+        run_with_deadline(slow, 0.05, on_cancel=lambda: cancelled.append(1))
+    assert started.is_set()
+    release.set()
+    pool.shutdown()
+    # It already owned its cleanup, so on_cancel must not run a second release
+    assert finished == [1]
+    assert cancelled == []
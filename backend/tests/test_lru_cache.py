@@ -0,0 +1,67 @@
+import pytest
+
+from utils import lru_cache
+from utils.lru_cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(lru_cache, 'time', clock)
+    return clock
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(maxsize=3)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    # Reading 'a' makes 'b' the oldest
+    assert cache.get('a') == 'A'
+    cache.put('d', 'D')
+    assert cache.get('b') is None
+    cache.put('c', 'C2')
+    cache.put('e', 'E')
+    assert [cache.get(key) for key in 'acde'] == [None, 'C2', 'D', 'E']
+    stats = cache.stats()
+    assert (stats['size'], stats['evictions'], stats['hits'], stats['misses']) == (3, 2, 4, 2)
+    assert stats['hitRate'] == round(4 / 6, 4)
+
+
+def test_missing_key_returns_default():
+    cache = LRUCache()
+    assert cache.get('a', 'fallback') == 'fallback'
+    cache.put('a', None)
+    assert cache.get('a', 'fallback') is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache()
+    cache.put('short', 1, ttl=10)
+    cache.put('forever', 2)
+    clock.now += 9.9
+    assert cache.get('short') == 1
+    clock.now += 0.1
+    assert cache.get('short') is None
+    assert cache.get('forever') == 2
+    assert len(cache) == 1
+    assert cache.stats()['expirations'] == 1
+
+
+def test_put_from_before_clear_is_dropped():
+    cache = LRUCache()
+    cache.put('a', 1)
+    generation = cache.generation
+    cache.clear()
+    # A value computed against the old state must not land after the clear
+    cache.put('b', 2, generation)
+    assert len(cache) == 0
+    cache.put('b', 3, cache.generation)
+    assert cache.get('b') == 3
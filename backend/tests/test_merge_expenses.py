@@ -0,0 +1,94 @@
+import io
+import random
+import zipfile
+from collections import Counter
+from functools import reduce
+
+import pytest
+
+from utils.dates import iso_date
+from utils.records import Transaction
+from utils.upload_batch import dedupe_key, expand_uploads, merge_expenses
+
+
+def random_statement(rng, n):
+    dates = ['2024-03-01', '03/01/2024', '2024-03-02', '2024-02-28', 'pending', '']
+    descriptions = ['Coffee Shop', 'coffee  shop', 'COFFEE SHOP', 'Rent', 'Uber Trip']
+    return [
+        Transaction(rng.choice(dates), 'Other', rng.choice([4.5, 4.499999, 1200.0, 15.25]), rng.choice(descriptions))
+        for _ in range(n)
+    ]
+
+
+def sort_key(expense):
+    day = iso_date(expense.date)
+    return (day is None, day or expense.date)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_keeps_the_largest_count_of_each_row_any_file_has(seed):
+    rng = random.Random(seed)
+    files = [random_statement(rng, rng.randrange(0, 25)) for _ in range(rng.randrange(1, 5))]
+    merged, duplicates = merge_expenses(files)
+
+    # The multiset union (per-key maximum) of the files
+    expected = reduce(lambda a, b: a | b, (Counter(map(dedupe_key, expenses)) for expenses in files), Counter())
+    assert Counter(map(dedupe_key, merged)) == expected
+    assert len(duplicates) == len(files)
+    assert sum(duplicates) == sum(map(len, files)) - len(merged)
+
+    # Every kept row is one of the inputs, in date order, same-day rows in upload order
+    originals = [expense for expenses in files for expense in expenses]
+    position = {id(expense): i for i, expense in enumerate(originals)}
+    assert all(id(expense) in position for expense in merged)
+    assert [sort_key(e) for e in merged] == sorted(sort_key(e) for e in merged)
+    for a, b in zip(merged, merged[1:]):
+        if sort_key(a) == sort_key(b):
+            assert position[id(a)] < position[id(b)]
+
+
+def test_repeated_rows_within_one_statement_are_kept():
+    coffee = Transaction('2024-03-01', 'Food', 4.5, 'Coffee')
+    merged, duplicates = merge_expenses([[coffee, Transaction('2024-03-01', 'Food', 4.5, 'Coffee')]])
+    assert len(merged) == 2
+    assert duplicates == [0]
+
+
+def test_overlapping_statements():
+    february = [Transaction('2024-02-27', 'Food', 9.0, 'Lunch'), Transaction('2024-03-01', 'Food', 4.5, 'Coffee'),
+                Transaction('2024-03-01', 'Food', 4.5, 'Coffee')]
+    march = [Transaction('03/01/2024', 'Food', 4.5, ' coffee '), Transaction('2024-03-05', 'Housing', 1200.0, 'Rent')]
+    merged, duplicates = merge_expenses([february, march])
+    assert [(e.date, e.description) for e in merged] == [
+        ('2024-02-27', 'Lunch'), ('2024-03-01', 'Coffee'), ('2024-03-01', 'Coffee'), ('2024-03-05', 'Rent')
+    ]
+    assert duplicates == [0, 1]
+
+
+def test_dedupe_key_normalizes():
+    assert dedupe_key(Transaction('03/01/2024', 'Food', 4.499999, '  COFFEE   shop')) == \
+        dedupe_key(Transaction('2024-03-01', 'Other', 4.5, 'coffee shop'))
+    assert dedupe_key(Transaction('pending', 'Food', 1.0, 'x'))[0] == 'pending'
+
+
+def test_expand_uploads(tmp_path):
+    plain = tmp_path / 'plain'
+    plain.write_text('date,amount,description\n')
+    archive = tmp_path / 'archive'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('jan.csv', 'a')
+        zf.writestr('notes/feb.TXT', 'b')
+        zf.writestr('readme.md', 'c')
+        zf.writestr('__MACOSX/._jan.csv', 'd')
+    jobs = expand_uploads([('one.csv', str(plain), 'k1'), ('both.zip', str(archive), 'k2')],
+                          parsed_path=lambda key, member=None: f'{key}:{member}')
+    assert jobs == [
+        ('one.csv', str(plain), None, 'k1:None'),
+        ('both.zip/jan.csv', str(archive), 'jan.csv', 'k2:jan.csv'),
+        ('both.zip/notes/feb.TXT', str(archive), 'notes/feb.TXT', 'k2:notes/feb.TXT'),
+    ]
+
+    broken = tmp_path / 'broken'
+    broken.write_bytes(b'not a zip')
+    with pytest.raises(ValueError):
+        expand_uploads([('bad.zip', str(broken), 'k3')])
@@ -0,0 +1,125 @@
+import random
+
+import pytest
+
+from agents.expense_analyzer import ExpenseAnalyzer
+from utils.dates import iso_date
+from utils.records import Transaction
+from utils.rollups import MonthlyRollup, full_months, rollup_rows
+from utils.transaction_store import TransactionStore
+
+USER = 'alice'
+RANGES = [
+    (None, None), ('2024-01-01', '2024-12-31'), ('2024-01-15', '2024-03-10'), ('2024-02-01', '2024-02-29'),
+    ('2024-02-29', '2024-02-29'), (None, '2024-04-30'), ('2024-05-02', None), ('2024-03-31', '2024-04-01'),
+    ('2023-01-01', '2023-12-31'), ('2024-06-10', '2024-06-01'),
+]
+
+
+@pytest.fixture
+def analyzer():
+    return ExpenseAnalyzer()
+
+
+@pytest.fixture
+def store(tmp_path, analyzer):
+    store = TransactionStore(str(tmp_path / 'finance.db'), categorize=analyzer.categorize, batch_size=7)
+    rng = random.Random(4)
+    dates = [f'2024-{month:02d}-{day:02d}' for month in range(1, 7) for day in (1, 2, 14, 28, 29, 30, 31)
+             if iso_date(f'2024-{month:02d}-{day:02d}')] + ['03/15/2024', 'not a date', '']
+    categories = ['Food', 'Housing', 'Other', '', 'Travel']
+    descriptions = ['Coffee', 'Monthly Rent', 'uber', 'Misc', 'Netflix']
+    transactions = [
+        Transaction(rng.choice(dates), rng.choice(categories), round(rng.uniform(-30, 800), 2), rng.choice(descriptions))
+        for _ in range(400)
+    ]
+    store.ingest(USER, transactions[:300])
+    store.add_transactions(USER, transactions[300:])
+    store.ingest('bob', transactions[:50])
+    return store
+
+
+def reference_rollup(store, start=None, end=None, category=None):
+    """Aggregate the stored rows directly, applying the range the way a reader would"""
+    rows = []
+    for row in store.transactions(USER):
+        day = iso_date(row['date'])
+        if start or end:
+            if day is None or (start and day < start) or (end and day > end):
+                continue
+        if category and row['category'] != category:
+            continue
+        rows.append((day[:7] if day else None, row['category'], row['amount']))
+    return MonthlyRollup([(month, cat, *group) for (month, cat), group in rollup_rows(rows).items()])
+
+
+def assert_same_rollup(got, expected):
+    assert len(got) == len(expected)
+    assert got.total() == pytest.approx(expected.total())
+    assert got.category_totals() == pytest.approx(expected.category_totals())
+    assert got.category_counts() == expected.category_counts()
+    assert got.category_stats() == expected.category_stats()
+    assert [(m, c) for m, _, c, _ in got.monthly_totals()] == [(m, c) for m, _, c, _ in expected.monthly_totals()]
+    for (_, total, _, categories), (_, expected_total, _, expected_categories) in zip(
+            got.monthly_totals(), expected.monthly_totals()):
+        assert total == pytest.approx(expected_total)
+        assert categories == pytest.approx(expected_categories)
+
+
+@pytest.mark.parametrize('start, end', RANGES)
+def test_rollup_matches_raw_rows(store, start, end):
+    assert_same_rollup(store.rollup(USER, start, end), reference_rollup(store, start, end))
+
+
+@pytest.mark.parametrize('start, end', RANGES[:4])
+def test_rollup_by_category(store, start, end):
+    for category in ('Food', 'Housing', 'Other', 'Missing'):
+        assert_same_rollup(store.rollup(USER, start, end, category), reference_rollup(store, start, end, category))
+
+
+def test_analysis_from_rollup_matches_list_analysis(store, analyzer):
+    expenses = [Transaction(row['date'], row['category'], row['amount'], row['description'])
+                for row in store.transactions(USER)]
+    from_list = analyzer.analyze(expenses)
+    from_rollup = analyzer.analyze(store.rollup(USER))
+
+    assert from_rollup['totalExpenses'] == pytest.approx(from_list['totalExpenses'], abs=0.01)
+    assert from_rollup['topCategory'] == from_list['topCategory']
+    by_category = {item['category']: item for item in from_list['categoryBreakdown']}
+    for item in from_rollup['categoryBreakdown']:
+        expected = by_category.pop(item['category'])
+        for field in ('amount', 'percentage', 'count', 'min', 'max', 'average', 'stdDev'):
+            assert item[field] == pytest.approx(expected[field], abs=0.01), (item['category'], field)
+    assert by_category == {}
+    assert [m['month'] for m in from_rollup['monthlyBreakdown']] == [m['month'] for m in from_list['monthlyBreakdown']]
+
+
+def test_rollups_follow_deletes_and_rebuilds(store):
+    rows = store.transactions(USER)
+    for row in rows[::9]:
+        assert store.delete_transaction(USER, row['id'])
+    assert not store.delete_transaction(USER, rows[0]['id'])
+    assert_same_rollup(store.rollup(USER), reference_rollup(store))
+    assert_same_rollup(store.rollup(USER, '2024-02-10', '2024-05-20'), reference_rollup(store, '2024-02-10', '2024-05-20'))
+
+    before = store.rollup(USER)
+    store.rebuild_rollups()
+    assert_same_rollup(store.rollup(USER), before)
+
+
+def test_users_are_separate(store):
+    assert len(store.rollup('bob')) == 50
+    assert len(store.rollup('nobody')) == 0
+    assert len(store.rollup(USER)) == 400
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    ('2024-01-01', '2024-03-31', ('2024-01', '2024-03')),
+    ('2024-01-02', '2024-03-30', ('2024-02', '2024-02')),
+    ('2024-02-01', '2024-02-29', ('2024-02', '2024-02')),
+    ('2023-12-15', '2024-01-15', ('2024-01', '2023-12')),
+    ('2024-12-02', None, ('2025-01', '9999-99')),
+    (None, '2024-01-30', ('0000-00', '2023-12')),
+])
+def test_full_months(start, end, expected):
+    assert full_months(start, end) == expected
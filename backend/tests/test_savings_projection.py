@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+import pytest
+
+import utils.savings_projection as projection
+from utils.savings_projection import PERCENTILES, expense_profile, project_savings
+from utils.records import Transaction
+
+TARGETS = [{'name': 'Emergency fund', 'amount': 3000}, {'name': 'Car', 'amount': 12000},
+           {'name': 'Out of reach', 'amount': 1e9}]
+
+
+def reference_projection(income, expenses, targets, income_shocks, expense_shocks):
+    """Whole paths x months matrices, as the projection is defined"""
+    income_paths = income * income_shocks
+    expense_paths = expenses * expense_shocks
+    saved = np.minimum(np.maximum(income_paths - expense_paths, 0.0) * 0.8, income_paths * 0.2)
+    balances = np.cumsum(saved, axis=1)
+    thresholds = np.cumsum([target['amount'] for target in targets])
+    months_to_target = []
+    for threshold in thresholds:
+        reached = balances >= threshold
+        first = np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, np.inf)
+        months_to_target.append(np.percentile(first, PERCENTILES, method='higher'))
+    return months_to_target, np.percentile(balances, PERCENTILES, axis=0)
+
+
+@pytest.mark.parametrize('chunk_cells, paths, months', [(1, 5, 7), (40, 16, 30), (10, 64, 120), (10 ** 9, 50, 60)])
+def test_month_blocks_match_whole_matrix(monkeypatch, chunk_cells, paths, months):
+    rng = np.random.default_rng(7)
+    income_shocks = rng.lognormal(0, 0.3, (paths, months))
+    expense_shocks = rng.lognormal(0, 0.3, (paths, months))
+
+    # Hand the simulation the same shocks, block by block, in the order it asks for them
+    served = {'income': 0, 'expense': 0}
+
+    def shocks(_, volatility, shape):
+        kind = 'income' if volatility == 0.11 else 'expense'
+        source = income_shocks if kind == 'income' else expense_shocks
+        start = served[kind]
+        served[kind] += shape[1]
+        return source[:, start:start + shape[1]]
+
+    monkeypatch.setattr(projection, 'CHUNK_CELLS', chunk_cells)
+    monkeypatch.setattr(projection, '_shocks', shocks)
+    result = project_savings(5000, 3900, TARGETS, income_volatility=0.11, expense_volatility=0.22,
+                             paths=paths, months=months)
+
+    expected_months, expected_timeline = reference_projection(5000, 3900, TARGETS, income_shocks, expense_shocks)
+    for target, expected in zip(result['targets'], expected_months):
+        assert target['monthsToTarget'] == {
+            f'p{p}': int(value) if np.isfinite(value) else None for p, value in zip(PERCENTILES, expected)
+        }
+    for p, row in zip(PERCENTILES, expected_timeline):
+        assert result['balancePercentiles'][f'p{p}'] == np.round(row, 2).tolist()
+
+
+def test_without_volatility_matches_closed_form():
+    income, expenses = 5000, 4000
+    saved = min((income - expenses) * 0.8, income * 0.2)
+    result = project_savings(income, expenses, TARGETS, income_volatility=0, expense_volatility=0,
+                             paths=3, months=100)
+
+    running = 0
+    for target, outcome in zip(TARGETS, result['targets']):
+        running += target['amount']
+        month = math.ceil(running / saved)
+        expected = month if month <= 100 else None
+        assert outcome['monthsToTarget'] == {'p10': expected, 'p50': expected, 'p90': expected}
+        assert outcome['probabilityWithinHorizon'] == (1.0 if expected else 0.0)
+    assert result['balancePercentiles']['p50'] == pytest.approx([saved * m for m in range(1, 101)])
+
+
+def test_same_seed_same_result():
+    first = project_savings(6000, 4500, TARGETS, paths=500, months=48, seed=11)
+    assert first == project_savings(6000, 4500, TARGETS, paths=500, months=48, seed=11)
+
+
+def test_expense_profile():
+    expenses = [Transaction('2024-01-10', 'Food', 100.0, ''), Transaction('2024-01-20', 'Food', 100.0, ''),
+                Transaction('2024-02-05', 'Food', 300.0, '')]
+    baseline, volatility = expense_profile(expenses)
+    assert baseline == pytest.approx(250)
+    assert volatility == pytest.approx(np.std([200, 300], ddof=1) / 250)
+
+    # One month of history falls back to the default volatility
+    baseline, volatility = expense_profile(expenses[:2])
+    assert (baseline, volatility) == (200, projection.DEFAULT_EXPENSE_VOLATILITY)
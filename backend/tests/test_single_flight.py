@@ -0,0 +1,168 @@
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import SingleFlight, fcntl
+
+
+def wait_until(condition, timeout=5):
+    give_up = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < give_up, "timed out"
+        time.sleep(0.005)
+
+
+def run_concurrently(flight, key, fn, n):
+    """Start n callers of flight.do(key, fn); returns (threads, results, errors)"""
+    results, errors = [None] * n, [None] * n
+
+    def call(i):
+        try:
+            results[i] = flight.do(key, fn)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_identical_calls_run_once():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    threads, results, errors = run_concurrently(flight, 'prompt', work, 8)
+    wait_until(lambda: flight.stats()['coalesced'] == 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert errors == [None] * 8
+    assert all(result is results[0] for result in results)
+    assert flight.stats()['inFlight'] == 0
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def work():
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    threads, results, errors = run_concurrently(flight, 'prompt', work, 4)
+    wait_until(lambda: flight.stats()['coalesced'] == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert flight.stats()['inFlight'] == 0
+
+
+def test_waiter_gives_up_after_timeout():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=('prompt', lambda: release.wait(5) and 'answer'))
+    leader.start()
+    wait_until(lambda: flight.stats()['inFlight'] == 1)
+
+    with pytest.raises(TimeoutError):
+        flight.do('prompt', lambda: 'not called', timeout=0.05)
+    release.set()
+    leader.join()
+    # The leader is unaffected and later callers start afresh
+    assert flight.stats()['inFlight'] == 0
+    assert flight.do('prompt', lambda: 'again', timeout=0.05) == 'again'
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flight = SingleFlight()
+    assert [flight.do(key, lambda key=key: key * 2) for key in ('a', 'b', 'a')] == ['aa', 'bb', 'aa']
+    assert flight.stats()['leaders'] == 3
+    assert flight.stats()['coalesced'] == 0
+
+
+@pytest.mark.skipif(fcntl is None, reason="cross-worker coalescing needs fcntl")
+def test_other_worker_rechecks_instead_of_calling(tmp_path):
+    # Two instances sharing a lock directory stand in for two worker processes
+    first, second = SingleFlight(str(tmp_path)), SingleFlight(str(tmp_path))
+    leading, release = threading.Event(), threading.Event()
+    cache = {}
+
+    def lead():
+        # Runs with the lock file held
+        leading.set()
+        release.wait(5)
+        cache['prompt'] = 'answer'
+        return 'answer'
+
+    leader = threading.Thread(target=first.do, args=('prompt', lead))
+    leader.start()
+    assert leading.wait(5)
+
+    calls = []
+    outcome = {}
+
+    def follow():
+        outcome['value'] = second.do('prompt', lambda: calls.append(1) or 'again',
+                                     recheck=lambda: cache.get('prompt'), timeout=5)
+
+    follower = threading.Thread(target=follow)
+    follower.start()
+    wait_until(lambda: second.stats()['crossWorkerWaits'] == 1)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert outcome['value'] == 'answer'
+    assert calls == []
+    assert second.stats()['crossWorkerCoalesced'] == 1
+
+
+def test_llm_client_sends_identical_prompts_upstream_once():
+    from utils.llm_client import LLMClient
+
+    release = threading.Event()
+    calls = []
+
+    class Model:
+        def generate_content(self, prompt, **kwargs):
+            calls.append(prompt)
+            release.wait(5)
+            return type('Response', (), {'text': prompt.upper()})()
+
+    class Registry:
+        model_name = 'stub'
+        model = Model()
+
+    class NoCache:
+        def get(self, key, site):
+            return None
+
+        def put(self, *args):
+            pass
+
+    client = LLMClient(registry=Registry(), cache=NoCache(), max_in_flight=4)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.generate('hello', deadline=10)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: client.flights.stats()['coalesced'] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ['hello']
+    assert results == ['HELLO'] * 5
+    assert client.gate.in_flight == 0
@@ -0,0 +1,134 @@
+import threading
+
+import pytest
+
+from utils.records import Transaction
+from utils.transaction_store import TransactionStore
+
+USER = 'alice'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TransactionStore(str(tmp_path / 'finance.db'), batch_size=3)
+
+
+def rows(store, user_id=USER):
+    return sorted((row['date'], row['amount'], row['description']) for row in store.transactions(user_id))
+
+
+def statement():
+    return [
+        Transaction('2024-03-01', 'Food', 4.5, 'Coffee'),
+        Transaction('2024-03-01', 'Food', 4.5, 'Coffee'),
+        Transaction('2024-03-02', 'Housing', 1200.0, 'Rent'),
+        Transaction('03/05/2024', 'Travel', 30.0, 'Uber trip'),
+    ]
+
+
+def test_append_stores_every_row(store):
+    assert store.append(USER, statement()) == {'stored': 4, 'skipped': 0}
+    assert rows(store) == [('2024-03-01', 4.5, 'Coffee'), ('2024-03-01', 4.5, 'Coffee'),
+                           ('2024-03-02', 1200.0, 'Rent'), ('2024-03-05', 30.0, 'Uber trip')]
+
+
+def test_skip_stored_only_adds_what_is_new(store):
+    store.append(USER, statement(), skip_stored=True)
+    # The same statement again, with its date and description written differently
+    again = [Transaction('03/01/2024', 'Food', 4.5, ' COFFEE')] + statement()[1:]
+    assert store.append(USER, again, skip_stored=True) == {'stored': 0, 'skipped': 4}
+
+    # Overlaps the first: a third coffee that day and one new row
+    overlap = statement()[:2] + [Transaction('2024-03-01', 'Food', 4.5, 'coffee'),
+                                 Transaction('2024-03-09', 'Food', 12.0, 'Lunch')]
+    assert store.append(USER, overlap, skip_stored=True) == {'stored': 2, 'skipped': 2}
+    assert [r for r in rows(store) if r[0] == '2024-03-01'] == [('2024-03-01', 4.5, 'Coffee')] * 2 + \
+        [('2024-03-01', 4.5, 'coffee')]
+    assert len(store.rollup(USER)) == 6
+
+    # Another user's history does not count
+    assert store.append('bob', statement(), skip_stored=True) == {'stored': 4, 'skipped': 0}
+
+
+def test_failed_append_stores_nothing(store):
+    store.append(USER, statement()[:1])
+
+    def rows_then_error():
+        yield from statement() * 2
+        raise ValueError("bad row")
+
+    with pytest.raises(ValueError):
+        store.append(USER, rows_then_error())
+    assert rows(store) == [('2024-03-01', 4.5, 'Coffee')]
+    assert len(store.rollup(USER)) == 1
+    assert store.rollup(USER).total() == 4.5
+
+
+def test_concurrent_uploads_of_one_statement_store_it_once(store):
+    # The first append is paused mid-way while holding the write lock; the second must wait for it
+    started, release = threading.Event(), threading.Event()
+    outcomes = {}
+
+    def slow_statement():
+        yield from statement()[:2]
+        started.set()
+        release.wait(5)
+        yield from statement()[2:]
+
+    def upload(name, expenses):
+        outcomes[name] = store.append(USER, expenses, skip_stored=True)
+
+    first = threading.Thread(target=upload, args=('first', slow_statement()))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=upload, args=('second', statement()))
+    second.start()
+    second.join(0.2)
+    assert second.is_alive()
+    release.set()
+    first.join()
+    second.join()
+
+    assert outcomes == {'first': {'stored': 4, 'skipped': 0}, 'second': {'stored': 0, 'skipped': 4}}
+    assert len(rows(store)) == 4
+
+
+def test_delete_updates_the_rollup(store):
+    store.append(USER, [Transaction('2024-03-01', 'Food', amount, 'Cafe') for amount in (5.0, 20.0, 7.5, 6.0)] +
+                 [Transaction('2024-04-01', 'Food', 9.0, 'Cafe')])
+    ids = {row['amount']: row['id'] for row in store.transactions(USER)}
+
+    def march():
+        rollup = store.rollup(USER, '2024-03-01', '2024-03-31')
+        stats = rollup.category_stats()['Food']
+        return rollup.total(), stats['count'], stats['min'], stats['max'], stats['stdDev']
+
+    # Neither the min nor the max: subtracted in place
+    assert store.delete_transaction(USER, ids[7.5])
+    assert march() == (31.0, 3, 5.0, 20.0, 8.39)
+    # The max: the group is recomputed
+    assert store.delete_transaction(USER, ids[20.0])
+    assert march() == (11.0, 2, 5.0, 6.0, 0.71)
+    assert not store.delete_transaction('bob', ids[5.0])
+
+    # The last row of a month
+    assert store.delete_transaction(USER, ids[9.0])
+    assert store.rollup(USER).monthly_totals()[-1][0] == '2024-03'
+    assert store.rollup(USER).total() == 11.0
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    ('2024-01-15', '2024-03-10', 10.0 + 100.0 + 1000.0),
+    ('2024-01-16', None, 100.0 + 1000.0 + 10000.0),
+    (None, '2024-03-09', 1.0 + 10.0 + 100.0),
+    ('2024-02-01', '2024-02-29', 100.0),
+    ('2024-02-02', '2024-02-28', 0.0),
+    ('2024-03-10', '2024-03-10', 1000.0),
+])
+def test_rollup_ranges_starting_or_ending_mid_month(store, start, end, expected):
+    store.append(USER, [
+        Transaction('2024-01-01', 'Food', 1.0, 'a'), Transaction('2024-01-15', 'Food', 10.0, 'b'),
+        Transaction('2024-02-01', 'Food', 100.0, 'c'), Transaction('2024-03-10', 'Food', 1000.0, 'd'),
+        Transaction('2024-03-31', 'Food', 10000.0, 'e'), Transaction('pending', 'Food', 100000.0, 'f'),
+    ])
+    assert store.rollup(USER, start, end).total() == expected
@@ -0,0 +1,77 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.records import Transaction
+from utils.transaction_table import TransactionTable, parse_dates, total_amount
+
+DATES = ['2024-01-05', '2024-02-29', '01/03/2024', '2024-13-01', '', None]
+CATEGORIES = ['Food', 'Other', 'Housing', '', None]
+DESCRIPTIONS = ['Coffee #12', 'Monthly Rent', 'uber trip', '', None]
+
+
+def random_transactions(n, seed):
+    rng = random.Random(seed)
+    return [
+        Transaction(rng.choice(DATES), rng.choice(CATEGORIES), round(rng.uniform(-50, 500), 2), rng.choice(DESCRIPTIONS))
+        for _ in range(n)
+    ]
+
+
+def reference_date(value):
+    """One value at a time, the way the parser's two passes are meant to read it"""
+    if not value:
+        return np.datetime64('NaT', 'ns')
+    parsed = pd.to_datetime(value, format='ISO8601', errors='coerce')
+    if pd.isna(parsed):
+        parsed = pd.to_datetime(value, format='mixed', errors='coerce')
+    return np.datetime64(parsed, 'ns') if not pd.isna(parsed) else np.datetime64('NaT', 'ns')
+
+
+def test_parse_dates_matches_element_wise_parsing():
+    values = DATES * 3
+    expected = np.array([reference_date(value) for value in values], dtype='datetime64[ns]')
+    np.testing.assert_array_equal(parse_dates(values), expected)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 65536])
+def test_from_records_matches_the_rows(chunk_size):
+    transactions = random_transactions(200, seed=chunk_size)
+    table = TransactionTable.from_records(transactions, chunk_size=chunk_size)
+
+    assert len(table) == len(transactions)
+    assert table.amounts.tolist() == [t.amount for t in transactions]
+    assert table.categories.astype(object).tolist() == [t.category or 'Other' for t in transactions]
+    assert [None if pd.isna(d) else d for d in table.descriptions.astype(object).tolist()] == \
+        [t.description for t in transactions]
+    np.testing.assert_array_equal(table.dates, parse_dates([t.date for t in transactions]))
+
+
+def test_categories_are_numbered_by_first_appearance_across_chunks():
+    transactions = random_transactions(100, seed=1)
+    whole = TransactionTable.from_records(transactions)
+    chunked = TransactionTable.from_records(transactions, chunk_size=4)
+
+    expected = list(dict.fromkeys(t.category or 'Other' for t in transactions))
+    assert list(whole.categories.categories) == expected
+    assert list(chunked.categories.categories) == expected
+    assert list(chunked.descriptions.categories) == list(whole.descriptions.categories)
+    np.testing.assert_array_equal(chunked.descriptions.codes, whole.descriptions.codes)
+
+
+def test_to_records_round_trip():
+    transactions = [
+        Transaction('2024-03-01', 'Food', 12.5, 'Cafe'),
+        Transaction('', 'Other', 3.0, 'Misc'),
+        Transaction('2024-03-02', 'Housing', 1200.0, 'Rent'),
+    ]
+    assert TransactionTable.from_records(transactions).to_records() == transactions
+
+
+def test_empty_input():
+    table = TransactionTable.from_records([])
+    assert len(table) == 0
+    assert table.to_records() == []
+    assert total_amount(table) == 0.0
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+import utils.upload_batch as upload_batch
+from config import Config
+from utils.upload_batch import expand_uploads, get_pool, parse_jobs
+
+
+@pytest.fixture
+def pool_workers(monkeypatch):
+    monkeypatch.setattr(Config, 'UPLOAD_WORKERS', 2)
+    yield
+    pool = upload_batch._pool
+    if pool is not None:
+        upload_batch._discard_pool(pool)
+
+
+@pytest.fixture
+def forkable(monkeypatch):
+    # Earlier tests leave idle executor threads behind; none of them holds a lock the parser needs
+    monkeypatch.setattr(upload_batch.threading, 'active_count', lambda: 1)
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    files = []
+    for i in range(4):
+        path = tmp_path / f'{i}.csv'
+        path.write_text('date,category,amount,description\n' +
+                        ''.join(f'2024-03-{day:02d},Food,{i + day}.5,Cafe {i}\n' for day in range(1, 6)))
+        files.append((f'{i}.csv', str(path), None))
+    return expand_uploads(files)
+
+
+def parsed(results):
+    return {index: (name, [e.amount for e in expenses], error) for index, (name, expenses, _, _, error, _) in results}
+
+
+def test_pool_matches_inline_parsing(pool_workers, forkable, jobs):
+    assert get_pool() is not None
+    inline = parsed((index, upload_batch.parse_job(job)) for index, job in enumerate(jobs))
+    assert parsed(parse_jobs(jobs)) == inline
+
+
+def test_dead_worker_falls_back_to_inline_parsing(pool_workers, forkable, jobs):
+    pool = get_pool()
+    pool.submit(int).result()
+    for process in list(pool._processes.values()):
+        process.kill()
+
+    results = parsed(parse_jobs(jobs))
+    assert sorted(results) == [0, 1, 2, 3]
+    assert all(error is None and len(amounts) == 5 for _, amounts, error in results.values())
+
+    # The broken pool is dropped; the next upload gets a new one
+    assert upload_batch._pool is None
+    fresh = get_pool()
+    assert fresh is not None and fresh is not pool
+    assert parsed(parse_jobs(jobs)) == results
+
+
+def test_no_fork_while_other_threads_run(pool_workers, jobs):
+    release = threading.Event()
+    thread = threading.Thread(target=release.wait)
+    thread.start()
+    try:
+        assert get_pool() is None
+        assert len(parsed(parse_jobs(jobs))) == 4
+    finally:
+        release.set()
+        thread.join()
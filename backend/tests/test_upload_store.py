@@ -0,0 +1,149 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+from utils.csv_processor import CSVProcessor, ParseReport
+from utils.upload_store import UploadStore, open_parsed, read_parsed, write_parsed
+
+MB = 1024 * 1024
+
+
+def csv_bytes(rows):
+    lines = ['date,category,amount,description'] + [f'2024-03-{i % 28 + 1:02d},Food,{i}.25,Cafe {i}' for i in range(rows)]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def entries(directory):
+    return sorted(name for name in os.listdir(directory))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path), max_bytes=MB, max_age=3600, cleanup_interval=600, min_age=60)
+
+
+def test_save_keeps_one_copy_per_content(store, tmp_path):
+    data = csv_bytes(10)
+    key, path = store.save(io.BytesIO(data))
+    assert key == hashlib.sha256(data).hexdigest()
+    assert open(path, 'rb').read() == data
+    assert store.save(io.BytesIO(data)) == (key, path)
+    assert entries(tmp_path) == [key]
+    assert store.stats()['saves'] == 2
+    assert store.stats()['duplicates'] == 1
+
+
+def test_parse_while_receiving_matches_parsing_the_saved_file(store, tmp_path):
+    data = csv_bytes(5000)
+    upload = store.receive(io.BytesIO(data))
+    report = ParseReport()
+    parse = upload.cache_parse(CSVProcessor().iter_stream(upload, report), report)
+
+    first = [next(parse) for _ in range(10)]
+    # Mid-parse only temp files exist
+    assert all(name.endswith('.tmp') for name in entries(tmp_path))
+    expenses = first + list(parse)
+
+    key = hashlib.sha256(data).hexdigest()
+    assert upload.key == key
+    assert expenses == list(CSVProcessor().iter_file(os.path.join(str(tmp_path), key)))
+    assert entries(tmp_path) == [key, os.path.basename(store.parsed_path(key))]
+
+    cached_report = ParseReport()
+    assert list(read_parsed(open_parsed(store.parsed_path(key)), cached_report)) == expenses
+    assert cached_report.to_dict() == report.to_dict() == {'parsed': 5000, 'skipped': 0, 'errors': []}
+
+
+def test_rows_the_parser_did_not_read_are_still_saved(store):
+    data = csv_bytes(100)
+    upload = store.receive(io.BytesIO(data))
+    upload.read(10)
+    key, path = upload.finish()
+    assert key == hashlib.sha256(data).hexdigest()
+    assert open(path, 'rb').read() == data
+
+
+def test_abandoned_parse_leaves_nothing_behind(store, tmp_path):
+    upload = store.receive(io.BytesIO(csv_bytes(5000)))
+    report = ParseReport()
+    parse = upload.cache_parse(CSVProcessor().iter_stream(upload, report), report)
+    for _ in range(10):
+        next(parse)
+    parse.close()
+    assert entries(tmp_path) == []
+    assert upload.key is None
+
+
+def test_failed_read_leaves_nothing_behind(store, tmp_path):
+    class Disconnect(io.RawIOBase):
+        def __init__(self):
+            self.left = csv_bytes(2000)
+
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            if len(self.left) < 20000:
+                raise ConnectionError("client went away")
+            n = min(len(buffer), 4096)
+            buffer[:n], self.left = self.left[:n], self.left[n:]
+            return n
+
+    upload = store.receive(Disconnect())
+    report = ParseReport()
+    with pytest.raises(ConnectionError):
+        list(upload.cache_parse(CSVProcessor().iter_stream(upload, report), report))
+    assert entries(tmp_path) == []
+
+
+def test_write_parsed_only_caches_complete_parses(store, tmp_path):
+    path = store.parsed_path('a' * 64)
+    report = ParseReport()
+    rows = write_parsed(path, CSVProcessor().iter_stream(io.BytesIO(csv_bytes(50)), report), report)
+    next(rows)
+    rows.close()
+    assert entries(tmp_path) == []
+    assert open_parsed(path) is None
+
+    expenses = list(write_parsed(path, CSVProcessor().iter_stream(io.BytesIO(csv_bytes(50)), report), report))
+    assert list(read_parsed(open_parsed(path), ParseReport())) == expenses
+
+
+def test_cleanup_drops_expired_then_least_recently_used(store, tmp_path):
+    now = time.time()
+
+    def entry(name, size, age):
+        path = tmp_path / name
+        path.write_bytes(b'x' * size)
+        os.utime(path, (now - age, now - age))
+        return name
+
+    expired = entry('1' * 64, 10, 7200)
+    oldest = entry('2' * 64, 400 * 1024, 3000)
+    older = entry('3' * 64 + '.v2.parsed', 400 * 1024, 2000)
+    recent = entry('4' * 64, 400 * 1024, 1000)
+    in_use = entry('5' * 64, 400 * 1024, 10)
+    stale_tmp = entry('upload.tmp', 10, 120)
+    fresh_tmp = entry('other.tmp', 10, 5)
+    unrelated = entry('notes.txt', 10, 99999)
+
+    assert store.cleanup() == 4
+    # Over the byte limit: the oldest go first, but nothing used within min_age
+    assert entries(tmp_path) == sorted([recent, in_use, fresh_tmp, unrelated])
+    assert store.stats()['evicted'] == 4
+    assert expired and oldest and older and stale_tmp
+
+
+def test_maybe_cleanup_runs_once_per_interval(store, tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(store, 'cleanup', lambda: calls.append(1))
+    store.maybe_cleanup()
+    store.maybe_cleanup()
+    store.save(io.BytesIO(b'a,b\n'))
+    assert calls == [1]
+    store._last_cleanup -= store.cleanup_interval
+    store.maybe_cleanup()
+    assert calls == [1, 1]
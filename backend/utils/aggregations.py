@@ -0,0 +1,51 @@
+import numpy as np
+
+
+def group_stats(codes, amounts, n_groups):
+    """
+    Per-group sum, count, min, max, mean and sample standard deviation over
+    integer group codes.
+
+    Sums and counts come from bincount; min/max from one stable sort and a
+    reduceat over each group's contiguous run.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+
+    counts = np.bincount(codes, minlength=n_groups)
+    sums = np.bincount(codes, weights=amounts, minlength=n_groups)
+    squares = np.bincount(codes, weights=amounts * amounts, minlength=n_groups)
+
+    mins = np.full(n_groups, np.nan)
+    maxs = np.full(n_groups, np.nan)
+    nonempty = counts > 0
+    if nonempty.any():
+        sorted_amounts = amounts[np.argsort(codes, kind='stable')]
+        starts = (np.cumsum(counts) - counts)[nonempty]
+        mins[nonempty] = np.minimum.reduceat(sorted_amounts, starts)
+        maxs[nonempty] = np.maximum.reduceat(sorted_amounts, starts)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(nonempty, sums / counts, np.nan)
+        variances = np.where(counts > 1, (squares - sums * means) / (counts - 1), 0.0)
+
+    return {'sum': sums, 'count': counts, 'min': mins, 'max': maxs, 'mean': means,
+            'std': np.sqrt(np.maximum(variances, 0.0))}
+
+
+def monthly_totals(codes, amounts, dates, n_groups):
+    """
+    Per-month, per-group sums and counts for rows with a valid date.
+
+    Returns (months, sums, counts) where months is a sorted datetime64[M]
+    array and sums/counts have shape (len(months), n_groups).
+    """
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    valid = ~np.isnat(dates)
+    months, month_index = np.unique(dates[valid].astype('datetime64[M]'), return_inverse=True)
+
+    keys = month_index.astype(np.int64) * n_groups + np.asarray(codes, dtype=np.int64)[valid]
+    size = len(months) * n_groups
+    sums = np.bincount(keys, weights=np.asarray(amounts, dtype=np.float64)[valid], minlength=size)
+    counts = np.bincount(keys, minlength=size)
+    return months, sums.reshape(len(months), n_groups), counts.reshape(len(months), n_groups)
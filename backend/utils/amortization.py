@@ -0,0 +1,124 @@
+import numpy as np
+
+from utils.metrics import timed
+
+# Balances below half a cent count as paid off
+PAID_OFF_EPSILON = 0.005
+
+# Plans that have not finished after 50 years are reported as not paid off
+MAX_MONTHS = 600
+
+
+def simulate_payoff(balances, rates, min_payments, extra_payment, order, max_months=MAX_MONTHS):
+    """
+    Amortize a set of debts month by month.
+
+    Each month interest accrues on every balance (APR / 12), every open debt
+    gets its minimum payment, and whatever is left of the fixed monthly budget
+    (all minimums + extra) goes to debts in ``order``. Minimums of debts that
+    are paid off stay in the budget, which gives snowball/avalanche rollover.
+
+    All per-debt work is vectorized; the loop runs once per month and stops
+    as soon as every balance is zero.
+
+    Returns a dict of:
+    - months: months until everything is paid off (or max_months)
+    - paidOff: whether all debts were paid off within max_months
+    - totalInterest: interest accrued across all debts
+    - payoffMonths: per-debt month of the final payment (-1 if never)
+    - payments / interest / balances: (months, debts) schedule arrays
+    """
+    result = _simulate(balances, rates, min_payments, [extra_payment], [order], max_months, record=True)
+    months = int(result['months'][0])
+    return {
+        'months': months,
+        'paidOff': bool(result['paidOff'][0]),
+        'totalInterest': float(result['totalInterest'][0]),
+        'payoffMonths': result['payoffMonths'][0],
+        'payments': result['payments'][:months, 0],
+        'interest': result['interest'][:months, 0],
+        'balances': result['balances'][:months, 0]
+    }
+
+
+def simulate_scenarios(balances, rates, min_payments, extra_payments, orders, max_months=MAX_MONTHS):
+    """
+    Run many payoff scenarios for the same debts in one batched pass.
+
+    ``extra_payments`` has one entry per scenario and ``orders`` one priority
+    order per scenario, so different extra amounts and strategies can share
+    a single month loop. Only summary results are kept:
+    months, paidOff and totalInterest per scenario, and payoffMonths of shape
+    (scenarios, debts).
+    """
+    return _simulate(balances, rates, min_payments, extra_payments, orders, max_months, record=False)
+
+
+@timed('simulate')
+def _simulate(balances, rates, min_payments, extra_payments, orders, max_months, record):
+    extra_payments = np.maximum(np.asarray(extra_payments, dtype=np.float64), 0.0)
+    orders = np.asarray(orders, dtype=np.int64)
+    n_scenarios, n_debts = orders.shape
+
+    # Lay each scenario's debts out in its own priority order once, so the
+    # monthly allocation is a plain cumsum along the row
+    balances = np.asarray(balances, dtype=np.float64)[orders]
+    monthly_rates = (np.asarray(rates, dtype=np.float64) / 100 / 12)[orders]
+    min_payments = np.asarray(min_payments, dtype=np.float64)[orders]
+    budgets = min_payments.sum(axis=1) + extra_payments
+
+    balances[balances < PAID_OFF_EPSILON] = 0.0
+    payoff_months = np.where(balances > 0, -1, 0)
+    months = np.zeros(n_scenarios, dtype=np.int64)
+    total_interest = np.zeros(n_scenarios)
+
+    if record:
+        shape = (max_months, n_scenarios, n_debts)
+        payments_history = np.zeros(shape)
+        interest_history = np.zeros(shape)
+        balance_history = np.zeros(shape)
+
+    month = 0
+    open_scenarios = balances.any(axis=1)
+    while month < max_months and open_scenarios.any():
+        accrued = balances * monthly_rates
+        balances += accrued
+        total_interest += accrued.sum(axis=1)
+
+        paid = np.minimum(min_payments, balances)
+        leftover = np.maximum(budgets - paid.sum(axis=1), 0.0)
+
+        # Pour the leftover into debts in priority order, capped at each balance
+        remaining = balances - paid
+        ahead = np.cumsum(remaining, axis=1) - remaining
+        paid += np.clip(leftover[:, None] - ahead, 0.0, remaining)
+
+        balances -= paid
+        cleared = balances < PAID_OFF_EPSILON
+        payoff_months[cleared & (payoff_months < 0)] = month + 1
+        balances[cleared] = 0.0
+
+        if record:
+            payments_history[month] = paid
+            interest_history[month] = accrued
+            balance_history[month] = balances
+
+        month += 1
+        months[open_scenarios] = month
+        open_scenarios = balances.any(axis=1)
+
+    # Back to the caller's debt order
+    unsorted = np.empty_like(orders)
+    np.put_along_axis(unsorted, orders, np.arange(n_debts)[None, :].repeat(n_scenarios, axis=0), axis=1)
+
+    result = {
+        'months': months,
+        'paidOff': ~open_scenarios,
+        'totalInterest': total_interest,
+        'payoffMonths': np.take_along_axis(payoff_months, unsorted, axis=1)
+    }
+    if record:
+        result['payments'] = np.take_along_axis(payments_history[:month], unsorted[None], axis=2)
+        result['interest'] = np.take_along_axis(interest_history[:month], unsorted[None], axis=2)
+        result['balances'] = np.take_along_axis(balance_history[:month], unsorted[None], axis=2)
+    return result
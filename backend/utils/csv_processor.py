@@ -1,75 +1,167 @@
 import csv
+import io
 import os
+import sys
+import time
+from itertools import chain
+
+from utils.metrics import record_stage
+from utils.records import Transaction
+from utils.transaction_table import TransactionTable
+
+
+class ParseReport:
+    """Side channel for row-level outcomes of a streaming CSV parse"""
+
+    def __init__(self, max_errors=100):
+        self.parsed = 0
+        self.skipped = 0
+        self.max_errors = max_errors
+        self.errors = []
+
+    def add_error(self, row_num, message):
+        """Record a skipped row, keeping at most ``max_errors`` messages"""
+        self.skipped += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_num, 'error': message})
+
+    def add_failure(self, message):
+        """Record a problem with the file as a whole (row None); no row is counted as skipped"""
+        self.errors.append({'row': None, 'error': message})
+
+    def to_dict(self):
+        return {
+            'parsed': self.parsed,
+            'skipped': self.skipped,
+            'errors': self.errors
+        }
+
 
 class CSVProcessor:
     """Process CSV files containing financial transactions"""
-    
-    def process_file(self, filepath):
+
+    # Characters read up front to detect the delimiter
+    SNIFF_SIZE = 1024
+
+    def process_file(self, filepath, report=None):
         """
-        Process a CSV file and return list of expenses
-        
+        Process a CSV file and return a list of Transactions
+
         Expected CSV format:
         date,category,amount,description
         2024-01-15,Food,85.50,Grocery Store
+
+        A missing or unreadable file is recorded on ``report`` rather than
+        raised; the rows read before the failure are still returned.
         """
         expenses = []
-        
+        report = report if report is not None else ParseReport()
+
         if not os.path.exists(filepath):
-            print(f"Error: File not found: {filepath}")
+            report.add_failure(f"File not found: {filepath}")
             return expenses
-        
+
         try:
-            with open(filepath, 'r', encoding='utf-8') as file:
-                # Try to detect delimiter
-                sample = file.read(1024)
-                file.seek(0)
-                
-                # Use csv.Sniffer to detect format
-                try:
-                    delimiter = csv.Sniffer().sniff(sample).delimiter
-                except:
-                    delimiter = ','
-                
-                reader = csv.DictReader(file, delimiter=delimiter)
-                
-                for row_num, row in enumerate(reader, start=2):
-                    try:
-                        # Handle different possible column names
-                        date = (row.get('date') or row.get('Date') or 
-                               row.get('DATE') or '')
-                        
-                        category = (row.get('category') or row.get('Category') or 
-                                   row.get('CATEGORY') or 'Other')
-                        
-                        amount_str = (row.get('amount') or row.get('Amount') or 
-                                     row.get('AMOUNT') or '0')
-                        
-                        description = (row.get('description') or row.get('Description') or 
-                                      row.get('DESCRIPTION') or row.get('name') or 
-                                      row.get('Name') or '')
-                        
-                        # Clean and convert amount
-                        amount_str = amount_str.replace('$', '').replace(',', '').strip()
-                        amount = float(amount_str)
-                        
-                        expense = {
-                            'date': date.strip(),
-                            'category': category.strip(),
-                            'amount': round(amount, 2),
-                            'description': description.strip()
-                        }
-                        
-                        expenses.append(expense)
-                        
-                    except ValueError as e:
-                        print(f"Warning: Skipping row {row_num} - Invalid amount: {e}")
-                        continue
-                    except Exception as e:
-                        print(f"Warning: Skipping row {row_num} - Error: {e}")
-                        continue
-                        
+            expenses.extend(self.iter_file(filepath, report))
         except Exception as e:
-            print(f"Error processing CSV file: {e}")
-        
-        print(f"Successfully processed {len(expenses)} expenses from CSV")
-        return expenses
\ No newline at end of file
+            report.add_failure(f"Error processing CSV file: {e}")
+        return expenses
+
+    def process_table(self, filepath, report=None):
+        """Process a CSV file into a columnar TransactionTable"""
+        return TransactionTable.from_records(self.iter_file(filepath, report))
+
+    def read_table(self, stream, report=None):
+        """Parse a CSV stream into a columnar TransactionTable"""
+        return TransactionTable.from_records(self.iter_stream(stream, report))
+
+    def iter_file(self, filepath, report=None):
+        """Lazily yield Transactions from a CSV file on disk"""
+        with open(filepath, 'rb') as file:
+            yield from self.iter_stream(file, report)
+
+    def iter_stream(self, stream, report=None, encoding='utf-8'):
+        """
+        Lazily yield Transactions from a binary or text file-like object.
+
+        The stream is consumed in bounded chunks and never seeked, so this
+        works directly on request bodies and memory stays flat regardless of
+        file size. Rows that cannot be parsed are recorded on ``report``
+        instead of interrupting the iteration. Only time spent parsing (not
+        in the consumer between rows) counts toward the 'csv_parse' stage.
+        """
+        busy = 0.0
+        resumed = time.perf_counter()
+        if isinstance(stream, io.TextIOBase):
+            text = stream
+        elif isinstance(stream, io.RawIOBase):
+            text = io.TextIOWrapper(io.BufferedReader(stream), encoding=encoding, newline='')
+        else:
+            text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+
+        try:
+            # Sniff on a prefix that ends on a line boundary, then replay it
+            sample = text.read(self.SNIFF_SIZE)
+            if sample and not sample.endswith(('\n', '\r')):
+                sample += text.readline()
+
+            try:
+                delimiter = csv.Sniffer().sniff(sample).delimiter
+            except csv.Error:
+                delimiter = ','
+
+            lines = chain(io.StringIO(sample, newline=''), text)
+            reader = csv.DictReader(lines, delimiter=delimiter)
+
+            for row_num, row in enumerate(reader, start=2):
+                try:
+                    expense = self._normalize_row(row)
+                except ValueError as e:
+                    if report is not None:
+                        report.add_error(row_num, f"Invalid amount: {e}")
+                    continue
+                except Exception as e:
+                    if report is not None:
+                        report.add_error(row_num, f"Error: {e}")
+                    continue
+
+                if report is not None:
+                    report.parsed += 1
+                busy += time.perf_counter() - resumed
+                yield expense
+                resumed = time.perf_counter()
+        finally:
+            record_stage('csv_parse', busy + time.perf_counter() - resumed)
+            # Unwrap without closing so the caller's stream stays open
+            if text is not stream:
+                buffer = text.detach()
+                if buffer is not stream:
+                    buffer.detach()
+
+    def _normalize_row(self, row):
+        """Map a raw CSV row onto a Transaction"""
+        # Handle different possible column names
+        date = (row.get('date') or row.get('Date') or
+               row.get('DATE') or '')
+
+        category = (row.get('category') or row.get('Category') or
+                   row.get('CATEGORY') or 'Other')
+
+        amount_str = (row.get('amount') or row.get('Amount') or
+                     row.get('AMOUNT') or '0')
+
+        description = (row.get('description') or row.get('Description') or
+                      row.get('DESCRIPTION') or row.get('name') or
+                      row.get('Name') or '')
+
+        # Clean and convert amount
+        amount_str = amount_str.replace('$', '').replace(',', '').strip()
+        amount = float(amount_str)
+
+        # Dates and categories repeat across rows; share one string object for each
+        return Transaction(
+            sys.intern(date.strip()),
+            sys.intern(category.strip()),
+            round(amount, 2),
+            description.strip()
+        )
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+# Non-ISO date layouts seen in bank exports, tried in order
+_DATE_FORMATS = ('%m/%d/%Y', '%Y/%m/%d', '%d.%m.%Y')
+
+
+def iso_date(date):
+    """Return 'YYYY-MM-DD' for a transaction date string, or None if it cannot be parsed"""
+    if not date:
+        return None
+    try:
+        return datetime.fromisoformat(date[:10]).strftime('%Y-%m-%d')
+    except ValueError:
+        pass
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(date, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def month_of(date):
+    """Return 'YYYY-MM' for a transaction date string, or None if it cannot be parsed"""
+    day = iso_date(date)
+    return day[:7] if day else None
@@ -0,0 +1,86 @@
+import random
+import threading
+import time
+import zlib
+
+
+class FakeModelError(RuntimeError):
+    """Injected upstream failure"""
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Offline stand-in for ``google.generativeai.GenerativeModel``.
+
+    ``generate_content`` sleeps for a latency drawn from a lognormal
+    distribution (median ``latency_ms``, shape ``latency_sigma``), or a fixed
+    one when sigma is 0. It fails with probability ``error_rate``, and
+    answers with canned text sized by ``max_output_tokens``. With
+    ``stream=True`` it returns an iterator of chunks. The first chunk comes
+    after ``first_chunk_ratio`` of the latency and the rest are spread over
+    the remainder. Errors can then happen mid-stream.
+    """
+
+    WORDS = ('save', 'budget', 'track', 'spending', 'emergency', 'fund', 'debt', 'interest',
+             'automate', 'transfers', 'review', 'monthly', 'goals', 'income', 'expenses')
+
+    def __init__(self, model_name='fake-gemini', latency_ms=300, latency_sigma=0.5, error_rate=0.0,
+                 chunk_words=8, first_chunk_ratio=0.2, seed=None):
+        self.model_name = model_name
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.chunk_words = chunk_words
+        self.first_chunk_ratio = first_chunk_ratio
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        """Latency in seconds and whether this call fails"""
+        with self._lock:
+            self.calls += 1
+            if self.latency_sigma > 0:
+                latency = self.latency_ms * self._random.lognormvariate(0, self.latency_sigma)
+            else:
+                latency = self.latency_ms
+            return latency / 1000.0, self._random.random() < self.error_rate
+
+    def _text(self, prompt, generation_config):
+        max_tokens = (generation_config or {}).get('max_output_tokens', 256)
+        # Roughly 0.75 words per token, capped so huge limits stay cheap
+        words = min(int(max_tokens * 0.75), 400)
+        # crc32, unlike hash(), is the same in every process and run
+        seed = zlib.crc32(prompt.encode('utf-8')) & 0xffff
+        return ' '.join(self.WORDS[(seed + i) % len(self.WORDS)] for i in range(words))
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        latency, fails = self._draw()
+        text = self._text(prompt, generation_config)
+        if stream:
+            return self._stream(text, latency, fails)
+
+        time.sleep(latency)
+        if fails:
+            raise FakeModelError("Injected upstream error")
+        return FakeResponse(text)
+
+    def _stream(self, text, latency, fails):
+        words = text.split(' ')
+        chunks = [' '.join(words[i:i + self.chunk_words]) + ' '
+                  for i in range(0, len(words), self.chunk_words)]
+        time.sleep(latency * self.first_chunk_ratio)
+        gap = latency * (1 - self.first_chunk_ratio) / max(len(chunks) - 1, 1)
+        # A failing stream dies halfway through, after some text was sent
+        fail_at = len(chunks) // 2 if fails else None
+        for i, chunk in enumerate(chunks):
+            if i == fail_at:
+                raise FakeModelError("Injected mid-stream error")
+            if i:
+                time.sleep(gap)
+            yield FakeResponse(chunk)
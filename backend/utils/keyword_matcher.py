@@ -0,0 +1,53 @@
+import re
+
+
+class KeywordMatcher:
+    """
+    Match text against prioritized keyword groups with one compiled regex.
+
+    Equivalent to checking each group in order and returning the first one
+    with any keyword contained in the text, but the common cases (no match,
+    or a top-priority match) cost a single regex search.
+    """
+
+    def __init__(self, groups, default='Other'):
+        self.default = default
+        self._group_labels = [None]  # regex group numbers start at 1
+        alternatives = []
+
+        for label, keywords in groups.items():
+            if '' in keywords:
+                # An empty keyword matches everything, so later groups can never win
+                self.default = label
+                break
+            if not keywords:
+                continue
+            self._group_labels.append(label)
+            alternatives.append('(' + '|'.join(re.escape(k) for k in keywords) + ')')
+
+        # _prefixes[g] matches any keyword from groups 1..g; the last one is
+        # the full pattern and the matched group number is the priority.
+        self._prefixes = [None] + [
+            re.compile('|'.join(alternatives[:g]))
+            for g in range(1, len(alternatives) + 1)
+        ]
+
+    def match(self, text):
+        """Return the label of the highest-priority group found in text"""
+        if len(self._prefixes) == 1:
+            return self.default
+
+        found = self._prefixes[-1].search(text)
+        if found is None:
+            return self.default
+
+        # The leftmost hit is not necessarily the highest priority, so keep
+        # searching only the groups that would outrank the best one so far.
+        best = found.lastindex
+        while best > 1:
+            found = self._prefixes[best - 1].search(text)
+            if found is None:
+                break
+            best = found.lastindex
+
+        return self._group_labels[best]
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from config import Config
+from utils.lru_cache import LRUCache
+
+
+class ResponseCache:
+    """
+    Two-tier cache of model responses.
+
+    Lookups go to an in-memory LRU first, then to an optional SQLite file
+    shared by every worker on the host. Entries expire after a per-call-site
+    TTL, and hits/misses are counted per call site.
+    """
+
+    def __init__(self, maxsize=1000, db_path=None, default_ttl=3600, max_disk_entries=10000):
+        self.default_ttl = default_ttl
+        self.max_disk_entries = max_disk_entries
+        self._memory = LRUCache(maxsize)
+        self._sites = defaultdict(lambda: {'hits': 0, 'misses': 0, 'stores': 0})
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'created_at REAL NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires_at)')
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model_name, prompt, generation_config=None):
+        """Stable hash of everything that determines a response"""
+        payload = json.dumps(
+            {'model': model_name, 'prompt': prompt, 'config': generation_config or {}},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key, site='default'):
+        text = self._memory.get(key)
+        if text is None and self._db is not None:
+            text = self._disk_get(key)
+        with self._lock:
+            self._sites[site]['hits' if text is not None else 'misses'] += 1
+        return text
+
+    def put(self, key, text, site='default', ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self._memory.put(key, text, ttl=ttl)
+        if self._db is not None:
+            self._disk_put(key, text, ttl)
+        with self._lock:
+            self._sites[site]['stores'] += 1
+
+    def _disk_get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?', (key, now)
+            ).fetchone()
+        if row is None:
+            return None
+        # Promote to memory for the rest of its lifetime
+        self._memory.put(key, row[0], ttl=row[1] - now)
+        return row[0]
+
+    def _disk_put(self, key, text, ttl):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)',
+                (key, text, now, now + ttl)
+            )
+            self._writes += 1
+            # Sweep expired rows and trim to size every so often, not on every write
+            if self._writes % 100 == 0:
+                self._db.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+                self._db.execute(
+                    'DELETE FROM responses WHERE key IN ('
+                    'SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_disk_entries,)
+                )
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            sites = {site: dict(counts) for site, counts in self._sites.items()}
+            disk = None
+            if self._db is not None:
+                disk = {'entries': self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]}
+        return {'memory': self._memory.stats(), 'disk': disk, 'sites': sites}
+
+
+response_cache = ResponseCache(
+    maxsize=Config.LLM_CACHE_SIZE,
+    db_path=Config.LLM_CACHE_DB,
+    default_ttl=Config.LLM_CACHE_TTL
+)
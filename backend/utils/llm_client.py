@@ -0,0 +1,317 @@
+import heapq
+import itertools
+import threading
+import time
+
+from config import Config
+from utils.llm_cache import ResponseCache, response_cache
+from utils.llm_executor import run_with_deadline
+from utils.metrics import LLM_CACHE_LOOKUPS, record_stage, span
+from utils.model_registry import model_registry
+from utils.single_flight import SingleFlight
+
+
+class LLMUnavailableError(RuntimeError):
+    """No model is ready yet (or AI is disabled)"""
+
+
+class LLMBusyError(RuntimeError):
+    """The call was shed because of concurrency or rate limits"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate_per_minute``"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount, max_wait):
+        """
+        Take ``amount`` tokens, possibly on credit.
+
+        Returns the seconds the caller must wait before using them, or None
+        (taking nothing) if that would be longer than ``max_wait``.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            shortfall = amount - self._tokens
+            wait = shortfall / self.rate if shortfall > 0 else 0.0
+            if wait > max_wait:
+                return None
+            self._tokens -= amount
+            return wait
+
+    def refund(self, amount):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class PriorityGate:
+    """
+    Limits concurrent calls; when full, waiters are admitted by priority
+    (lower number first) and then arrival order.
+    """
+
+    def __init__(self, limit, max_queue):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def acquire(self, priority, timeout):
+        """True once a slot is held; False on timeout. Raises LLMBusyError if the queue is full."""
+        with self._lock:
+            if self.in_flight < self.limit and not self.queued:
+                self.in_flight += 1
+                return True
+            if self.queued >= self.max_queue:
+                raise LLMBusyError("LLM queue is full")
+            # [priority, seq, event, state] where state is None, 'granted' or 'abandoned'
+            waiter = [priority, next(self._sequence), threading.Event(), None]
+            heapq.heappush(self._waiters, waiter)
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        waiter[2].wait(timeout)
+        with self._lock:
+            if waiter[3] == 'granted':
+                return True
+            waiter[3] = 'abandoned'
+            self.queued -= 1
+            return False
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = heapq.heappop(self._waiters)
+                if waiter[3] == 'abandoned':
+                    continue
+                # Hand the slot straight to the next waiter
+                waiter[3] = 'granted'
+                self.queued -= 1
+                waiter[2].set()
+                return
+            self.in_flight -= 1
+
+
+class LLMClient:
+    """
+    The one path to the model for every agent and route.
+
+    Each call goes through the response cache, then single-flight
+    coalescing of identical prompts, then per-minute request and
+    token budgets, then a concurrency gate with priority lanes. It then runs
+    on the shared LLM pool under the call site's deadline. Calls that cannot
+    be admitted in time raise, and callers fall back to their deterministic
+    answers. Keep ``max_in_flight`` at or below the pool size so admitted calls
+    never queue again behind the gate.
+    """
+
+    def __init__(self, registry=None, cache=None, max_in_flight=4, max_queue=32,
+                 requests_per_minute=60, tokens_per_minute=100000, flights=None):
+        self.registry = registry or model_registry
+        self.cache = cache or response_cache
+        self.flights = flights or SingleFlight()
+        self.gate = PriorityGate(max_in_flight, max_queue)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = threading.Lock()
+        self._metrics = {
+            'calls': 0, 'completed': 0, 'errors': 0, 'cacheHits': 0,
+            'rejectedQueueFull': 0, 'rejectedRateLimit': 0, 'timedOutWaiting': 0,
+            'queueWaitSeconds': 0.0
+        }
+
+    @property
+    def model(self):
+        return self.registry.model
+
+    @property
+    def available(self):
+        return self.registry.model is not None
+
+    def generate(self, prompt, generation_config=None, site='default', priority=None, deadline=None, ttl=None):
+        """Return the model's text for a prompt; raises on timeout, overload or no model"""
+        model = self.registry.model
+        if model is None:
+            raise LLMUnavailableError("AI model is not ready")
+
+        key = ResponseCache.make_key(self.registry.model_name, prompt, generation_config)
+        text = self.cache.get(key, site)
+        if text is not None:
+            self._count('cacheHits')
+            LLM_CACHE_LOOKUPS.inc(site, 'hit')
+            return text
+        LLM_CACHE_LOOKUPS.inc(site, 'miss')
+
+        priority = priority if priority is not None else Config.LLM_PRIORITIES.get(site, 1)
+        deadline = deadline if deadline is not None else Config.LLM_DEADLINES.get(site) or None
+        ttl = ttl if ttl is not None else Config.LLM_CACHE_TTLS.get(site)
+        started = time.monotonic()
+
+        # Identical prompts already in flight share one upstream call
+        with span('llm'):
+            return self.flights.do(
+                key,
+                lambda: self._generate(model, key, prompt, generation_config, site, priority, deadline, ttl, started),
+                recheck=lambda: self.cache.get(key, site),
+                timeout=deadline
+            )
+
+    def _generate(self, model, key, prompt, generation_config, site, priority, deadline, ttl, started):
+        self._count('calls')
+        if deadline:
+            deadline -= time.monotonic() - started
+            if deadline <= 0:
+                raise TimeoutError("Deadline passed before the model call was admitted")
+        started = time.monotonic()
+
+        estimated_tokens = self._admit(prompt, generation_config, priority, deadline)
+        waited = time.monotonic() - started
+        with self._lock:
+            self._metrics['queueWaitSeconds'] += waited
+
+        def call():
+            try:
+                if generation_config is not None:
+                    response = model.generate_content(prompt, generation_config=generation_config)
+                else:
+                    response = model.generate_content(prompt)
+                text = response.text
+            except Exception:
+                self._count('errors')
+                raise
+            finally:
+                self.gate.release()
+            self.cache.put(key, text, site, ttl)
+            self._count('completed')
+            return text
+
+        def cancelled():
+            # call() releases the slot when it finishes; a call cancelled before it starts never
+            # will, and never used its rate budget either
+            self.gate.release()
+            self._refund(estimated_tokens)
+
+        remaining = deadline - waited if deadline else None
+        return run_with_deadline(call, remaining, on_cancel=cancelled)
+
+    def stream(self, prompt, generation_config=None, site='default', priority=None, deadline=None, ttl=None):
+        """
+        Yield the model's text in chunks as they arrive.
+
+        A cached response is yielded whole. The deadline bounds admission
+        only; once chunks flow, the slot is held until the stream ends or the
+        consumer closes the generator. The full text is cached only when the
+        stream completes.
+        """
+        model = self.registry.model
+        if model is None:
+            raise LLMUnavailableError("AI model is not ready")
+
+        key = ResponseCache.make_key(self.registry.model_name, prompt, generation_config)
+        text = self.cache.get(key, site)
+        if text is not None:
+            self._count('cacheHits')
+            LLM_CACHE_LOOKUPS.inc(site, 'hit')
+            yield text
+            return
+        LLM_CACHE_LOOKUPS.inc(site, 'miss')
+
+        priority = priority if priority is not None else Config.LLM_PRIORITIES.get(site, 1)
+        deadline = deadline if deadline is not None else Config.LLM_DEADLINES.get(site) or None
+        ttl = ttl if ttl is not None else Config.LLM_CACHE_TTLS.get(site)
+        started = time.monotonic()
+        self._count('calls')
+
+        self._admit(prompt, generation_config, priority, deadline)
+        with self._lock:
+            self._metrics['queueWaitSeconds'] += time.monotonic() - started
+
+        chunks = []
+        try:
+            response = model.generate_content(prompt, generation_config=generation_config, stream=True)
+            for chunk in response:
+                if chunk.text:
+                    chunks.append(chunk.text)
+                    yield chunk.text
+        except Exception:
+            self._count('errors')
+            raise
+        finally:
+            self.gate.release()
+            record_stage('llm', time.monotonic() - started)
+        self.cache.put(key, ''.join(chunks), site, ttl)
+        self._count('completed')
+
+    def _admit(self, prompt, generation_config, priority, deadline):
+        """Wait for rate budget and a concurrency slot, within the deadline; returns the tokens reserved"""
+        max_wait = deadline if deadline else float('inf')
+        max_output = (generation_config or {}).get('max_output_tokens', Config.LLM_DEFAULT_OUTPUT_TOKENS)
+        estimated_tokens = len(prompt) // 4 + max_output
+
+        started = time.monotonic()
+        request_wait = self.requests.reserve(1, max_wait)
+        token_wait = self.tokens.reserve(estimated_tokens, max_wait) if request_wait is not None else None
+        if request_wait is None or token_wait is None:
+            if request_wait is not None:
+                self.requests.refund(1)
+            self._count('rejectedRateLimit')
+            raise LLMBusyError("LLM rate limit reached")
+        time.sleep(max(request_wait, token_wait))
+
+        timeout = max_wait - (time.monotonic() - started) if deadline else None
+        try:
+            admitted = self.gate.acquire(priority, timeout)
+        except LLMBusyError:
+            self._refund(estimated_tokens)
+            self._count('rejectedQueueFull')
+            raise
+        if not admitted:
+            self._refund(estimated_tokens)
+            self._count('timedOutWaiting')
+            raise TimeoutError("Timed out waiting for an LLM slot")
+        return estimated_tokens
+
+    def _refund(self, estimated_tokens):
+        """Return the rate budget of a call that was never made"""
+        self.requests.refund(1)
+        self.tokens.refund(estimated_tokens)
+
+    def _count(self, name):
+        with self._lock:
+            self._metrics[name] += 1
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['queueWaitSeconds'] = round(metrics['queueWaitSeconds'], 3)
+        metrics.update({
+            'inFlight': self.gate.in_flight,
+            'queued': self.gate.queued,
+            'maxQueueDepth': self.gate.max_queued,
+            'maxInFlight': self.gate.limit,
+            'maxQueue': self.gate.max_queue,
+            'singleFlight': self.flights.stats(),
+            'cache': self.cache.stats()
+        })
+        return metrics
+
+
+llm_client = LLMClient(
+    max_in_flight=Config.LLM_MAX_IN_FLIGHT,
+    max_queue=Config.LLM_MAX_QUEUE,
+    requests_per_minute=Config.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=Config.LLM_TOKENS_PER_MINUTE,
+    flights=SingleFlight(Config.LLM_SINGLE_FLIGHT_DIR)
+)
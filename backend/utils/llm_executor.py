@@ -0,0 +1,24 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from config import Config
+
+# Model calls run here so a slow upstream never holds a request thread past its deadline
+_executor = ThreadPoolExecutor(max_workers=Config.LLM_MAX_WORKERS, thread_name_prefix='llm')
+
+
+def run_with_deadline(fn, deadline, *args, on_cancel=None, **kwargs):
+    """
+    Run fn on the bounded LLM pool and wait at most ``deadline`` seconds.
+
+    Raises TimeoutError when the deadline passes. A call that has already
+    started keeps running in the background (so it can still fill caches);
+    one still waiting in the queue is cancelled and ``on_cancel`` is called,
+    since fn will never run to clean up after itself.
+    """
+    future = _executor.submit(fn, *args, **kwargs)
+    try:
+        return future.result(timeout=deadline)
+    except FutureTimeoutError:
+        if future.cancel() and on_cancel is not None:
+            on_cancel()
+        raise TimeoutError(f"Model call exceeded {deadline:g}s deadline")
@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Bounded, thread-safe least-recently-used cache with hit/miss/eviction counters"""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # Bumped by clear() so values computed before it can be dropped on put()
+        self.generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation=None, ttl=None):
+        """
+        Store a value, optionally expiring after ``ttl`` seconds.
+
+        Ignored if the cache was cleared since ``generation`` was read.
+        """
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0
+            }
@@ -0,0 +1,213 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Request, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from config import Config
+
+# Seconds; fine at the low end because most stages take well under 10ms
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [per-bucket counts (last is +Inf), sum, count]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count)
+                        for labels, (counts, total, count) in sorted(self._series.items())]
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds counters and histograms, plus collectors that report gauges at scrape time"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """``collect()`` returns (name, documentation, {label tuple: value}, labelnames) gauges"""
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            try:
+                gauges = collect()
+            except Exception as e:
+                print(f"Warning: metrics collector failed: {e}")
+                continue
+            for name, documentation, values, labelnames in gauges:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} gauge")
+                for labels, value in values.items():
+                    lines.append(f"{name}{_format_labels(labelnames, labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    'financial_coach_stage_duration_seconds', 'Time spent in each processing stage', ['stage'])
+REQUEST_SECONDS = metrics.histogram(
+    'financial_coach_request_duration_seconds', 'Time to produce response headers', ['method', 'route', 'status'])
+REQUESTS = metrics.counter(
+    'financial_coach_requests_total', 'HTTP requests handled', ['method', 'route', 'status'])
+LLM_CACHE_LOOKUPS = metrics.counter(
+    'financial_coach_llm_cache_lookups_total', 'LLM response cache lookups', ['site', 'result'])
+
+
+def record_stage(stage, seconds):
+    """Add a stage timing to the histogram and to the current request's Server-Timing"""
+    if not Config.METRICS_ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, stage)
+    if has_request_context():
+        timings = g.setdefault('stage_timings', {})
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def timed(stage):
+    """Decorator form of span()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_stage(stage, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class TimedRequest(Request):
+    """Request whose JSON body parsing counts as the 'parse' stage"""
+
+    def get_json(self, *args, **kwargs):
+        with span('parse'):
+            return super().get_json(*args, **kwargs)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider whose jsonify() responses count as the 'serialize' stage"""
+
+    def response(self, *args, **kwargs):
+        with span('serialize'):
+            return super().response(*args, **kwargs)
+
+
+def init_app(app):
+    """
+    Time every request and its stages; adds a Server-Timing header when SERVER_TIMING is on.
+
+    For streamed responses (uploads, SSE chat), request duration ends when the
+    headers are sent. Stages that run while the body streams still land in
+    the histograms.
+    """
+    if not Config.METRICS_ENABLED:
+        return
+    app.request_class = TimedRequest
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = str(response.status_code)
+        REQUEST_SECONDS.observe(elapsed, request.method, route, status)
+        REQUESTS.inc(request.method, route, status)
+        if Config.SERVER_TIMING:
+            parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in g.get('stage_timings', {}).items()]
+            parts.append(f"total;dur={elapsed * 1000:.2f}")
+            response.headers['Server-Timing'] = ', '.join(parts)
+        return response
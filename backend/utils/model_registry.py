@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+
+from config import Config
+
+
+class ModelRegistry:
+    """
+    Single shared Gemini model handle for the whole app.
+
+    The SDK import and model discovery happen on a background thread, so
+    startup never waits on the network. Until a model is ready, ``model`` is
+    None and callers use their fallbacks. The chosen model name is saved to a
+    small state file, and later restarts reuse it without probing.
+    """
+
+    # Tried in order when there is no remembered model
+    CANDIDATES = [
+        'models/gemini-2.5-flash',
+        'gemini-2.5-flash',
+        'models/gemini-flash-latest',
+        'gemini-flash-latest',
+        'models/gemini-2.0-flash',
+        'models/gemini-2.5-pro',
+        'models/gemini-pro-latest',
+    ]
+
+    def __init__(self, api_key, state_path, state_ttl=7 * 24 * 3600, candidates=None, backend='gemini'):
+        self.api_key = api_key
+        self.backend = backend
+        self.state_path = state_path
+        self.state_ttl = state_ttl
+        self.candidates = candidates or list(self.CANDIDATES)
+        self.model = None
+        self.model_name = None
+        self.status = 'idle'
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.model is not None
+
+    def start(self):
+        """Begin discovery in the background; returns immediately"""
+        if self.backend == 'fake':
+            from utils.fake_model import FakeGenerativeModel
+            model = FakeGenerativeModel(
+                latency_ms=Config.FAKE_LLM_LATENCY_MS,
+                latency_sigma=Config.FAKE_LLM_LATENCY_SIGMA,
+                error_rate=Config.FAKE_LLM_ERROR_RATE,
+                seed=Config.FAKE_LLM_SEED
+            )
+            self._use(model, model.model_name)
+            print(f"🧪 Using offline fake model ({Config.FAKE_LLM_LATENCY_MS:g}ms median)")
+            return
+        if not self.api_key or self.api_key in ('your_google_api_key_here', 'PUT_YOUR_KEY_HERE'):
+            print("⚠️ No valid Google API Key")
+            self.status = 'disabled'
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self.status = 'discovering'
+            self._thread = threading.Thread(target=self._discover, name='model-discovery', daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout=None):
+        """Block until discovery has finished (for scripts and tests)"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.enabled
+
+    def _discover(self):
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+        except Exception as e:
+            print(f"❌ Initialization error: {e}")
+            self.status = 'failed'
+            return
+
+        remembered = self._load_state()
+        if remembered:
+            self._use(genai.GenerativeModel(remembered), remembered)
+            print(f"✅ Using remembered model: {remembered}")
+            return
+
+        for model_name in self.candidates:
+            try:
+                print(f"🔄 Trying: {model_name}")
+                model = genai.GenerativeModel(model_name)
+                model.generate_content(
+                    "Say 'ready' in one word",
+                    generation_config={'max_output_tokens': 10}
+                )
+            except Exception as e:
+                print(f"   ❌ Failed: {str(e)[:80]}")
+                continue
+
+            self._use(model, model_name)
+            self._save_state(model_name)
+            print(f"✅ SUCCESS! Using: {model_name}")
+            return
+
+        print("❌ All models failed")
+        self.status = 'failed'
+
+    def _use(self, model, model_name):
+        with self._lock:
+            self.model = model
+            self.model_name = model_name
+            self.status = 'ready'
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if time.time() - state.get('savedAt', 0) > self.state_ttl:
+            return None
+        return state.get('model')
+
+    def _save_state(self, model_name):
+        # Write then rename so concurrent workers never read a partial file
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'model': model_name, 'savedAt': time.time()}, file)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"Warning: Could not save model state: {e}")
+
+    def forget(self):
+        """Drop the remembered model so the next start() probes again"""
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+
+model_registry = ModelRegistry(
+    Config.GOOGLE_API_KEY,
+    Config.MODEL_STATE_PATH,
+    Config.MODEL_STATE_TTL,
+    backend=Config.LLM_BACKEND
+)
@@ -0,0 +1,271 @@
+import collections
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+from flask import g, request
+
+PROFILE_ID_PATTERN = re.compile(r'^[\w-]+$')
+MODES = ('cprofile', 'sampling')
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack every ``interval`` seconds"""
+
+    def __init__(self, thread_id, interval=0.005):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.self_counts = collections.Counter()
+        self.total_counts = collections.Counter()
+        self.stacks = collections.Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            names = []
+            seen = set()
+            leaf = True
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                if leaf:
+                    self.self_counts[key] += 1
+                    leaf = False
+                # Recursion counts once per sample toward the inclusive total
+                if key not in seen:
+                    self.total_counts[key] += 1
+                    seen.add(key)
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class ProfileSession:
+    """One profiled request: a deterministic or sampling profiler plus a tracemalloc snapshot"""
+
+    def __init__(self, profile_id, mode, sample_interval):
+        self.profile_id = profile_id
+        self.mode = mode
+        self.method = request.method
+        self.path = request.path
+        self.route = request.url_rule.rule if request.url_rule is not None else None
+        self.sample_interval = sample_interval
+        self.profiler = None
+        self.sampler = None
+        self.snapshot = None
+        self.peak_bytes = None
+        self.started = None
+        self.duration = None
+
+    def start(self):
+        tracemalloc.start()
+        self.started = time.perf_counter()
+        if self.mode == 'sampling':
+            self.sampler = StackSampler(threading.get_ident(), self.sample_interval)
+            self.sampler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+        self.duration = time.perf_counter() - self.started
+        self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        self.snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+
+class RequestProfiler:
+    """
+    Opt-in profiling of single requests, gated by an admin token.
+
+    A request that sends ``X-Profile: cprofile`` (or ``sampling``) together
+    with a valid ``X-Admin-Token`` runs under that profiler with tracemalloc
+    on. The raw profile, allocation snapshot and a JSON summary of the
+    hottest functions are saved under ``directory``, and the response
+    carries their ID in ``X-Profile-Id``. One request is profiled at a time;
+    while one is running, others are served normally. When profiling is
+    disabled, init_app registers nothing, so there is no per-request cost.
+    """
+
+    def __init__(self, directory, token, top=25, sample_interval=0.005):
+        self.directory = directory
+        self.token = token
+        self.top = top
+        self.sample_interval = sample_interval
+        self._busy = threading.Lock()
+
+    def authorized(self, token):
+        return bool(self.token) and token is not None and hmac.compare_digest(token, self.token)
+
+    def init_app(self, app):
+        if not self.token:
+            print("⚠️ Profiling enabled without PROFILING_TOKEN - profiling stays off")
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        print(f"🔬 Request profiling available (profiles in {self.directory})")
+
+    def _before_request(self):
+        mode = request.headers.get('X-Profile')
+        if not mode or not self.authorized(request.headers.get('X-Admin-Token')):
+            return
+        if mode not in MODES or not self._busy.acquire(blocking=False):
+            return
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        session = ProfileSession(profile_id, mode, self.sample_interval)
+        g.profile_session = session
+        session.start()
+
+    def _after_request(self, response):
+        session = g.pop('profile_session', None)
+        if session is None:
+            return response
+        response.headers['X-Profile-Id'] = session.profile_id
+        if response.is_streamed:
+            # The body is produced while streaming; keep profiling until it is done
+            response.response = self._finish_after(response.response, session)
+        else:
+            self._finish(session)
+        return response
+
+    def _teardown_request(self, error=None):
+        # Only reached with a live session if after_request never ran
+        session = g.pop('profile_session', None)
+        if session is not None:
+            self._finish(session)
+
+    def _finish_after(self, body, session):
+        try:
+            yield from body
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+            self._finish(session)
+
+    def _finish(self, session):
+        try:
+            session.stop()
+            self._save(session)
+        except Exception as e:
+            print(f"Warning: Could not save profile {session.profile_id}: {e}")
+        finally:
+            self._busy.release()
+
+    def _save(self, session):
+        base = os.path.join(self.directory, session.profile_id)
+        if session.profiler is not None:
+            session.profiler.dump_stats(base + '.prof')
+            functions = self._cprofile_summary(session.profiler)
+        else:
+            with open(base + '.folded', 'w', encoding='utf-8') as file:
+                for stack, count in session.sampler.stacks.most_common():
+                    file.write(f"{stack} {count}\n")
+            functions = self._sampling_summary(session.sampler)
+        session.snapshot.dump(base + '.tracemalloc')
+
+        summary = {
+            'id': session.profile_id,
+            'mode': session.mode,
+            'method': session.method,
+            'path': session.path,
+            'route': session.route,
+            'durationMs': round(session.duration * 1000, 2),
+            'peakTracedKB': round(session.peak_bytes / 1024, 1),
+            'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'topFunctions': functions,
+            'topAllocations': self._allocation_summary(session.snapshot),
+        }
+        with open(base + '.json', 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=2)
+        print(f"🔬 Profiled {session.method} {session.path} in {summary['durationMs']}ms -> {session.profile_id}")
+
+    def _cprofile_summary(self, profiler):
+        stats = pstats.Stats(profiler).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        return [
+            {
+                'function': name,
+                'file': _short_path(filename),
+                'line': line,
+                'calls': calls,
+                'selfMs': round(self_time * 1000, 3),
+                'cumulativeMs': round(cumulative * 1000, 3),
+            }
+            for (filename, line, name), (primitive_calls, calls, self_time, cumulative, callers) in rows
+        ]
+
+    def _sampling_summary(self, sampler):
+        samples = max(sampler.samples, 1)
+        return [
+            {
+                'function': name,
+                'file': _short_path(filename),
+                'line': line,
+                'selfSamples': count,
+                'totalSamples': sampler.total_counts[(filename, line, name)],
+                'selfPercent': round(count * 100 / samples, 1),
+            }
+            for (filename, line, name), count in sampler.self_counts.most_common(self.top)
+        ]
+
+    def _allocation_summary(self, snapshot):
+        return [
+            {'location': f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+             'sizeKB': round(stat.size / 1024, 1), 'count': stat.count}
+            for stat in snapshot.statistics('lineno')[:self.top]
+        ]
+
+    def list_profiles(self):
+        try:
+            names = sorted(os.listdir(self.directory), reverse=True)
+        except OSError:
+            return []
+        profiles = []
+        for name in names:
+            if name.endswith('.json'):
+                summary = self.get_profile(name[:-len('.json')])
+                if summary:
+                    profiles.append({key: summary[key] for key in ('id', 'mode', 'method', 'path', 'durationMs', 'createdAt')})
+        return profiles
+
+    def get_profile(self, profile_id):
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, profile_id + '.json'), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+
+def _short_path(filename):
+    """Paths relative to the backend or site-packages, for readability"""
+    for marker in ('site-packages' + os.sep, 'backend' + os.sep):
+        index = filename.rfind(marker)
+        if index != -1:
+            return filename[index + len(marker):]
+    return filename
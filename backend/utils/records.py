@@ -0,0 +1,89 @@
+class Transaction:
+    """
+    One expense: date, category, amount, description.
+
+    A slotted object is a fraction of the size of the equivalent 4-key dict
+    and reads its fields as attributes. Agents, the parser and the stores pass
+    these around; dicts only exist at the HTTP boundary (from_dict/to_dict).
+    """
+
+    __slots__ = ('date', 'category', 'amount', 'description')
+
+    def __init__(self, date='', category='Other', amount=0.0, description=''):
+        self.date = date
+        self.category = category
+        self.amount = amount
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, data):
+        """From the JSON shape; missing fields get the defaults the agents always assumed"""
+        return cls(
+            data.get('date') or '',
+            data.get('category') or 'Other',
+            float(data.get('amount', 0)),
+            data.get('description') or ''
+        )
+
+    def to_dict(self):
+        return {'date': self.date, 'category': self.category, 'amount': self.amount, 'description': self.description}
+
+    def to_row(self):
+        return [self.date, self.category, self.amount, self.description]
+
+    def __reduce__(self):
+        # Pickle as a plain tuple; much smaller than the default slot state when sent between processes
+        return Transaction, (self.date, self.category, self.amount, self.description)
+
+    def __eq__(self, other):
+        if not isinstance(other, Transaction):
+            return NotImplemented
+        return (self.date, self.category, self.amount, self.description) == \
+            (other.date, other.category, other.amount, other.description)
+
+    def __repr__(self):
+        return f"Transaction({self.date!r}, {self.category!r}, {self.amount!r}, {self.description!r})"
+
+
+class Debt:
+    """One debt: name, balance, APR in percent and minimum monthly payment"""
+
+    __slots__ = ('name', 'balance', 'rate', 'min_payment')
+
+    def __init__(self, name, balance=0.0, rate=0.0, min_payment=0.0):
+        self.name = name
+        self.balance = balance
+        self.rate = rate
+        self.min_payment = min_payment
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['name'],
+            float(data.get('balance', 0)),
+            float(data.get('rate', 0)),
+            float(data.get('minPayment', 0))
+        )
+
+    def to_dict(self):
+        return {'name': self.name, 'balance': self.balance, 'rate': self.rate, 'minPayment': self.min_payment}
+
+    def __reduce__(self):
+        return Debt, (self.name, self.balance, self.rate, self.min_payment)
+
+    def __eq__(self, other):
+        if not isinstance(other, Debt):
+            return NotImplemented
+        return (self.name, self.balance, self.rate, self.min_payment) == \
+            (other.name, other.balance, other.rate, other.min_payment)
+
+    def __repr__(self):
+        return f"Debt({self.name!r}, {self.balance!r}, {self.rate!r}, {self.min_payment!r})"
+
+
+def transactions_from_dicts(expenses):
+    return [Transaction.from_dict(expense) for expense in expenses]
+
+
+def debts_from_dicts(debts):
+    return [Debt.from_dict(debt) for debt in debts]
@@ -0,0 +1,136 @@
+import calendar
+import math
+from collections import defaultdict
+from datetime import date
+
+# Rollup key for rows whose date could not be parsed; they count toward
+# category totals but never toward a month or a date range
+UNDATED = ''
+
+
+def rollup_rows(rows):
+    """
+    Aggregate (month, category, amount) triples into
+    {(month, category): [total, count, min, max, sum of squares]}.
+    """
+    groups = {}
+    for month, category, amount in rows:
+        key = (month or UNDATED, category)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [amount, 1, amount, amount, amount * amount]
+        else:
+            group[0] += amount
+            group[1] += 1
+            if amount < group[2]:
+                group[2] = amount
+            if amount > group[3]:
+                group[3] = amount
+            group[4] += amount * amount
+    return groups
+
+
+def full_months(start, end):
+    """
+    First and last 'YYYY-MM' lying entirely inside the inclusive ISO date range;
+    open ends extend to every month. An empty span comes back with first > last.
+    """
+    first, last = '0000-00', '9999-99'
+    if start:
+        day = date.fromisoformat(start)
+        first = f"{day.year:04d}-{day.month:02d}"
+        if day.day != 1:
+            year, month = (day.year + 1, 1) if day.month == 12 else (day.year, day.month + 1)
+            first = f"{year:04d}-{month:02d}"
+    if end:
+        day = date.fromisoformat(end)
+        last = f"{day.year:04d}-{day.month:02d}"
+        if day.day != calendar.monthrange(day.year, day.month)[1]:
+            year, month = (day.year - 1, 12) if day.month == 1 else (day.year, day.month - 1)
+            last = f"{year:04d}-{month:02d}"
+    return first, last
+
+
+class MonthlyRollup:
+    """
+    Per-month, per-category aggregates of a user's transactions.
+
+    Holds one row per (month, category) with sum, count, min, max and sum of
+    squares, and answers totals, counts and the monthly breakdown plus
+    per-category min/max/mean/standard deviation in time proportional to
+    months x categories rather than transactions.
+    """
+
+    def __init__(self, rows):
+        # [(month, category, total, count, min, max, sum of squares)]
+        self._rows = [row for row in rows if row[3]]
+
+    def __len__(self):
+        return sum(row[3] for row in self._rows)
+
+    def total(self):
+        return sum((row[2] for row in self._rows), 0.0)
+
+    def category_totals(self):
+        totals = defaultdict(float)
+        for _, category, total, _, _, _, _ in self._rows:
+            totals[category] += total
+        return dict(totals)
+
+    def category_counts(self):
+        counts = defaultdict(int)
+        for _, category, _, count, _, _, _ in self._rows:
+            counts[category] += count
+        return dict(counts)
+
+    def category_stats(self):
+        """{category: {'count', 'min', 'max', 'average', 'stdDev'}} merged across months"""
+        merged = {}
+        for _, category, total, count, low, high, squares in self._rows:
+            group = merged.get(category)
+            if group is None:
+                merged[category] = [total, count, low, high, squares]
+            else:
+                group[0] += total
+                group[1] += count
+                group[2] = min(group[2], low)
+                group[3] = max(group[3], high)
+                group[4] += squares
+        return {
+            category: {
+                'count': count,
+                'min': round(low, 2),
+                'max': round(high, 2),
+                'average': round(total / count, 2),
+                'stdDev': round(_std(total, count, squares), 2)
+            }
+            for category, (total, count, low, high, squares) in merged.items()
+        }
+
+    def monthly_totals(self):
+        """[(month, total, count, {category: amount})] in month order"""
+        months = {}
+        for month, category, total, count, _, _, _ in self._rows:
+            if month == UNDATED:
+                continue
+            entry = months.setdefault(month, [0.0, 0, {}])
+            entry[0] += total
+            entry[1] += count
+            entry[2][category] = entry[2].get(category, 0.0) + total
+        return [(month, total, count, categories) for month, (total, count, categories) in sorted(months.items())]
+
+    def to_dict(self):
+        """count, total, categoryTotals and monthlyTotals, as /api/ledger/<user> returns them"""
+        return {
+            'count': len(self),
+            'total': round(self.total(), 2),
+            'categoryTotals': {k: round(v, 2) for k, v in self.category_totals().items()},
+            'monthlyTotals': {month: round(total, 2) for month, total, _, _ in self.monthly_totals()}
+        }
+
+
+def _std(total, count, squares):
+    """Sample standard deviation from sum and sum of squares (0 for a single value)"""
+    if count < 2:
+        return 0.0
+    return math.sqrt(max(squares - total * total / count, 0.0) / (count - 1))
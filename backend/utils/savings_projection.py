@@ -0,0 +1,113 @@
+import numpy as np
+
+from utils.aggregations import monthly_totals
+from utils.metrics import timed
+from utils.rollups import MonthlyRollup
+from utils.transaction_table import TransactionTable, total_amount
+
+# Used when the history is too short to estimate month-to-month variation
+DEFAULT_EXPENSE_VOLATILITY = 0.10
+DEFAULT_INCOME_VOLATILITY = 0.05
+
+PERCENTILES = (10, 50, 90)
+
+# Path-months simulated per block (~8 bytes each per working array)
+CHUNK_CELLS = 250_000
+
+
+def monthly_expense_totals(expenses):
+    """Total spending per calendar month, oldest first, from a list, TransactionTable or MonthlyRollup"""
+    if isinstance(expenses, MonthlyRollup):
+        return np.array([total for _, total, _, _ in expenses.monthly_totals()], dtype=np.float64)
+    table = expenses if isinstance(expenses, TransactionTable) else TransactionTable.from_records(expenses)
+    _, sums, _ = monthly_totals(np.zeros(len(table), dtype=np.int64), table.amounts, table.dates, 1)
+    return sums[:, 0]
+
+
+def expense_profile(expenses):
+    """
+    Baseline monthly spending and its volatility.
+
+    With two or more months of history the baseline is the monthly mean and
+    the volatility is the coefficient of variation between months; otherwise
+    all expenses count as one month with the default volatility.
+    """
+    months = monthly_expense_totals(expenses)
+    if len(months) >= 2 and months.mean() > 0:
+        return float(months.mean()), float(months.std(ddof=1) / months.mean())
+    return float(total_amount(expenses)), DEFAULT_EXPENSE_VOLATILITY
+
+
+@timed('simulate')
+def project_savings(income, monthly_expenses, targets, income_volatility=DEFAULT_INCOME_VOLATILITY,
+                    expense_volatility=DEFAULT_EXPENSE_VOLATILITY, paths=10000, months=120, seed=None):
+    """
+    Monte Carlo projection of cumulative savings.
+
+    Each path draws independent lognormal shocks (mean 1) for income and
+    expenses every month and saves like the deterministic strategy does:
+    80% of what is left over, capped at 20% of that month's income. Targets
+    are reached one after another, so each target's threshold is the
+    running sum of the amounts before it.
+
+    Months are simulated in blocks of about CHUNK_CELLS path-months, keeping
+    only each path's running balance and the month it first reached each
+    target, so memory does not grow with paths x months.
+
+    Returns months-to-target percentiles per target (None when a percentile
+    is not reached within the horizon) and percentile balance timelines.
+    """
+    rng = np.random.default_rng(seed)
+    thresholds = np.cumsum([max(float(target['amount']), 0.0) for target in targets])
+    # Months are 1-based; paths that never get there stay +inf and sort last
+    first = np.full((len(thresholds), paths), np.inf)
+    balance = np.zeros(paths)
+    timeline = np.empty((len(PERCENTILES), months))
+
+    step = max(1, CHUNK_CELLS // paths)
+    for start in range(0, months, step):
+        shape = (paths, min(step, months - start))
+        income_paths = income * _shocks(rng, income_volatility, shape)
+        expense_paths = monthly_expenses * _shocks(rng, expense_volatility, shape)
+        saved = np.minimum(np.maximum(income_paths - expense_paths, 0.0) * 0.8, income_paths * 0.2)
+        balances = balance[:, None] + np.cumsum(saved, axis=1)
+        del income_paths, expense_paths, saved
+
+        # Balances never fall, so a path first reaches a threshold in this
+        # block exactly when it was short before and is past it at the end
+        for first_hit, threshold in zip(first, thresholds):
+            new = np.isinf(first_hit) & (balances[:, -1] >= threshold)
+            if new.any():
+                first_hit[new] = start + (balances[new] >= threshold).argmax(axis=1) + 1
+
+        timeline[:, start:start + shape[1]] = np.percentile(balances, PERCENTILES, axis=0)
+        balance = balances[:, -1].copy()
+
+    results = []
+    for target, first_hit in zip(targets, first):
+        percentiles = np.percentile(first_hit, PERCENTILES, method='higher')
+        results.append({
+            'name': target['name'],
+            'amount': round(float(target['amount']), 2),
+            'probabilityWithinHorizon': round(float(np.isfinite(first_hit).mean()), 4),
+            'monthsToTarget': {
+                f'p{p}': int(value) if np.isfinite(value) else None
+                for p, value in zip(PERCENTILES, percentiles)
+            }
+        })
+
+    return {
+        'paths': paths,
+        'months': months,
+        'targets': results,
+        'balancePercentiles': {
+            f'p{p}': np.round(row, 2).tolist() for p, row in zip(PERCENTILES, timeline)
+        }
+    }
+
+
+def _shocks(rng, volatility, shape):
+    """Multiplicative lognormal noise with mean 1"""
+    if volatility <= 0:
+        return np.ones(shape)
+    return np.exp(rng.normal(-volatility ** 2 / 2, volatility, shape))
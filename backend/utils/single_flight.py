@@ -0,0 +1,126 @@
+import hashlib
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays within one worker
+    fcntl = None
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one.
+
+    Within a worker, the first caller for a key runs the function, and
+    everyone who arrives while it is running waits (up to ``timeout``) and
+    gets the same result or exception. With ``lock_dir`` set, leaders in different worker
+    processes also take an flock on a lock file for the key. A leader that had to
+    wait for another worker calls ``recheck`` (typically a shared cache
+    lookup) before doing the work itself.
+    """
+
+    POLL_INTERVAL = 0.05
+    # Keys share this many lock files so the directory stays bounded; a rare
+    # collision only makes one call wait and then find nothing on recheck
+    LOCK_BUCKETS = 256
+
+    def __init__(self, lock_dir=None):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        if lock_dir and fcntl is None:
+            print("⚠️ fcntl unavailable - single-flight limited to this process")
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+        self.leaders = 0
+        self.coalesced = 0
+        self.cross_worker_waits = 0
+        self.cross_worker_coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, recheck=None, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError("Timed out waiting for an identical call in flight")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._lead(key, fn, recheck, timeout)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _lead(self, key, fn, recheck, timeout):
+        if not self.lock_dir:
+            return fn()
+
+        digest = hashlib.sha256(str(key).encode('utf-8')).hexdigest()
+        bucket = int(digest[:8], 16) % self.LOCK_BUCKETS
+        path = os.path.join(self.lock_dir, f"{bucket:03d}.lock")
+        with open(path, 'a') as lock_file:
+            waited = self._lock_file(lock_file, timeout)
+            try:
+                if waited and recheck is not None:
+                    result = recheck()
+                    if result is not None:
+                        with self._lock:
+                            self.cross_worker_coalesced += 1
+                        return result
+                return fn()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _lock_file(self, lock_file, timeout):
+        """Take the flock, polling up to ``timeout``; True if another worker held it"""
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return False
+        except BlockingIOError:
+            pass
+
+        with self._lock:
+            self.cross_worker_waits += 1
+        give_up = time.monotonic() + timeout if timeout else None
+        while True:
+            time.sleep(self.POLL_INTERVAL)
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if give_up is not None and time.monotonic() >= give_up:
+                    raise TimeoutError("Timed out waiting for another worker's identical call")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'inFlight': len(self._calls),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'crossWorkerWaits': self.cross_worker_waits,
+                'crossWorkerCoalesced': self.cross_worker_coalesced,
+                'crossWorker': bool(self.lock_dir)
+            }
@@ -0,0 +1,421 @@
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from utils.csv_processor import CSVProcessor
+from utils.dates import iso_date, month_of
+from utils.records import Debt, Transaction
+from utils.rollups import UNDATED, MonthlyRollup, full_months, rollup_rows
+from utils.transaction_table import TransactionTable, parse_dates
+from utils.upload_batch import dedupe_key
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    income REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    month TEXT,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_user_date ON transactions (user_id, date);
+CREATE INDEX IF NOT EXISTS transactions_user_category ON transactions (user_id, category);
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+    user_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    category TEXT NOT NULL,
+    total REAL NOT NULL,
+    count INTEGER NOT NULL,
+    min_amount REAL NOT NULL,
+    max_amount REAL NOT NULL,
+    sum_squares REAL NOT NULL,
+    PRIMARY KEY (user_id, month, category)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS debts (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    balance REAL NOT NULL,
+    rate REAL NOT NULL,
+    min_payment REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS debts_user ON debts (user_id);
+CREATE TABLE IF NOT EXISTS goals (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    target_amount REAL NOT NULL,
+    current_amount REAL NOT NULL DEFAULT 0,
+    deadline TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS goals_user ON goals (user_id);
+'''
+
+
+class TransactionStore:
+    """
+    Persistent users, transactions, debts and goals in one SQLite file.
+
+    The database runs in WAL mode with one connection per thread, so reads
+    never wait on a writer and every worker on the host can share the file.
+    Transaction dates are stored as 'YYYY-MM-DD' when they parse, which keeps
+    date ranges answerable from the (user, date) index; rows without a
+    category are categorized on the way in.
+
+    Every write also maintains monthly_rollups: per user, month and category
+    the sum, count, min, max and sum of squares. Reads that only need
+    aggregates go through rollup(), which touches months x categories rows
+    instead of every transaction.
+    """
+
+    def __init__(self, db_path, categorize=None, batch_size=5000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._categorize = categorize
+        self._local = threading.local()
+        with self._transaction() as db:
+            migrating = db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions'"
+            ).fetchone() and not db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'monthly_rollups'"
+            ).fetchone()
+            db.executescript(SCHEMA)
+        if migrating:
+            print("📊 Building monthly rollups from existing transactions...")
+            self.rebuild_rollups()
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            # Safe with WAL: a power loss can only drop the last commits, never corrupt
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self, immediate=False):
+        db = self._connect()
+        if immediate:
+            # Take the write lock now rather than at the first write
+            db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    # ---- users ----
+
+    def get_user(self, user_id):
+        row = self._connect().execute('SELECT id, income FROM users WHERE id = ?', (user_id,)).fetchone()
+        return {'id': row[0], 'income': row[1]} if row else None
+
+    def set_income(self, user_id, income):
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                'INSERT INTO users (id, income, created_at, updated_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (id) DO UPDATE SET income = excluded.income, updated_at = excluded.updated_at',
+                (user_id, float(income), now, now)
+            )
+
+    def get_income(self, user_id, default=0):
+        user = self.get_user(user_id)
+        return user['income'] if user else default
+
+    def _ensure_user(self, db, user_id):
+        now = time.time()
+        db.execute('INSERT OR IGNORE INTO users (id, created_at, updated_at) VALUES (?, ?, ?)', (user_id, now, now))
+
+    # ---- transactions ----
+
+    def _row(self, user_id, expense):
+        category = expense.category
+        if (not category or category == 'Other') and self._categorize:
+            category = self._categorize(expense.description, expense.amount)
+        date = expense.date
+        return (user_id, iso_date(date) or date, month_of(date), category or 'Other',
+                float(expense.amount), expense.description)
+
+    def add_transactions(self, user_id, expenses):
+        """Insert a small batch of Transactions in one transaction; returns [(id, stored Transaction)]"""
+        stored, rows = [], []
+        with self._transaction() as db:
+            self._ensure_user(db, user_id)
+            for expense in expenses:
+                row = self._row(user_id, expense)
+                cursor = db.execute(
+                    'INSERT INTO transactions (user_id, date, month, category, amount, description) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', row
+                )
+                stored.append((cursor.lastrowid, Transaction(row[1], row[3], row[4], row[5])))
+                rows.append(row)
+            self._add_rollups(db, user_id, rows)
+        return stored
+
+    def append(self, user_id, expenses, skip_stored=False):
+        """
+        Add an iterable of Transactions in one SQLite transaction: either every
+        row is stored or, if anything fails, none is. Returns the 'stored' and
+        'skipped' counts.
+
+        Rows are written with executemany, ``batch_size`` at a time. The write
+        lock is taken before the first read (BEGIN IMMEDIATE), so concurrent
+        appends for a user run one after the other.
+
+        With ``skip_stored``, rows the user already has are not written again:
+        the history counts as one more statement under the merge_expenses rule,
+        so each (date, amount, description) ends up stored as many times as the
+        larger of the two holds it. Re-uploading a statement, or one that
+        overlaps an earlier upload, only adds what is new, even when both
+        uploads arrive at once.
+        """
+        stats = {'stored': 0, 'skipped': 0}
+        stored = {}
+        seen = Counter()
+        batch = []
+        with self._transaction(immediate=True) as db:
+            self._ensure_user(db, user_id)
+            for expense in expenses:
+                if skip_stored:
+                    key = dedupe_key(expense)
+                    # Loaded per date before this call writes any row with that date
+                    existing = stored.get(key[0])
+                    if existing is None:
+                        existing = stored[key[0]] = self._stored_keys(db, user_id, key[0])
+                    seen[key] += 1
+                    if seen[key] <= existing[key]:
+                        stats['skipped'] += 1
+                        continue
+                batch.append(self._row(user_id, expense))
+                stats['stored'] += 1
+                if len(batch) >= self.batch_size:
+                    self._insert_rows(db, user_id, batch)
+                    batch = []
+            if batch:
+                self._insert_rows(db, user_id, batch)
+        return stats
+
+    def _stored_keys(self, db, user_id, date):
+        """Counter of dedupe keys among the user's transactions on one stored date"""
+        cursor = db.execute(
+            'SELECT date, category, amount, description FROM transactions WHERE user_id = ? AND date = ?',
+            (user_id, date)
+        )
+        return Counter(dedupe_key(Transaction(*row)) for row in cursor)
+
+    def ingest(self, user_id, expenses):
+        """Bulk-insert an iterable of Transactions; returns the row count"""
+        return self.append(user_id, expenses)['stored']
+
+    def ingest_csv(self, user_id, stream, report=None, processor=None):
+        """Parse a CSV stream with CSVProcessor straight into the store"""
+        processor = processor or CSVProcessor()
+        return self.ingest(user_id, processor.iter_stream(stream, report))
+
+    def _insert_rows(self, db, user_id, rows):
+        db.executemany(
+            'INSERT INTO transactions (user_id, date, month, category, amount, description) '
+            'VALUES (?, ?, ?, ?, ?, ?)', rows
+        )
+        self._add_rollups(db, user_id, rows)
+
+    def delete_transaction(self, user_id, transaction_id):
+        with self._transaction() as db:
+            row = db.execute('SELECT month, category, amount FROM transactions WHERE id = ? AND user_id = ?',
+                             (transaction_id, user_id)).fetchone()
+            if row is None:
+                return False
+            month, category, amount = row[0] or UNDATED, row[1], row[2]
+            db.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
+            # Subtract in place unless the row was its group's last, min or max
+            updated = db.execute(
+                'UPDATE monthly_rollups SET total = total - ?, count = count - 1, sum_squares = sum_squares - ? '
+                'WHERE user_id = ? AND month = ? AND category = ? AND count > 1 AND min_amount < ? AND max_amount > ?',
+                (amount, amount * amount, user_id, month, category, amount, amount)
+            ).rowcount
+            if not updated:
+                # Min/max cannot be un-merged, so recompute just this group
+                self._refresh_rollup(db, user_id, month, category)
+        return True
+
+    # ---- rollups ----
+
+    def _add_rollups(self, db, user_id, rows):
+        """Merge transaction rows (as built by _row) into the rollups, pre-grouped per batch"""
+        groups = rollup_rows((row[2], row[3], row[4]) for row in rows)
+        db.executemany(
+            'INSERT INTO monthly_rollups (user_id, month, category, total, count, min_amount, max_amount, sum_squares) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (user_id, month, category) DO UPDATE SET '
+            'total = total + excluded.total, count = count + excluded.count, '
+            'min_amount = MIN(min_amount, excluded.min_amount), max_amount = MAX(max_amount, excluded.max_amount), '
+            'sum_squares = sum_squares + excluded.sum_squares',
+            [(user_id, month, category, *group) for (month, category), group in groups.items()]
+        )
+
+    def _refresh_rollup(self, db, user_id, month, category):
+        db.execute('DELETE FROM monthly_rollups WHERE user_id = ? AND month = ? AND category = ?',
+                   (user_id, month, category))
+        db.execute(
+            'INSERT INTO monthly_rollups '
+            "SELECT user_id, COALESCE(month, ''), category, SUM(amount), COUNT(*), MIN(amount), MAX(amount), "
+            'SUM(amount * amount) FROM transactions '
+            "WHERE user_id = ? AND category = ? AND COALESCE(month, '') = ? GROUP BY user_id",
+            (user_id, category, month)
+        )
+
+    def rebuild_rollups(self, user_id=None):
+        """Recompute rollups from the raw transactions, for one user or everyone"""
+        where, params = ('WHERE user_id = ?', (user_id,)) if user_id is not None else ('', ())
+        with self._transaction() as db:
+            db.execute(f'DELETE FROM monthly_rollups {where}', params)
+            db.execute(
+                'INSERT INTO monthly_rollups '
+                "SELECT user_id, COALESCE(month, ''), category, SUM(amount), COUNT(*), MIN(amount), MAX(amount), "
+                f'SUM(amount * amount) FROM transactions {where} '
+                "GROUP BY user_id, COALESCE(month, ''), category",
+                params
+            )
+
+    def rollup(self, user_id, start=None, end=None, category=None):
+        """
+        MonthlyRollup for an inclusive date range. Whole months inside the range
+        come from the stored rollups; only the partial months at either edge are
+        aggregated from transactions, via the (user, date) index.
+        """
+        start = _bound(start, 'startDate') if start else None
+        end = _bound(end, 'endDate') if end else None
+        db = self._connect()
+        sql = ('SELECT month, category, total, count, min_amount, max_amount, sum_squares '
+               'FROM monthly_rollups WHERE user_id = ?')
+        params = [user_id]
+        if category:
+            sql += ' AND category = ?'
+            params.append(category)
+        if not start and not end:
+            return MonthlyRollup(db.execute(sql, params).fetchall())
+
+        first, last = full_months(start, end)
+        rows = db.execute(sql + " AND month != '' AND month >= ? AND month <= ?", params + [first, last]).fetchall()
+        edges = self._select(
+            'month, category, SUM(amount), COUNT(*), MIN(amount), MAX(amount), SUM(amount * amount)',
+            user_id, start, end, category,
+            ' AND month IS NOT NULL AND (month < ? OR month > ?) GROUP BY month, category', (first, last)
+        )
+        return MonthlyRollup(rows + edges.fetchall())
+
+    def _select(self, columns, user_id, start=None, end=None, category=None, suffix='', suffix_params=()):
+        sql = f'SELECT {columns} FROM transactions WHERE user_id = ?'
+        params = [user_id]
+        if start:
+            sql += ' AND date >= ?'
+            params.append(_bound(start, 'startDate'))
+        if end:
+            sql += ' AND date <= ?'
+            params.append(_bound(end, 'endDate'))
+        if category:
+            sql += ' AND category = ?'
+            params.append(category)
+        return self._connect().execute(sql + suffix, params + list(suffix_params))
+
+    def transactions(self, user_id, start=None, end=None, category=None, limit=None, newest_first=False):
+        """JSON-ready expenses with their ids, in date order; ``start``/``end`` are inclusive dates"""
+        order = ' ORDER BY date DESC, id DESC' if newest_first else ' ORDER BY date, id'
+        if limit is not None:
+            order += f' LIMIT {int(limit)}'
+        cursor = self._select('id, date, category, amount, description', user_id, start, end, category, order)
+        return [
+            {'id': row[0], 'date': row[1], 'category': row[2], 'amount': row[3], 'description': row[4]}
+            for row in cursor
+        ]
+
+    def table(self, user_id, start=None, end=None, category=None):
+        """The same rows as a columnar TransactionTable, without building a dict per row"""
+        rows = self._select('date, category, amount, description', user_id, start, end, category,
+                            ' ORDER BY date, id').fetchall()
+        dates, categories, amounts, descriptions = zip(*rows) if rows else ((), (), (), ())
+        return TransactionTable(parse_dates(list(dates)), amounts, list(categories), list(descriptions))
+
+    def count(self, user_id):
+        return self._connect().execute('SELECT COUNT(*) FROM transactions WHERE user_id = ?', (user_id,)).fetchone()[0]
+
+    def category_totals(self, user_id, start=None, end=None):
+        """{category: (total, count)} from the (user, category) index"""
+        cursor = self._select('category, SUM(amount), COUNT(*)', user_id, start, end, suffix=' GROUP BY category')
+        return {category: (total, count) for category, total, count in cursor}
+
+    # ---- debts ----
+
+    def set_debts(self, user_id, debts):
+        """Replace the user's debts with this list of Debts"""
+        with self._transaction() as db:
+            self._ensure_user(db, user_id)
+            db.execute('DELETE FROM debts WHERE user_id = ?', (user_id,))
+            db.executemany(
+                'INSERT INTO debts (user_id, name, balance, rate, min_payment) VALUES (?, ?, ?, ?, ?)',
+                [(user_id, debt.name, debt.balance, debt.rate, debt.min_payment) for debt in debts]
+            )
+
+    def debt_records(self, user_id):
+        cursor = self._connect().execute(
+            'SELECT name, balance, rate, min_payment FROM debts WHERE user_id = ? ORDER BY id', (user_id,)
+        )
+        return [Debt(*row) for row in cursor]
+
+    def get_debts(self, user_id):
+        cursor = self._connect().execute(
+            'SELECT id, name, balance, rate, min_payment FROM debts WHERE user_id = ? ORDER BY id', (user_id,)
+        )
+        return [
+            {'id': row[0], 'name': row[1], 'balance': row[2], 'rate': row[3], 'minPayment': row[4]}
+            for row in cursor
+        ]
+
+    # ---- goals ----
+
+    def add_goal(self, user_id, goal):
+        with self._transaction() as db:
+            self._ensure_user(db, user_id)
+            cursor = db.execute(
+                'INSERT INTO goals (user_id, name, target_amount, current_amount, deadline, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (user_id, goal.get('name', 'Goal'), float(goal.get('targetAmount', 0)),
+                 float(goal.get('currentAmount', 0)), goal.get('deadline'), time.time())
+            )
+        return cursor.lastrowid
+
+    def get_goals(self, user_id):
+        cursor = self._connect().execute(
+            'SELECT id, name, target_amount, current_amount, deadline FROM goals WHERE user_id = ? ORDER BY id',
+            (user_id,)
+        )
+        return [
+            {'id': row[0], 'name': row[1], 'targetAmount': row[2], 'currentAmount': row[3], 'deadline': row[4]}
+            for row in cursor
+        ]
+
+    def delete_goal(self, user_id, goal_id):
+        with self._transaction() as db:
+            cursor = db.execute('DELETE FROM goals WHERE id = ? AND user_id = ?', (goal_id, user_id))
+        return cursor.rowcount > 0
+
+
+def _bound(value, name):
+    day = iso_date(str(value))
+    if day is None:
+        raise ValueError(f"{name} must be a date like YYYY-MM-DD")
+    return day
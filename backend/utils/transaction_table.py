@@ -0,0 +1,125 @@
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from utils.records import Transaction
+
+
+class TransactionTable:
+    """
+    Columnar view of a list of transactions.
+
+    Stores one array per field instead of one dict per row:
+    - dates: datetime64[ns] (NaT where the date could not be parsed)
+    - amounts: float64
+    - categories / descriptions: pd.Categorical, codes in order of first appearance
+    """
+
+    # Rows converted per batch when building from an iterator of dicts
+    CHUNK_SIZE = 65536
+
+    def __init__(self, dates, amounts, categories, descriptions):
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        self.amounts = np.asarray(amounts, dtype=np.float64)
+        self.categories = _as_categorical(categories)
+        self.descriptions = _as_categorical(descriptions)
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @classmethod
+    def from_records(cls, records, chunk_size=None):
+        """Build a table from an iterable of Transactions, one chunk at a time"""
+        chunk_size = chunk_size or cls.CHUNK_SIZE
+        records = iter(records)
+        dates, amounts = [], []
+        categories, descriptions = _Factorizer(), _Factorizer()
+
+        while True:
+            chunk = list(islice(records, chunk_size))
+            dates.append(parse_dates([record.date for record in chunk]))
+            amounts.append(np.array([record.amount for record in chunk], dtype=np.float64))
+            categories.add([record.category or 'Other' for record in chunk])
+            descriptions.add([record.description for record in chunk])
+            if len(chunk) < chunk_size:
+                break
+
+        return cls(np.concatenate(dates), np.concatenate(amounts), categories.categorical(), descriptions.categorical())
+
+    def to_records(self):
+        """Convert back to a list of Transactions"""
+        dates = np.datetime_as_string(self.dates, unit='D')
+        dates[np.isnat(self.dates)] = ''
+        return [
+            Transaction(date, category, amount, description)
+            for date, category, amount, description in zip(
+                dates.tolist(),
+                self.categories.astype(object).tolist(),
+                self.amounts.tolist(),
+                self.descriptions.astype(object).tolist()
+            )
+        ]
+
+    def to_frame(self):
+        return pd.DataFrame({
+            'date': self.dates,
+            'category': self.categories,
+            'amount': self.amounts,
+            'description': self.descriptions
+        })
+
+    def total(self):
+        return float(self.amounts.sum())
+
+
+def parse_dates(values):
+    """
+    Parse date strings to datetime64[ns], trying ISO 8601 before mixed formats.
+    Each distinct string is parsed once; missing values become NaT.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    series = pd.Series(uniques, dtype=object)
+    parsed = pd.to_datetime(series, format='ISO8601', errors='coerce')
+    retry = parsed.isna() & series.astype(bool)
+    if retry.any():
+        parsed[retry] = pd.to_datetime(series[retry], format='mixed', errors='coerce')
+    # Code -1 (missing) picks the trailing NaT
+    parsed = np.append(parsed.to_numpy(dtype='datetime64[ns]'), np.datetime64('NaT', 'ns'))
+    return parsed[codes]
+
+
+def total_amount(expenses):
+    """Sum expense amounts from a list of Transactions, or read it from a TransactionTable or MonthlyRollup"""
+    if hasattr(expenses, 'total'):
+        return expenses.total()
+    return sum(exp.amount for exp in expenses)
+
+
+def _as_categorical(values):
+    if isinstance(values, pd.Categorical):
+        return values
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return pd.Categorical.from_codes(codes, categories=uniques)
+
+
+class _Factorizer:
+    """Categorical built up chunk by chunk, with categories in order of first appearance across all chunks"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def add(self, values):
+        self._chunks.append(pd.factorize(np.asarray(values, dtype=object)))
+
+    def categorical(self):
+        # Factorize the chunks' distinct values once, then map each chunk's codes through the result
+        chunk_codes, categories = pd.factorize(np.concatenate([uniques for _, uniques in self._chunks]))
+        codes = []
+        offset = 0
+        for local, uniques in self._chunks:
+            # Code -1 (missing) picks the trailing -1
+            remap = np.append(chunk_codes[offset:offset + len(uniques)], -1)
+            codes.append(remap[local])
+            offset += len(uniques)
+        return pd.Categorical.from_codes(np.concatenate(codes), categories=categories)
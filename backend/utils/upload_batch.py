@@ -0,0 +1,218 @@
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from config import Config
+from utils.csv_processor import CSVProcessor, ParseReport
+from utils.dates import iso_date
+from utils.metrics import record_stage, timed
+from utils.upload_store import open_parsed, read_parsed, write_parsed
+
+# Extensions parsed as CSV when found inside an archive
+CSV_EXTENSIONS = ('.csv', '.txt')
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    # Stage timings are reported back to the parent; the child's registry is never scraped
+    Config.METRICS_ENABLED = False
+
+
+def start_pool():
+    """
+    Fork the parser pool's workers now. Only the server entry point calls
+    this, before it starts any threads; elsewhere the pool is created on first
+    use, and importing the app never forks.
+    """
+    if Config.UPLOAD_WORKERS > 1:
+        pool = get_pool()
+        if pool is not None:
+            # A fork pool launches every worker on its first submit
+            pool.submit(int).result()
+
+
+def get_pool():
+    """
+    Process pool for parsing, created on first use, or None when one cannot
+    be forked safely.
+
+    A fork copies only the calling thread, so locks held by other threads
+    (metrics, LLM client, sqlite) would stay locked forever in the children.
+    The pool is therefore only created while this is the only thread.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A pool inherited through a fork (e.g. a preloading server) has no manager thread here
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = None
+            methods = multiprocessing.get_all_start_methods()
+            if 'fork' not in methods:
+                # spawn starts clean interpreters, so threads do not matter
+                context = None
+            elif threading.active_count() == 1:
+                # fork: workers inherit the loaded modules instead of re-importing app.py
+                context = multiprocessing.get_context('fork')
+            else:
+                return None
+            _pool = ProcessPoolExecutor(max_workers=Config.UPLOAD_WORKERS, mp_context=context,
+                                        initializer=_init_worker)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(pool):
+    """Forget a broken pool so the next get_pool() builds a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def expand_uploads(files, parsed_path=None):
+    """
+    Turn saved uploads [(name, path, key)] into parse jobs
+    [(name, path, member, cache path)].
+
+    A .zip contributes one job per CSV inside it (member is the name within
+    the archive); anything else is parsed as CSV itself. Archives are checked
+    against the member count and uncompressed size limits before anything is
+    extracted. ``parsed_path(key, member)`` names each job's parse cache.
+    """
+    jobs = []
+    for name, path, key in files:
+        if not name.lower().endswith('.zip'):
+            jobs.append((name, path, None, parsed_path(key) if parsed_path else None))
+            continue
+        try:
+            with zipfile.ZipFile(path) as archive:
+                members = [
+                    info for info in archive.infolist()
+                    if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+                    and info.filename.lower().endswith(CSV_EXTENSIONS)
+                ]
+        except zipfile.BadZipFile:
+            raise ValueError(f"{name} is not a valid zip archive")
+        if len(members) > Config.MAX_ARCHIVE_FILES:
+            raise ValueError(f"{name} has more than {Config.MAX_ARCHIVE_FILES} files")
+        if sum(info.file_size for info in members) > Config.MAX_ARCHIVE_BYTES:
+            raise ValueError(f"{name} expands past {Config.MAX_ARCHIVE_BYTES // (1024 * 1024)}MB")
+        jobs.extend(
+            (f"{name}/{info.filename}", path, info.filename,
+             parsed_path(key, info.filename) if parsed_path else None)
+            for info in members
+        )
+    return jobs
+
+
+def parse_job(job):
+    """Parse one file or archive member, or read its cached parse; runs in a worker process"""
+    name, path, member, cache_path = job
+    started = time.perf_counter()
+    report = ParseReport()
+    cached = open_parsed(cache_path)
+    try:
+        if cached is not None:
+            expenses = list(read_parsed(cached, report))
+        elif member is None:
+            expenses = _parse(CSVProcessor().iter_file(path, report), cache_path, report)
+        else:
+            with zipfile.ZipFile(path) as archive, archive.open(member) as stream:
+                expenses = _parse(CSVProcessor().iter_stream(stream, report), cache_path, report)
+        error = None
+    except Exception as e:
+        expenses, error = [], str(e)
+    return name, expenses, report.to_dict(), time.perf_counter() - started, error, cached is not None
+
+
+def _parse(expenses, cache_path, report):
+    if cache_path is not None:
+        expenses = write_parsed(cache_path, expenses, report)
+    return list(expenses)
+
+
+def parse_jobs(jobs):
+    """
+    Yield (job index, parse_job result) as jobs finish. More than one job goes
+    to the process pool so parsing spreads across cores; a single job, or any
+    job when no pool is available, runs inline.
+    """
+    pool = get_pool() if len(jobs) > 1 and Config.UPLOAD_WORKERS > 1 else None
+    if pool is None:
+        results = ((index, parse_job(job)) for index, job in enumerate(jobs))
+    else:
+        results = _pool_results(pool, jobs)
+    for index, result in results:
+        if not result[5]:
+            # Worker timings land in this process's histogram
+            record_stage('csv_parse', result[3])
+        yield index, result
+
+
+def _pool_results(pool, jobs):
+    """Run jobs on the pool; if a worker dies (e.g. OOM-killed), parse the rest inline"""
+    finished = set()
+    try:
+        futures = {pool.submit(parse_job, job): index for index, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            result = future.result()
+            finished.add(futures[future])
+            yield futures[future], result
+    except BrokenProcessPool:
+        print("⚠️ Upload parser pool broke; parsing the remaining files in this process")
+        _discard_pool(pool)
+        for index, job in enumerate(jobs):
+            if index not in finished:
+                yield index, parse_job(job)
+
+
+def dedupe_key(expense):
+    """(ISO date or the raw date if it does not parse, amount, normalized description)"""
+    date = expense.date
+    return (iso_date(date) or date, round(expense.amount, 2), ' '.join(expense.description.lower().split()))
+
+
+@timed('merge')
+def merge_expenses(parsed):
+    """
+    Merge per-file expense lists into one list in date order.
+
+    Overlapping statements repeat the same rows, but one statement can also
+    legitimately hold identical rows (two coffees on one day). So each
+    (date, amount, description) is kept as many times as the file with the
+    most copies of it has, and extra copies from other files are dropped.
+    ``parsed`` is a list of expense lists in upload order; returns the merged
+    list and the number of duplicates dropped from each input.
+    """
+    keyed = [([dedupe_key(expense) for expense in expenses], expenses) for expenses in parsed]
+    allowed = Counter()
+    for keys, _ in keyed:
+        for key, count in Counter(keys).items():
+            if count > allowed[key]:
+                allowed[key] = count
+
+    kept = Counter()
+    merged = []
+    duplicates = []
+    for keys, expenses in keyed:
+        dropped = 0
+        for key, expense in zip(keys, expenses):
+            if kept[key] < allowed[key]:
+                kept[key] += 1
+                merged.append((key[0], expense))
+            else:
+                dropped += 1
+        duplicates.append(dropped)
+
+    # ISO dates sort chronologically as text; the sort is stable, so same-day
+    # rows keep upload order, and unparseable dates go last
+    merged.sort(key=lambda item: (iso_date(item[0]) != item[0], item[0]))
+    return [expense for _, expense in merged], duplicates
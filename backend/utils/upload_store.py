@@ -0,0 +1,276 @@
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from utils.records import Transaction
+
+# Bump when CSVProcessor output changes so parses cached by an older version are ignored
+PARSE_VERSION = 2
+CHUNK_SIZE = 1024 * 1024
+
+# <sha256> for a raw upload, <sha256>[-<member hash>].v<N>.parsed for cached parse results
+_ENTRY = re.compile(r'^[0-9a-f]{64}(?:-[0-9a-f]{16})?(?:\.v\d+\.parsed)?$')
+
+
+class UploadStore:
+    """
+    Uploads kept under their SHA-256, with parsed rows cached next to them.
+
+    save() hashes while it copies the stream to a temp file, then renames it
+    to ``<directory>/<hash>``, so identical files share one copy no matter
+    who uploads them or what they are called. receive() does the same while
+    the caller reads (parses) the stream. The parse of each file (or archive
+    member) is cached as NDJSON, one [date, category, amount, description]
+    row per line plus a final report line, so the same content is never
+    parsed twice.
+
+    Hits refresh a file's mtime. cleanup() removes entries older than
+    ``max_age`` and then the least recently used ones until the directory is
+    under ``max_bytes``; it runs at most every ``cleanup_interval`` seconds,
+    piggybacked on saves. Entries used within ``min_age`` are never removed,
+    so a file is not evicted while a request is still reading it.
+    """
+
+    def __init__(self, directory, max_bytes, max_age, cleanup_interval=600, min_age=600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.cleanup_interval = cleanup_interval
+        self.min_age = min_age
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        self.saves = 0
+        self.duplicates = 0
+        self.evicted = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, stream):
+        """Copy a binary stream into the store; returns (hash, path)"""
+        return self.receive(stream).finish()
+
+    def receive(self, stream):
+        """Start saving a binary stream; read from the returned Upload, then finish() it"""
+        return Upload(self, stream)
+
+    def _add(self, tmp_path, key):
+        """Move a fully written temp file to its hash, or drop it if that content is already stored"""
+        path = os.path.join(self.directory, key)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            _touch(path)
+            with self._lock:
+                self.duplicates += 1
+        else:
+            os.replace(tmp_path, path)
+        with self._lock:
+            self.saves += 1
+        self.maybe_cleanup()
+        return key, path
+
+    def parsed_path(self, key, member=None):
+        """Where the parse of an upload, or of one member of an archive upload, is cached"""
+        if member is not None:
+            key += '-' + hashlib.sha256(member.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f"{key}.v{PARSE_VERSION}.parsed")
+
+    def maybe_cleanup(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_cleanup < self.cleanup_interval:
+                return
+            self._last_cleanup = now
+        self.cleanup()
+
+    def cleanup(self):
+        """Drop expired entries and abandoned temp files, then trim to max_bytes by LRU"""
+        now = time.time()
+        entries = []
+        removed = 0
+        for name in os.listdir(self.directory):
+            is_tmp = name.endswith('.tmp')
+            if not is_tmp and not _ENTRY.match(name):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            age = now - stat.st_mtime
+            if age < self.min_age:
+                entries.append((stat.st_mtime, stat.st_size, None))
+            elif is_tmp or age > self.max_age:
+                removed += _remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path is not None and _remove(path):
+                removed += 1
+                total -= size
+        with self._lock:
+            self.evicted += removed
+        if removed:
+            print(f"🧹 Upload store: removed {removed} files, {total / 1e6:.1f} MB kept")
+        return removed
+
+    def stats(self):
+        files = 0
+        size = 0
+        for name in os.listdir(self.directory):
+            if _ENTRY.match(name):
+                try:
+                    size += os.path.getsize(os.path.join(self.directory, name))
+                    files += 1
+                except FileNotFoundError:
+                    continue
+        with self._lock:
+            return {'files': files, 'bytes': size, 'maxBytes': self.max_bytes, 'saves': self.saves,
+                    'duplicates': self.duplicates, 'evicted': self.evicted}
+
+
+class Upload(io.RawIOBase):
+    """
+    A stream on its way into an UploadStore.
+
+    Everything read from it is hashed and written to a temp file as it goes
+    by, so a parser can consume the upload while it arrives instead of after
+    it is copied. finish() reads whatever the reader left, stores the file
+    under its hash and returns (hash, path); abort() discards it.
+    """
+
+    def __init__(self, store, stream):
+        self._store = store
+        self._stream = stream
+        self._digest = hashlib.sha256()
+        # Created on the first read, so an upload nobody reads leaves nothing behind
+        self._file = self._tmp_path = None
+        self.key = None
+        self.path = None
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self._stream.read(len(buffer))
+        if not chunk:
+            return 0
+        if self._file is None:
+            self._open()
+        self._digest.update(chunk)
+        self._file.write(chunk)
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def finish(self):
+        if self.key is None:
+            try:
+                buffer = bytearray(CHUNK_SIZE)
+                while self.readinto(buffer):
+                    pass
+                if self._file is None:
+                    self._open()
+                self._file.close()
+                self.key, self.path = self._store._add(self._tmp_path, self._digest.hexdigest())
+            except Exception:
+                self.abort()
+                raise
+        return self.key, self.path
+
+    def abort(self):
+        """Drop the partial file; does nothing once finished"""
+        if self.key is None and self._file is not None:
+            self._file.close()
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+    def _open(self):
+        fd, self._tmp_path = tempfile.mkstemp(dir=self._store.directory, suffix='.tmp')
+        self._file = os.fdopen(fd, 'wb')
+
+    def cache_parse(self, expenses, report):
+        """
+        Yield Transactions parsed from this upload unchanged while caching them.
+        Once the parse is complete the upload is finished and the cache stored
+        as the parse of its hash; an abandoned or failed parse leaves neither
+        the upload nor a partial cache behind.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self._store.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            yield from _cache(tmp_path, lambda: self._store.parsed_path(self.finish()[0]), expenses, report)
+        finally:
+            self.abort()
+
+
+def open_parsed(path):
+    """Open a cached parse for reading and mark it used; None if it is not cached"""
+    if path is None:
+        return None
+    try:
+        file = open(path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return None
+    _touch(path)
+    return file
+
+
+def read_parsed(file, report):
+    """Yield the cached Transactions, then fill ``report`` from the trailing report line"""
+    with file:
+        previous = None
+        for line in file:
+            if previous is not None:
+                yield Transaction(*json.loads(previous))
+            previous = line
+    if previous is not None:
+        saved = json.loads(previous)
+        report.parsed = saved['parsed']
+        report.skipped = saved['skipped']
+        report.errors = saved['errors']
+
+
+def write_parsed(path, expenses, report):
+    """
+    Yield Transactions unchanged while caching them at ``path``. The cache file
+    only appears once the iteration completes, so a failed or abandoned
+    parse never leaves a partial entry behind.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    yield from _cache(tmp_path, lambda: path, expenses, report)
+
+
+def _cache(tmp_path, destination, expenses, report):
+    """Write rows and the report to tmp_path while yielding the rows, then move it to destination()"""
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            for expense in expenses:
+                file.write(json.dumps(expense.to_row()) + '\n')
+                yield expense
+            file.write(json.dumps(report.to_dict()) + '\n')
+        os.replace(tmp_path, destination())
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return 1
+    except FileNotFoundError:
+        return 0
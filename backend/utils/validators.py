@@ -1,3 +1,7 @@
+from utils.metrics import timed
+
+
+@timed('validate')
 def validate_expense_data(expenses):
     """Validate expense data structure"""
     if not isinstance(expenses, list):
@@ -16,6 +20,7 @@ def validate_expense_data(expenses):
     return True
 
 
+@timed('validate')
 def validate_debt_data(debts):
     """Validate debt data structure"""
     if not isinstance(debts, list):